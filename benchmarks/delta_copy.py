@@ -0,0 +1,88 @@
+"""Compares copying a file to an SSH context in full against a delta copy, for synthetic
+files with 1%, 10% and 100% of their content changed since the previous copy. Runs against
+an in-process asyncssh server, or against a real sshd if a host is given.
+
+    PYTHONPATH=. python benchmarks/delta_copy.py [--size-mb 32] [--host HOST --port PORT]
+"""
+
+import os
+import time
+import random
+import getpass
+import asyncio
+import argparse
+import tempfile
+from pitcrew import delta
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+CHANGE_SIZE = 4096
+
+
+def changed(data, ratio, rng):
+    """Overwrites scattered runs of the data totalling the ratio of its size, and inserts
+    a few bytes at the start so later blocks are shifted."""
+    if ratio >= 1:
+        return rng.getrandbits(8 * len(data)).to_bytes(len(data), "little")
+    data = bytearray(data)
+    for _ in range(int(len(data) * ratio) // CHANGE_SIZE):
+        offset = rng.randrange(len(data) - CHANGE_SIZE)
+        data[offset : offset + CHANGE_SIZE] = os.urandom(CHANGE_SIZE)
+    return b"shifted" + bytes(data)
+
+
+async def measure(ctx, local_path, remote_path, old, new, use_delta):
+    with open(remote_path + ".orig", "wb") as fh:
+        fh.write(old)
+    await ctx.sh(f"cp {remote_path}.orig {remote_path}")
+    with open(local_path, "wb") as fh:
+        fh.write(new)
+    start = time.perf_counter()
+    await ctx.local_context.file(local_path).copy_to(
+        ctx.file(remote_path), delta=use_delta
+    )
+    return time.perf_counter() - start
+
+
+async def compare(app, connection_kwargs, size):
+    rng = random.Random(0)
+    old = rng.getrandbits(8 * size).to_bytes(size, "little")
+    ctx = app.local_context.ssh_context(user=getpass.getuser(), **connection_kwargs)
+    results = []
+    async with ctx:
+        with tempfile.TemporaryDirectory() as tmp:
+            local_path = os.path.join(tmp, "local")
+            remote_path = os.path.join(tmp, "remote")
+            for ratio in (0.01, 0.1, 1):
+                new = changed(old, ratio, rng)
+                sig = delta.signature(old, delta.block_size_for(size))
+                try:
+                    sent = len(delta.delta(new, sig))
+                except delta.DeltaTooLarge:
+                    sent = len(new)
+                full = await measure(ctx, local_path, remote_path, old, new, False)
+                delta_time = await measure(ctx, local_path, remote_path, old, new, True)
+                results.append((ratio, full, delta_time, sent))
+    return results
+
+
+async def run(args):
+    size = args.size_mb * 1024 * 1024
+    async with App() as app:
+        if args.host:
+            connection_kwargs = {"host": args.host, "port": args.port}
+            results = await compare(app, connection_kwargs, size)
+        else:
+            async with LocalSSHServer() as server:
+                results = await compare(app, server.connection_kwargs(), size)
+    print(f"{'changed':<10} {'full copy':>10} {'delta copy':>11} {'delta bytes':>12}")
+    for ratio, full, delta_time, sent in results:
+        print(f"{ratio:<10.0%} {full:9.2f}s {delta_time:10.2f}s {sent:12d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=22)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
@@ -0,0 +1,52 @@
+"""Compares copying a directory of many small files to an SSH context with recursive scp
+against streaming a tar archive, with and without compression. Runs against an in-process
+asyncssh server.
+
+    PYTHONPATH=. python benchmarks/directory_copy.py [--files 2000]
+"""
+
+import os
+import time
+import getpass
+import asyncio
+import argparse
+import tempfile
+from pitcrew import file
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+async def recursive_scp(src, dest):
+    await file.local_to_ssh_copier(src, dest, archive=True)
+
+
+async def run(args):
+    async with LocalSSHServer() as server, App() as app:
+        ctx = app.local_context.ssh_context(
+            user=getpass.getuser(), **server.connection_kwargs()
+        )
+        async with ctx:
+            with tempfile.TemporaryDirectory() as tmp:
+                src_path = os.path.join(tmp, "src")
+                for i in range(args.files):
+                    directory = os.path.join(src_path, str(i % 50))
+                    os.makedirs(directory, exist_ok=True)
+                    with open(os.path.join(directory, str(i)), "w") as fh:
+                        fh.write(f"some configuration {i}\n" * 20)
+                src = app.local_context.file(src_path)
+
+                for name, copy in [
+                    ("recursive scp", recursive_scp),
+                    ("tar", file.tar_copier),
+                    ("tar gzip", lambda s, d: file.tar_copier(s, d, compress=True)),
+                ]:
+                    dest = ctx.file(os.path.join(tmp, name.replace(" ", "-")))
+                    start = time.perf_counter()
+                    await copy(src, dest)
+                    print(f"{name:<15} {time.perf_counter() - start:8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2000)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
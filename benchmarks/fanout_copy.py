@@ -0,0 +1,72 @@
+"""Compares copying one file to a group of hosts with a `copy_to` per host against
+`copy_to_many`, both streaming every copy from the controller and relaying between hosts.
+Each host is an in-process asyncssh server standing in for an sshd.
+
+    PYTHONPATH=. python benchmarks/fanout_copy.py [--hosts 8] [--size-mb 32] [--concurrency 4]
+"""
+
+import os
+import time
+import getpass
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+RELAY_SSH_OPTIONS = "-o BatchMode=yes -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR"
+
+
+async def copy_each(src, dests, concurrency):
+    for dest in dests:
+        await src.copy_to(dest)
+
+
+async def copy_many(src, dests, concurrency):
+    results = await src.copy_to_many(dests, concurrency=concurrency)
+    assert results == [None] * len(dests), results
+
+
+async def copy_relay(src, dests, concurrency):
+    results = await src.copy_to_many(
+        dests, concurrency=concurrency, relay=True, relay_ssh_options=RELAY_SSH_OPTIONS
+    )
+    assert results == [None] * len(dests), results
+
+
+async def run(args):
+    async with App() as app, contextlib.AsyncExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        src_path = os.path.join(tmp, "src")
+        with open(src_path, "wb") as fh:
+            fh.write(os.urandom(args.size_mb * 1024 * 1024))
+        src = app.local_context.file(src_path)
+        contexts = []
+        for _ in range(args.hosts):
+            server = await stack.enter_async_context(LocalSSHServer())
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            contexts.append(await stack.enter_async_context(ctx))
+
+        for name, fn in [
+            ("copy_to per host", copy_each),
+            ("copy_to_many", copy_many),
+            ("copy_to_many relay", copy_relay),
+        ]:
+            dests = [
+                ctx.file(os.path.join(tmp, f"{fn.__name__}-{i}"))
+                for i, ctx in enumerate(contexts)
+            ]
+            start = time.perf_counter()
+            await fn(src, dests, args.concurrency)
+            print(f"{name:<20} {time.perf_counter() - start:8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""Compares copying a file between two SSH hosts by staging it on this machine's disk and
+copying it twice, against streaming it through this machine and sending it directly from
+one host to the other. Each host is an in-process asyncssh server standing in for an sshd.
+
+    PYTHONPATH=. python benchmarks/remote_copy.py [--size-mb 64]
+"""
+
+import os
+import time
+import getpass
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pitcrew import file
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+RELAY_SSH_OPTIONS = "-o BatchMode=yes -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR"
+
+
+async def staged(app, src, dest):
+    with tempfile.TemporaryDirectory() as tmp:
+        local = app.local_context.file(os.path.join(tmp, "staged"))
+        await src.copy_to(local)
+        await local.copy_to(dest)
+
+
+async def streamed(app, src, dest):
+    await src.copy_to(dest)
+
+
+async def direct(app, src, dest):
+    await src.copy_to(dest, direct=True)
+
+
+async def run(args):
+    file.RELAY_SSH_OPTIONS = RELAY_SSH_OPTIONS
+    async with App() as app, contextlib.AsyncExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        src_path = os.path.join(tmp, "src")
+        with open(src_path, "wb") as fh:
+            fh.write(os.urandom(args.size_mb * 1024 * 1024))
+        contexts = []
+        for _ in range(2):
+            server = await stack.enter_async_context(LocalSSHServer())
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            contexts.append(await stack.enter_async_context(ctx))
+        src = contexts[0].file(src_path)
+
+        for name, fn in [
+            ("staged", staged),
+            ("streamed", streamed),
+            ("direct", direct),
+        ]:
+            dest = contexts[1].file(os.path.join(tmp, name))
+            start = time.perf_counter()
+            await fn(app, src, dest)
+            print(f"{name:<10} {time.perf_counter() - start:8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""Compares the throughput of copying a large file to and from an SSH host with scp against
+the parallel SFTP copier. The host is an in-process asyncssh server behind a proxy which
+delays traffic to add a round trip time, standing in for a high-latency link.
+
+    PYTHONPATH=. python benchmarks/sftp_copy.py [--size-mb 64] [--rtt-ms 50] [--chunk-kb 256] [--parallelism 32] [--channels 4]
+"""
+
+import os
+import time
+import getpass
+import asyncio
+import argparse
+import tempfile
+from pitcrew import file
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+class LatencyProxy:
+    """Forwards connections to a local port, delaying the data sent each way by half of
+    the round trip time."""
+
+    def __init__(self, port, rtt):
+        self.target_port = port
+        self.delay = rtt / 2
+        self.port = None
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(
+            "127.0.0.1", self.target_port
+        )
+        await asyncio.gather(
+            self._forward(client_reader, server_writer),
+            self._forward(server_reader, client_writer),
+        )
+
+    async def _forward(self, reader, writer):
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                deliver_at, data = await queue.get()
+                await asyncio.sleep(deliver_at - loop.time())
+                if not data:
+                    writer.close()
+                    break
+                writer.write(data)
+                await writer.drain()
+
+        delivery = asyncio.ensure_future(deliver())
+        while True:
+            try:
+                data = await reader.read(65536)
+            except ConnectionError:
+                data = b""
+            queue.put_nowait((loop.time() + self.delay, data))
+            if not data:
+                break
+        await delivery
+
+
+async def run(args):
+    size = args.size_mb * 1024 * 1024
+    async with LocalSSHServer() as server, App() as app:
+        kwargs = server.connection_kwargs()
+        async with LatencyProxy(server.port, args.rtt_ms / 1000) as proxy:
+            kwargs["port"] = proxy.port
+            ctx = app.local_context.ssh_context(user=getpass.getuser(), **kwargs)
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local = app.local_context.file(os.path.join(tmp, "local"))
+                    with open(local.path, "wb") as fh:
+                        fh.write(os.urandom(size))
+                    remote = ctx.file(os.path.join(tmp, "remote"))
+                    back = app.local_context.file(os.path.join(tmp, "back"))
+
+                    async def sftp(src, dest):
+                        await file.sftp_copier(
+                            src,
+                            dest,
+                            args.chunk_kb * 1024,
+                            args.parallelism,
+                            args.channels,
+                        )
+
+                    for name, copy in [("scp", file.copiers), ("sftp", None)]:
+                        for direction, src, dest in [
+                            ("upload", local, remote),
+                            ("download", remote, back),
+                        ]:
+                            start = time.perf_counter()
+                            if copy is None:
+                                await sftp(src, dest)
+                            else:
+                                await copy[(src.__class__, dest.__class__)](src, dest)
+                            elapsed = time.perf_counter() - start
+                            print(
+                                f"{name:<5} {direction:<9} {elapsed:7.2f}s "
+                                f"{args.size_mb / elapsed:8.1f}MB/s"
+                            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rtt-ms", type=int, default=50)
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--parallelism", type=int, default=32)
+    parser.add_argument("--channels", type=int, default=4)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
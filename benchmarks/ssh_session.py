@@ -0,0 +1,55 @@
+"""Compares commands/sec for SSH contexts running each command over its own channel
+against contexts using a persistent shell session. Runs against an in-process asyncssh
+server, or against a real sshd if a host is given.
+
+    PYTHONPATH=. python benchmarks/ssh_session.py [--commands 200] [--host HOST --port PORT]
+"""
+
+import time
+import getpass
+import asyncio
+import argparse
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+async def measure(app, connection_kwargs, commands, persistent_session):
+    ctx = app.local_context.ssh_context(
+        user=getpass.getuser(),
+        persistent_session=persistent_session,
+        **connection_kwargs,
+    )
+    async with ctx:
+        await ctx.sh("true")
+        start = time.perf_counter()
+        for _ in range(commands):
+            await ctx.sh("true")
+        return commands / (time.perf_counter() - start)
+
+
+async def run(args):
+    async with App() as app:
+        if args.host:
+            connection_kwargs = {"host": args.host, "port": args.port}
+            results = await compare(app, connection_kwargs, args.commands)
+        else:
+            async with LocalSSHServer() as server:
+                connection_kwargs = server.connection_kwargs()
+                results = await compare(app, connection_kwargs, args.commands)
+    for name, rate in results:
+        print(f"{name:<20} {rate:10.1f} commands/sec")
+
+
+async def compare(app, connection_kwargs, commands):
+    return [
+        ("per-channel", await measure(app, connection_kwargs, commands, False)),
+        ("persistent session", await measure(app, connection_kwargs, commands, True)),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=22)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""Compares the time taken by a fresh process to list every task by importing each task
+module against reading the static task manifest, both with an empty manifest cache and a
+warm one.
+
+    python benchmarks/startup.py [--runs 5]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+
+IMPORT_TASKS = """
+from pitcrew.loader import Loader
+for task in Loader().each_task():
+    task.desc()
+"""
+
+# only the manifest is imported, as the loader pulls in jinja2 and the task machinery
+MANIFEST_TASKS = """
+import sys
+from pitcrew.manifest import TaskManifest
+for task in TaskManifest(sys.argv[1], sys.argv[2]).each_task():
+    task.desc()
+"""
+
+TASK_DIR = os.path.abspath(os.path.join(__file__, "..", "..", "pitcrew", "tasks"))
+
+
+def measure(script, runs, cache_path=None, clear_cache=False):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    elapsed = []
+    for _ in range(runs):
+        if clear_cache and os.path.exists(cache_path):
+            os.remove(cache_path)
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", script]
+            + ([TASK_DIR, cache_path] if cache_path else []),
+            env=env,
+            check=True,
+        )
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "manifest.json")
+        results = [
+            ("import tasks", measure(IMPORT_TASKS, args.runs)),
+            (
+                "manifest (cold)",
+                measure(MANIFEST_TASKS, args.runs, cache_path, clear_cache=True),
+            ),
+            ("manifest (warm)", measure(MANIFEST_TASKS, args.runs, cache_path)),
+        ]
+    for name, seconds in results:
+        print(f"{name:<20} {seconds * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    run(parser.parse_args())
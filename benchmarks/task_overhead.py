@@ -0,0 +1,59 @@
+"""Measures what invoking a task, here `fs.touch` which runs one command, and running a
+shell command cost pitcrew itself at each log level, with logs written to /dev/null.
+Commands return immediately without running anything, so only the time spent in pitcrew
+is measured.
+
+    python benchmarks/task_overhead.py [--iterations 20000]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+from unittest import mock
+from pitcrew.app import App
+from pitcrew.logger import logger, LOG_LEVELS
+
+
+async def no_command(command, stdin=None, env=None):
+    return 0, b"", b""
+
+
+async def invoke_tasks(ctx, iterations):
+    for _ in range(iterations):
+        await ctx.fs.touch("/tmp/pitcrew-benchmark")
+
+
+async def run_commands(ctx, iterations):
+    for _ in range(iterations):
+        await ctx.sh("true")
+
+
+async def measure(fn, iterations):
+    # the logger is registered for the hooks its level needs when the app is created
+    async with App() as app:
+        ctx = app.local_context
+        with mock.patch.object(ctx, "_sh_with_code", no_command):
+            start = time.perf_counter()
+            await fn(ctx, iterations)
+            elapsed = time.perf_counter() - start
+    logger.flush()
+    return elapsed
+
+
+async def run(args):
+    with open(os.devnull, "w") as devnull, mock.patch.object(logger, "writer", devnull):
+        for name, fn in [("fs.touch", invoke_tasks), ("shell command", run_commands)]:
+            for level in reversed(LOG_LEVELS):
+                logger.configure(level=level)
+                elapsed = await measure(fn, args.iterations)
+                print(
+                    f"{name:<15} {level:<10} {elapsed / args.iterations * 1e6:8.2f}µs"
+                )
+    logger.configure(level="debug")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.get_event_loop().run_until_complete(run(parser.parse_args()))
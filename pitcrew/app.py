@@ -9,17 +9,40 @@ from pitcrew.docs import Docs
 from pitcrew.test import TestRunner
 from pitcrew.executor import Executor
 from pitcrew.passwords import Passwords
+from pitcrew.facts import FactStore
+from pitcrew.hooks import Hooks
+from pitcrew.logger import logger
+from pitcrew.manifest import TaskManifest
 
 
 class App:
-    def __init__(self):
-        self.template_render_path = os.path.join("/tmp", "crew", "templates")
+    def __init__(self, refresh_facts=False):
+        self.crew_path = os.path.join("/tmp", "crew")
+        self.template_render_path = os.path.join(self.crew_path, "templates")
         atexit.register(self.delete_rendered_templates)
         os.makedirs(self.template_render_path, exist_ok=True)
         self.loader = Loader()
+        self.manifest = TaskManifest(
+            self.loader.task_dir, os.path.join(self.crew_path, "manifest.json")
+        )
         self.passwords = Passwords()
+        self.hooks = Hooks()
+        self.hooks.register(logger)
+        self._connection_pool = None
+        self.fact_store = FactStore(
+            os.path.join(self.crew_path, "facts.db"), refresh=refresh_facts
+        )
         self.local_context = LocalContext(self, self.loader)
 
+    @property
+    def connection_pool(self):
+        # asyncssh is slow to import, so only load it once a connection is needed
+        if self._connection_pool is None:
+            from pitcrew.pool import ConnectionPool
+
+            self._connection_pool = ConnectionPool()
+        return self._connection_pool
+
     def executor(self, *args, **kwargs):
         return Executor(*args, **kwargs)
 
@@ -60,12 +83,15 @@ class App:
 
         with open(task_path, "w") as fh:
             fh.write(rendered_task)
+        self.loader.invalidate()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        pass
+        if self._connection_pool:
+            await self._connection_pool.close()
+        self.fact_store.close()
 
     def delete_rendered_templates(self):
         shutil.rmtree(self.template_render_path, ignore_errors=True)
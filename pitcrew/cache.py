@@ -0,0 +1,89 @@
+"""The memo cache holds the return values of memoized tasks for a context. Results are keyed
+on the task name along with the context's directory, user and the processed arguments, so
+calls with different arguments are cached independently.
+
+Each cached result records its subject, the value of the task's first argument, typically a
+path or package name. Tasks which change the system declare which memoized tasks they
+invalidate and which of their arguments names the subject, allowing only the affected
+results to be dropped.
+"""
+
+import time
+import posixpath
+from collections import OrderedDict
+
+MISSING = object()
+
+
+def freeze(value):
+    """Converts a value into a hashable equivalent, raising a TypeError if it can't be."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+
+def subjects(value, directory=None):
+    """The set of strings a subject value can be matched by, both as given and resolved
+    against the directory."""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    matches = set()
+    for v in values:
+        if isinstance(v, str):
+            matches.add(v)
+            matches.add(posixpath.normpath(posixpath.join(directory or "", v)))
+    return matches
+
+
+class MemoEntry:
+    def __init__(self, value, expires_at, subjects):
+        self.value = value
+        self.expires_at = expires_at
+        self.subjects = subjects
+
+
+class MemoCache:
+    def __init__(self):
+        self.tasks = {}
+
+    def get(self, task_name, key):
+        """Returns the cached value or MISSING if there isn't an unexpired value."""
+        entries = self.tasks.get(task_name)
+        if not entries or key not in entries:
+            return MISSING
+        entry = entries[key]
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del entries[key]
+            return MISSING
+        entries.move_to_end(key)
+        return entry.value
+
+    def set(self, task_name, key, value, ttl=None, maxsize=None, subjects=()):
+        entries = self.tasks.setdefault(task_name, OrderedDict())
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        entries[key] = MemoEntry(value, expires_at, subjects)
+        entries.move_to_end(key)
+        while maxsize is not None and len(entries) > maxsize:
+            entries.popitem(last=False)
+
+    def invalidate(self, task_names=None, subject=None, directory=None):
+        """Drops cached values for the named tasks, or every task if no names are given.
+        If a subject is given, only values for a matching subject are dropped."""
+        if task_names is None:
+            task_names = list(self.tasks.keys())
+        matches = None if subject is None else subjects(subject, directory)
+        for name in task_names:
+            entries = self.tasks.get(name)
+            if not entries:
+                continue
+            if matches is None:
+                entries.clear()
+                continue
+            for key, entry in list(entries.items()):
+                if entry.subjects & matches:
+                    del entries[key]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.tasks.values())
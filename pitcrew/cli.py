@@ -1,12 +1,69 @@
 import os
 import json
-import sys
 import asyncio
 import click
 import argparse
 from subprocess import call
 from pitcrew.app import App
-from pitcrew.util import ResultsPrinter
+from pitcrew.logger import logger, LOG_FORMATS, LOG_LEVELS
+from pitcrew.trace import Tracer
+from pitcrew.util import ResultsPrinter, ResultsStreamer
+
+# options of the commands which run on every context of a provider
+RUN_OPTIONS = [
+    click.option("--provider", "-p", default="providers.local"),
+    click.option("--provider-args", "provider_json", "-P", default="{}"),
+    click.option(
+        "--concurrency", default=100, help="Number of contexts to run at once"
+    ),
+    click.option(
+        "--connect-concurrency", type=int, help="Number of contexts to connect at once"
+    ),
+    click.option(
+        "--command-concurrency", type=int, help="Number of commands to run at once"
+    ),
+    click.option(
+        "--output",
+        type=click.Choice(["json", "jsonl"]),
+        default="json",
+        help="Print results at the end, or as a line of json as each context finishes",
+    ),
+    click.option("--output-file", type=click.File("w"), default="-"),
+    click.option(
+        "--refresh-facts", is_flag=True, help="Ignore facts persisted by previous runs"
+    ),
+    click.option(
+        "--log-format",
+        type=click.Choice(LOG_FORMATS),
+        default="human",
+        help="Log colored lines grouped by host, or a line of json for each event",
+    ),
+    click.option(
+        "--log-level",
+        type=click.Choice(LOG_LEVELS),
+        default="debug",
+        help="Log everything including shell commands, only tasks, only the outcome of each host, or nothing",
+    ),
+    click.option(
+        "-q",
+        "--quiet",
+        is_flag=True,
+        help="Don't log anything, same as --log-level quiet",
+    ),
+    click.option(
+        "--trace",
+        "trace_path",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Write a Chrome trace of every task, command and copy to this file",
+    ),
+]
+
+
+def run_options(fn):
+    """Adds each of RUN_OPTIONS to a command, in order."""
+    for option in reversed(RUN_OPTIONS):
+        fn = option(fn)
+    return fn
 
 
 @click.group(invoke_without_command=False)
@@ -25,32 +82,60 @@ def cli(ctx):
     },
 )
 @click.argument("shell_command", nargs=-1, type=click.UNPROCESSED)
-@click.option("--provider", "-p", default="providers.local")
-@click.option("--provider-args", "provider_json", "-P", default="{}")
+@run_options
 @click.pass_context
-def sh(ctx, *, provider, provider_json, shell_command):
+def sh(
+    ctx,
+    *,
+    provider,
+    provider_json,
+    concurrency,
+    connect_concurrency,
+    command_concurrency,
+    output,
+    output_file,
+    refresh_facts,
+    log_format,
+    log_level,
+    quiet,
+    trace_path,
+    shell_command,
+):
     """Allows running a shell command."""
+    logger.configure(format=log_format, level="quiet" if quiet else log_level)
+    tracer = Tracer() if trace_path else None
 
     async def run_task():
-        async with App() as app:
+        async with App(refresh_facts=refresh_facts) as app:
+            if tracer:
+                app.hooks.register(tracer)
             provider_args = json.loads(provider_json)
             joined_command = " ".join(shell_command)
-            sys.stderr.write(
-                f"Invoking \033[1m{joined_command}\033[0m with\n  provider \033[1m{provider} {provider_args}\033[0m\n"
-            )
+            logger.invoke(joined_command, provider, provider_args)
 
             async def fn(self):
                 return await self.sh(joined_command)
 
             provider_task = app.load(provider)
             provider_instance = await provider_task.invoke(**provider_args)
-            async with app.executor(provider_instance) as executor:
+            async with app.executor(
+                provider_instance,
+                concurrency=concurrency,
+                connect_concurrency=connect_concurrency,
+                command_concurrency=command_concurrency,
+                sink=ResultsStreamer(output_file) if output == "jsonl" else None,
+            ) as executor:
                 results = await executor.invoke(fn)
 
-            ResultsPrinter(results).print()
+            logger.flush()
+            print_results(results, output_file)
 
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(run_task())
+    try:
+        loop.run_until_complete(run_task())
+    finally:
+        if tracer:
+            tracer.write(trace_path)
 
 
 @cli.command(
@@ -63,15 +148,35 @@ def sh(ctx, *, provider, provider_json, shell_command):
 )
 @click.argument("task_name")
 @click.argument("extra_args", nargs=-1, type=click.UNPROCESSED)
-@click.option("--provider", "-p", default="providers.local")
-@click.option("--provider-args", "provider_json", "-P", default="{}")
+@run_options
 @click.pass_context
-def run(ctx, *, provider, provider_json, task_name, extra_args):
+def run(
+    ctx,
+    *,
+    provider,
+    provider_json,
+    concurrency,
+    connect_concurrency,
+    command_concurrency,
+    output,
+    output_file,
+    refresh_facts,
+    log_format,
+    log_level,
+    quiet,
+    trace_path,
+    task_name,
+    extra_args,
+):
     """Allows running a task in crew/tasks. Parameters after task name are
     interpretted as task arguments."""
+    logger.configure(format=log_format, level="quiet" if quiet else log_level)
+    tracer = Tracer() if trace_path else None
 
     async def run_task():
-        async with App() as app:
+        async with App(refresh_facts=refresh_facts) as app:
+            if tracer:
+                app.hooks.register(tracer)
             task = app.load(task_name)
             task.coerce_inputs(True)
             parser = argparse.ArgumentParser(description=task.__doc__)
@@ -84,19 +189,35 @@ def run(ctx, *, provider, provider_json, task_name, extra_args):
             parsed_task_args = parser.parse_args(extra_args)
             provider_args = json.loads(provider_json)
             dict_args = vars(parsed_task_args)
-            sys.stderr.write(
-                f"Invoking \033[1m{task_name}\033[0m \033[1m{dict_args}\033[0m with\n  provider \033[1m{provider} {provider_args}\033[0m\n"
-            )
+            logger.invoke(task_name, provider, provider_args, args=dict_args)
 
             provider_task = app.load(provider)
             provider_instance = await provider_task.invoke(**provider_args)
-            async with app.executor(provider_instance) as executor:
+            async with app.executor(
+                provider_instance,
+                concurrency=concurrency,
+                connect_concurrency=connect_concurrency,
+                command_concurrency=command_concurrency,
+                sink=ResultsStreamer(output_file) if output == "jsonl" else None,
+            ) as executor:
                 results = await executor.run_task(task, **dict_args)
 
-            ResultsPrinter(results).print()
+            logger.flush()
+            print_results(results, output_file)
 
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(run_task())
+    try:
+        loop.run_until_complete(run_task())
+    finally:
+        if tracer:
+            tracer.write(trace_path)
+
+
+def print_results(results, output_file):
+    if isinstance(results, ResultsStreamer):
+        results.print()
+    else:
+        ResultsPrinter(results, output_file).print()
 
 
 @cli.command(short_help="list all tasks")
@@ -105,13 +226,11 @@ def list(ctx):
     """Lists available crew tasks."""
 
     app = App()
-    for task in app.loader.each_task():
+    for task in app.manifest.each_task():
         if task.nodoc:
             continue
         short_desc = (
-            task.__doc__.split("\n")[0]
-            if task.__doc__
-            else "\033[5m(no description)\033[0m"
+            task.doc.split("\n")[0] if task.doc else "\033[5m(no description)\033[0m"
         )
         print(f"\033[1m{task.task_name}\033[0m {short_desc}")
 
@@ -122,20 +241,22 @@ def list(ctx):
 def info(ctx, *, task_name):
     """Shows information about a single task."""
 
-    task = App().load(task_name)
+    task = App().manifest.get(task_name)
+    if task is None:
+        raise click.ClickException(f"no task named {task_name}")
     print("\033[1mName\033[0m")
     print(task_name)
     print("\033[1mPath\033[0m")
     print(task.source_path())
     print("\033[1mDescription\033[0m")
-    print(task.__doc__)
+    print(task.doc)
     print("\033[1mArguments\033[0m")
     for arg in task.args:
-        print(f"{arg.name} ({arg.type.__name__}): {arg.desc}")
+        print(f"{arg.name} ({arg.type_name}): {arg.desc}")
 
     if task.has_return_type():
         print("\033[1mReturns\033[0m")
-        print(f"{task.expected_return_type().__name__}: {task.return_desc}")
+        print(f"{task.return_type}: {task.return_desc}")
 
 
 @cli.command(short_help="generate docs")
@@ -182,7 +303,9 @@ def new(ctx, task_name):
 @click.argument("task_name")
 @click.pass_context
 def edit(ctx, task_name):
-    task = App().load(task_name)
+    task = App().manifest.get(task_name)
+    if task is None:
+        raise click.ClickException(f"no task named {task_name}")
     editor = os.environ["EDITOR"]
     call([editor, task.source_path()])
 
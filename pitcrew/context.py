@@ -10,14 +10,19 @@ Docker contexts run commands on a running docker container.
 
 import os
 import shlex
+import time
+import signal
 import asyncio
-import asyncssh
 import getpass
 from typing import Tuple
+from pitcrew.cache import MISSING, MemoCache
+from pitcrew.facts import FACT_TTL, PROBE_COMMAND, parse_probe
 from pitcrew.file import LocalFile, DockerFile, SSHFile
-from pitcrew.logger import logger
+from pitcrew.session import ShellSession
 from abc import ABC, abstractmethod
 
+STREAM_CHUNK_SIZE = 65536
+
 
 class ChangeUser:
     """Context manager to allow changing the user within a context"""
@@ -56,22 +61,163 @@ class ChangeDirectory:
         self.context.directory = self.old_directory
 
 
+class StreamStatus:
+    """Filled in with the exit code and STDERR of a streamed command once it exits."""
+
+    def __init__(self):
+        self.code = None
+        self.stderr = b""
+
+
+async def split_lines(chunks):
+    """Regroups an async iterator of byte chunks into lines, including the newline."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+async def feed_stdin(writer, stdin):
+    """Writes stdin, either bytes or an async iterable of bytes, to the writer of a command
+    before closing it, waiting for each chunk to be drained."""
+    try:
+        if isinstance(stdin, (bytes, bytearray)):
+            writer.write(stdin)
+            await writer.drain()
+        else:
+            async for chunk in stdin:
+                writer.write(chunk)
+                await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # the command exited without reading all of its input
+        pass
+    finally:
+        # stdin is closed even if producing it failed, so the command isn't left waiting
+        try:
+            writer.write_eof()
+        except OSError:
+            pass
+
+
 class Context(ABC):
     """Abstract base class for all contexts."""
 
+    # whether entering the context probes the user and system facts up front
+    probe = True
+
     def __init__(self, app, loader, user=None, parent_context=None, directory=None):
         self.app = app
         self.loader = loader
         self.user = user or getpass.getuser()
+        self.login_user = self.user
         self.directory = directory
         self.actual_user = None
+        self.known_facts = None
         self.parent_context = parent_context
-        self.cache = {}
+        self.command_semaphore = (
+            parent_context.command_semaphore if parent_context else None
+        )
+        self.cache = MemoCache()
+        self.packages = {}
+        self.snapshot = None
+
+    async def sh_with_code(
+        self, command, stdin=None, env=None
+    ) -> Tuple[int, bytes, bytes]:
+        """Runs a shell command within the given context. Returns a tuple of the exit code,
+        STDOUT and STDERR. STDIN can be given as bytes or as an async iterable of bytes,
+        which is streamed to the command as it is consumed. If the context has a command
+        semaphore, the command waits for a free slot before running."""
+        hooks = self.app.hooks
+        for hook in hooks.on_sh_start:
+            hook(self, command)
+        started = time.perf_counter()
+        try:
+            if self.command_semaphore is None:
+                result = await self._sh_with_code(command, stdin=stdin, env=env)
+            else:
+                async with self.command_semaphore:
+                    # waiting for a slot isn't counted as running the command
+                    started = time.perf_counter()
+                    result = await self._sh_with_code(command, stdin=stdin, env=env)
+        except BaseException as e:
+            # the command never exited, so the error stands in for its output
+            result = (None, None, f"{type(e).__name__} {e}".encode())
+            raise
+        finally:
+            for hook in hooks.on_sh_end:
+                hook(self, command, started, *result)
+        return result
 
     @abstractmethod
-    async def sh_with_code(command, stdin=None, env=None) -> Tuple[int, bytes, bytes]:
+    async def _sh_with_code(self, command, stdin=None, env=None):
         pass
 
+    async def sh_stream(
+        self,
+        command,
+        stdin=None,
+        env=None,
+        lines=False,
+        chunk_size=STREAM_CHUNK_SIZE,
+        acquire=True,
+    ):
+        """Runs a shell command within the given context, yielding STDOUT as bytes while
+        the command runs, either in chunks of up to `chunk_size` bytes or line by line if
+        `lines` is set. Output is only read as fast as it is consumed, so the command is
+        held up rather than buffering it all in memory. Raises an AssertionError once the
+        command exits with a non-zero exitcode. To stop reading early, call `aclose()` on
+        the stream, which stops the command.
+
+        Pass `acquire=False` when the stream feeds the stdin of another command, which
+        already holds a slot of the command semaphore, so the pair doesn't wait on a second
+        slot which may never come free."""
+
+        hooks = self.app.hooks
+        for hook in hooks.on_sh_start:
+            hook(self, command)
+        started = time.perf_counter()
+        status = StreamStatus()
+        chunks = self._sh_stream(
+            command, status, stdin=stdin, env=env, chunk_size=chunk_size
+        )
+        size = 0
+        semaphore = self.command_semaphore if acquire else None
+        if semaphore:
+            await semaphore.acquire()
+            started = time.perf_counter()
+        try:
+            async for chunk in split_lines(chunks) if lines else chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            # stops the command if the caller stopped reading early
+            await chunks.aclose()
+            if semaphore:
+                semaphore.release()
+            for hook in hooks.on_sh_end:
+                hook(
+                    self,
+                    command,
+                    started,
+                    status.code,
+                    f"<{size} bytes>",
+                    status.stderr,
+                )
+        assert (
+            status.code == 0
+        ), f"expected exit code of 0, got {status.code} when running\n:COMMAND: {command}\n\nERR {status.stderr.decode()}"
+
+    @abstractmethod
+    async def _sh_stream(
+        self, command, status, stdin=None, env=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
+        yield b""
+
     @abstractmethod
     async def raw_sh_with_code(command) -> Tuple[int, bytes, bytes]:
         pass
@@ -80,6 +226,10 @@ class Context(ABC):
     def descriptor(self) -> str:
         pass
 
+    def identity(self) -> str:
+        """A stable name for the host behind this context, used to persist facts."""
+        return self.descriptor()
+
     async def password(self, prompt) -> str:
         """Present the user with a password prompt using the prompt given. If two
         identical prompts are supplied, the user is only asked once, and subsequent calls will
@@ -94,9 +244,7 @@ class Context(ABC):
         """Runs a shell command within the given context. Raises an AssertionError if it exits with
         a non-zero exitcode. Returns STDOUT encoded with utf-8."""
 
-        logger.shell_start(self, command)
         code, out, err = await self.sh_with_code(command, stdin=stdin, env=env)
-        logger.shell_stop(self, code, out, err)
         assert (
             code == 0
         ), f"expected exit code of 0, got {code} when running\n:COMMAND: {command}\nOUT: {out.decode()}\n\nERR {err.decode()}"
@@ -115,12 +263,49 @@ class Context(ABC):
     async def fill_actual_user(self):
         if self.actual_user:
             return
-        code, out, err = await self.raw_sh_with_code("whoami")
-        assert code == 0, "unable to run whoami to determine the user"
-        self.actual_user = out.decode().strip()
+        info = self.get_fact("facts.system.info")
+        if info is MISSING:
+            info = await self.gather_facts()
+        self.actual_user = info["user"]
         if self.actual_user != self.user:
             print("Escalating user!")
 
+    async def gather_facts(self) -> dict:
+        """Runs a single probe to find the user commands are run as along with facts about
+        the system. Returns the dict of facts stored as `facts.system.info`."""
+        code, out, err = await self.raw_sh_with_code(PROBE_COMMAND)
+        assert code == 0, f"unable to probe the system facts: {err.decode()}"
+        info = parse_probe(out.decode())
+        self.set_fact("facts.system.info", info, ttl=FACT_TTL)
+        self.set_fact("facts.system.uname", info["kernel"].lower(), ttl=FACT_TTL)
+        return info
+
+    def invalidate(self, task_names=None, subject=None):
+        """Drops memoized returns for the named tasks, or all tasks if none are given. If a
+        subject such as a path is given, only returns for that subject are dropped. Paths
+        invalidated for fs tasks become unknown to the filesystem snapshot, if there is one.
+        """
+        self.cache.invalidate(task_names, subject, self.directory)
+        if self.snapshot and (
+            task_names is None or any(name.startswith("fs.") for name in task_names)
+        ):
+            self.snapshot.forget_subject(subject, self.directory)
+
+    def load_facts(self):
+        """Loads facts previously persisted for this host."""
+        self.known_facts = self.app.fact_store.load(self.identity())
+
+    def get_fact(self, name):
+        if self.known_facts is None:
+            self.load_facts()
+        return self.known_facts.get(name, MISSING)
+
+    def set_fact(self, name, value, ttl=None):
+        if self.known_facts is None:
+            self.load_facts()
+        self.known_facts[name] = value
+        self.app.fact_store.save(self.identity(), name, value, ttl=ttl)
+
     def with_user(self, user):
         """Returns a context handler for defining the user"""
         return ChangeUser(self, user)
@@ -130,6 +315,9 @@ class Context(ABC):
         return ChangeDirectory(self, directory)
 
     async def __aenter__(self):
+        self.load_facts()
+        if self.probe:
+            await self.fill_actual_user()
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
@@ -166,8 +354,14 @@ class Context(ABC):
         return shlex.quote(text)
 
     def __getattr__(self, name):
+        packages = self.__dict__.get("packages")
+        if packages is not None and name in packages:
+            return packages[name]
         if self.has_package(name):
-            return self.package(name)
+            package = self.package(name)
+            if packages is not None:
+                packages[name] = package
+            return package
         else:
             return self.__getattribute__(name)
 
@@ -189,22 +383,65 @@ class LocalContext(Context):
             cls._singleton = object.__new__(LocalContext)
         return cls._singleton
 
-    async def sh_with_code(self, command, stdin=None, env=None):
+    async def _sh_with_code(self, command, stdin=None, env=None):
         command = await self._prepare_command(command)
-        new_env = os.environ.copy()
-        new_env.pop("__PYVENV_LAUNCHER__", None)
-        if env:
-            new_env.update(env)
-
         kwargs = {
             "stdout": asyncio.subprocess.PIPE,
             "stderr": asyncio.subprocess.PIPE,
             "stdin": asyncio.subprocess.PIPE,
-            "env": new_env,
+            "env": self._environ(env),
         }
         proc = await asyncio.create_subprocess_shell(command, **kwargs)
-        stdout, stderr = await proc.communicate(input=stdin)
-        return (proc.returncode, stdout, stderr)
+        if stdin is None or isinstance(stdin, (bytes, bytearray)):
+            stdout, stderr = await proc.communicate(input=stdin)
+            return (proc.returncode, stdout, stderr)
+        stdout, stderr, _ = await asyncio.gather(
+            proc.stdout.read(), proc.stderr.read(), feed_stdin(proc.stdin, stdin)
+        )
+        return (await proc.wait(), stdout, stderr)
+
+    async def _sh_stream(
+        self, command, status, stdin=None, env=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
+        command = await self._prepare_command(command)
+        kwargs = {
+            "stdout": asyncio.subprocess.PIPE,
+            "stderr": asyncio.subprocess.PIPE,
+            "stdin": (
+                asyncio.subprocess.DEVNULL if stdin is None else asyncio.subprocess.PIPE
+            ),
+            "env": self._environ(env),
+            # run in a process group of its own so the whole command can be stopped
+            "start_new_session": True,
+        }
+        proc = await asyncio.create_subprocess_shell(command, **kwargs)
+        stderr = asyncio.ensure_future(proc.stderr.read())
+        feeder = None
+        if stdin is not None:
+            feeder = asyncio.ensure_future(feed_stdin(proc.stdin, stdin))
+        try:
+            while True:
+                chunk = await proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            status.stderr = await stderr
+            status.code = await proc.wait()
+        finally:
+            stderr.cancel()
+            if feeder:
+                feeder.cancel()
+            if proc.returncode is None:
+                os.killpg(proc.pid, signal.SIGKILL)
+                # the process isn't reaped until its pipes are drained
+                await proc.communicate()
+
+    def _environ(self, env):
+        new_env = os.environ.copy()
+        new_env.pop("__PYVENV_LAUNCHER__", None)
+        if env:
+            new_env.update(env)
+        return new_env
 
     async def raw_sh_with_code(self, command):
         kwargs = {"stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE}
@@ -215,6 +452,9 @@ class LocalContext(Context):
     def descriptor(self):
         return f"{self.user}@local"
 
+    def identity(self):
+        return f"{self.login_user}@local"
+
 
 class SSHContext(Context):
     file_class = SSHFile
@@ -227,44 +467,106 @@ class SSHContext(Context):
         port=22,
         user=None,
         parent_context=None,
+        persistent_session=False,
+        probe=True,
         **connection_kwargs,
     ):
         self.host = host
+        self.probe = probe
         self.port = port
         self.async_helper = None
         self.connection = None
         self.connect_timeout = 1
+        self.persistent_session = persistent_session
+        self.session = None
         self.connection_kwargs = connection_kwargs
         super().__init__(app, loader, user=user, parent_context=parent_context)
 
-    async def sh_with_code(self, command, stdin=None, env=None):
+    async def _sh_with_code(self, command, stdin=None, env=None):
         command = await self._prepare_command(command)
-        proc = await self.connection.run(
-            command, stdin=stdin, env=env or {}, encoding=None
+        if stdin is None and self._session_available():
+            return await self.session.run(command, env=env)
+        if stdin is None or isinstance(stdin, (bytes, bytearray)):
+            proc = await self.connection.run(
+                command, input=stdin, env=env or {}, encoding=None
+            )
+            return (proc.exit_status, proc.stdout, proc.stderr)
+        proc = await self.connection.create_process(
+            command, env=env or {}, encoding=None
         )
-        return (proc.exit_status, proc.stdout, proc.stderr)
+        stdout, stderr, _ = await asyncio.gather(
+            proc.stdout.read(), proc.stderr.read(), feed_stdin(proc.stdin, stdin)
+        )
+        await proc.wait_closed()
+        return (proc.exit_status, stdout, stderr)
+
+    async def _sh_stream(
+        self, command, status, stdin=None, env=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
+        command = await self._prepare_command(command)
+        proc = await self.connection.create_process(
+            command, env=env or {}, encoding=None
+        )
+        stderr = asyncio.ensure_future(proc.stderr.read())
+        feeder = asyncio.ensure_future(feed_stdin(proc.stdin, stdin or b""))
+        try:
+            while True:
+                chunk = await proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            status.stderr = await stderr
+            await proc.wait_closed()
+            status.code = proc.exit_status
+        finally:
+            proc.close()
+            stderr.cancel()
+            feeder.cancel()
 
     async def raw_sh_with_code(self, command):
+        if self._session_available():
+            return await self.session.run(command)
         proc = await self.connection.run(command, encoding=None)
         return (proc.exit_status, proc.stdout, proc.stderr)
 
+    def _session_available(self):
+        # commands with stdin, or issued while the session is busy (for instance from
+        # within asyncio.gather) fall back to a channel of their own
+        if not self.persistent_session:
+            return False
+        if self.session is None:
+            self.session = ShellSession(self.connection)
+        return not self.session.busy()
+
     async def __aenter__(self):
-        gen = asyncio.wait_for(
-            asyncssh.connect(
-                self.host, port=self.port, username=self.user, **self.connection_kwargs
-            ),
+        self.connection = await self.app.connection_pool.acquire(
+            self.host,
+            port=self.port,
+            user=self.user,
             timeout=self.connect_timeout,
+            **self.connection_kwargs,
         )
-        self.connection = await gen
-        return self
+        try:
+            return await super().__aenter__()
+        except BaseException:
+            # __aexit__ isn't called when entering fails, so the connection is released
+            # here rather than being held by the pool forever
+            self.app.connection_pool.release(self.connection)
+            raise
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        self.connection.close()
+        if self.session:
+            self.session.close()
+            self.session = None
+        self.app.connection_pool.release(self.connection)
         await super().__aexit__(exc_type, exc_value, traceback)
 
     def descriptor(self):
         return f"ssh:{self.user}@{self.host}"
 
+    def identity(self):
+        return f"ssh:{self.login_user}@{self.host}:{self.port}"
+
 
 class DockerContext(Context):
     file_class = DockerFile
@@ -273,15 +575,27 @@ class DockerContext(Context):
         self.container_id = container_id
         super().__init__(app, loader, **kwargs)
 
-    async def sh_with_code(self, command, stdin=None, env=None):
+    async def _sh_with_code(self, command, stdin=None, env=None):
+        command = await self._prepare_command(command)
+        cmd = f"docker exec -i {self._env_flags(env)}{self.container_id} /bin/sh -c {self.esc(command)}"
+        return await self.local_context._sh_with_code(cmd, stdin=stdin)
+
+    async def _sh_stream(
+        self, command, status, stdin=None, env=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
         command = await self._prepare_command(command)
+        cmd = f"docker exec -i {self._env_flags(env)}{self.container_id} /bin/sh -c {self.esc(command)}"
+        async for chunk in self.local_context._sh_stream(
+            cmd, status, stdin=stdin, chunk_size=chunk_size
+        ):
+            yield chunk
+
+    def _env_flags(self, env):
         env_string = ""
         if env:
             for k, v in env.items():
                 env_string += f"-e {self.esc(k)}={self.esc(v)} "
-
-        cmd = f"docker exec -i {env_string}{self.container_id} /bin/sh -c {self.esc(command)}"
-        return await self.local_context.sh_with_code(cmd, stdin=stdin)
+        return env_string
 
     async def raw_sh_with_code(self, command):
         return await self.local_context.raw_sh_with_code(
@@ -291,6 +605,9 @@ class DockerContext(Context):
     def descriptor(self):
         return f"docker:{self.user}@{self.container_id[0:6]}"
 
+    def identity(self):
+        return f"docker:{self.login_user}@{self.container_id}"
+
     async def __aexit__(self, exc_type, exc_value, traceback):
         await self.local_context.docker.stop(self.container_id, time=0)
         await super().__aexit__(exc_type, exc_value, traceback)
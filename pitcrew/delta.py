@@ -0,0 +1,282 @@
+"""Delta transfers copy a file by sending only the parts which differ from the file already at
+the destination, in the style of rsync.
+
+The destination's existing file is split into blocks and a signature of each block, a weak
+rolling checksum and an md5 digest, is sent to the side holding the new file. The new file
+is scanned for blocks matching the signatures, first at block-aligned offsets and then by
+rolling the weak checksum a byte at a time, and a list of instructions to either copy a
+block of the existing file or insert literal bytes is sent back to rebuild the new file at
+the destination. The rebuilt file is verified against the sha256 digest of the new file
+before it replaces the existing one.
+
+This module only uses the standard library, so its source can be run with `python3 -c`
+on the remote side of a transfer:
+
+    python3 -c "$source" signature PATH BLOCK_SIZE > signature
+    python3 -c "$source" delta PATH MAX_LITERAL_RATIO < signature > delta
+    python3 -c "$source" apply PATH < delta
+"""
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+import shlex
+import hashlib
+
+SIGNATURE_HEADER = struct.Struct("!QI")
+SIGNATURE_BLOCK = struct.Struct("!I16s")
+DELTA_HEADER = struct.Struct("!QI32s")
+COPY_OP = struct.Struct("!cQI")
+LITERAL_OP = struct.Struct("!cI")
+MOD_ADLER = 65521
+
+# exit codes of the command line modes
+EXIT_MISSING = 3
+EXIT_TOO_LARGE = 4
+EXIT_MISMATCH = 5
+
+
+class DeltaError(Exception):
+    pass
+
+
+class DeltaTooLarge(DeltaError):
+    """Raised when too little of the existing file can be reused for a delta to be worth
+    sending."""
+
+    pass
+
+
+def block_size_for(size):
+    """Picks a block size of around the square root of the file size, as rsync does."""
+    block_size = int(size**0.5) // 1024 * 1024
+    return max(2048, min(131072, block_size))
+
+
+def signature(data, block_size):
+    """Returns the signature of each block of the existing file's data."""
+    parts = [SIGNATURE_HEADER.pack(len(data), block_size)]
+    for offset in range(0, len(data), block_size):
+        block = data[offset : offset + block_size]
+        parts.append(
+            SIGNATURE_BLOCK.pack(zlib.adler32(block), hashlib.md5(block).digest())
+        )
+    return b"".join(parts)
+
+
+def parse_signature(sig):
+    size, block_size = SIGNATURE_HEADER.unpack_from(sig)
+    blocks = {}
+    offset = SIGNATURE_HEADER.size
+    index = 0
+    while offset < len(sig):
+        weak, strong = SIGNATURE_BLOCK.unpack_from(sig, offset)
+        length = min(block_size, size - index * block_size)
+        blocks.setdefault(weak, []).append((index, strong, length))
+        offset += SIGNATURE_BLOCK.size
+        index += 1
+    return block_size, blocks
+
+
+class DeltaWriter:
+    def __init__(self, data, block_size):
+        self.data = data
+        self.parts = [
+            DELTA_HEADER.pack(len(data), block_size, hashlib.sha256(data).digest())
+        ]
+        self.copy = None
+        self.literal_bytes = 0
+
+    def add_copy(self, index):
+        if self.copy and self.copy[0] + self.copy[1] == index:
+            self.copy[1] += 1
+        else:
+            self._flush_copy()
+            self.copy = [index, 1]
+
+    def add_literal(self, start, end):
+        if start == end:
+            return
+        self._flush_copy()
+        self.parts.append(LITERAL_OP.pack(b"L", end - start))
+        self.parts.append(self.data[start:end])
+        self.literal_bytes += end - start
+
+    def getvalue(self):
+        self._flush_copy()
+        return b"".join(self.parts)
+
+    def _flush_copy(self):
+        if self.copy:
+            self.parts.append(COPY_OP.pack(b"C", *self.copy))
+            self.copy = None
+
+
+def delta(data, sig, max_literal_ratio=1.0):
+    """Returns the instructions to rebuild data from the file the signature was taken of.
+    Raises DeltaTooLarge if more than `max_literal_ratio` of the data has to be sent as
+    literal bytes."""
+    block_size, blocks = parse_signature(sig)
+    writer = DeltaWriter(data, block_size)
+    size = len(data)
+    max_literal = max_literal_ratio * size
+    md5 = hashlib.md5
+
+    def find(offset, length, weak):
+        candidates = blocks.get(weak)
+        if candidates:
+            strong = md5(data[offset : offset + length]).digest()
+            for index, block_strong, block_length in candidates:
+                if block_strong == strong and block_length == length:
+                    return index
+        return None
+
+    def aligned_match(start, stop):
+        for offset in range(start, min(stop, size), block_size):
+            length = min(block_size, size - offset)
+            weak = zlib.adler32(data[offset : offset + length])
+            if find(offset, length, weak) is not None:
+                return offset
+        return None
+
+    pos = 0
+    literal_start = 0
+    while pos < size:
+        # fast path, check the block starting at the current offset
+        length = min(block_size, size - pos)
+        weak = zlib.adler32(data[pos : pos + length])
+        index = find(pos, length, weak)
+        if index is not None:
+            writer.add_literal(literal_start, pos)
+            writer.add_copy(index)
+            pos += length
+            literal_start = pos
+            continue
+        if length < block_size:
+            break
+
+        # if one of the following blocks matches, the data was changed in place, so
+        # there's no need to search for shifted data
+        next_pos = aligned_match(pos + block_size, pos + 3 * block_size)
+        if next_pos is not None:
+            pos = next_pos
+            continue
+
+        # slow path, roll the checksum a byte at a time for up to a block looking for
+        # the next match, for instance after bytes were inserted
+        a = weak & 0xFFFF
+        b = weak >> 16
+        end = min(pos + block_size, size - block_size)
+        found = None
+        k = pos
+        while k < end:
+            out_byte = data[k]
+            a = (a - out_byte + data[k + block_size]) % MOD_ADLER
+            b = (b + a - 1 - block_size * out_byte) % MOD_ADLER
+            k += 1
+            weak = a | (b << 16)
+            if weak in blocks:
+                found = find(k, block_size, weak)
+                if found is not None:
+                    break
+        if found is None:
+            pos = end if end > pos else pos + block_size
+        else:
+            writer.add_literal(literal_start, k)
+            writer.add_copy(found)
+            pos = k + block_size
+            literal_start = pos
+
+        literal = writer.literal_bytes + pos - literal_start
+        if literal > max_literal or (
+            pos > size // 32
+            and pos > 8 * block_size
+            and literal > max_literal * pos / size
+        ):
+            raise DeltaTooLarge(f"{literal} of {pos} bytes differ")
+
+    writer.add_literal(literal_start, size)
+    if writer.literal_bytes > max_literal:
+        raise DeltaTooLarge(f"{writer.literal_bytes} of {size} bytes differ")
+    return writer.getvalue()
+
+
+def apply(path, instructions):
+    """Rebuilds the file at path from the instructions, replacing it once the result has
+    been verified."""
+    size, block_size, digest = DELTA_HEADER.unpack_from(instructions)
+    tmp_path = f"{path}.delta.{os.getpid()}"
+    hasher = hashlib.sha256()
+    written = 0
+    try:
+        with open(path, "rb") as old, open(tmp_path, "wb") as new:
+            offset = DELTA_HEADER.size
+            view = memoryview(instructions)
+            while offset < len(instructions):
+                op = instructions[offset : offset + 1]
+                if op == b"C":
+                    _, index, count = COPY_OP.unpack_from(instructions, offset)
+                    offset += COPY_OP.size
+                    old.seek(index * block_size)
+                    chunk = old.read(count * block_size)
+                elif op == b"L":
+                    _, length = LITERAL_OP.unpack_from(instructions, offset)
+                    offset += LITERAL_OP.size
+                    chunk = view[offset : offset + length]
+                    offset += length
+                else:
+                    raise DeltaError(f"unknown instruction {op!r}")
+                hasher.update(chunk)
+                new.write(chunk)
+                written += len(chunk)
+        if written != size or hasher.digest() != digest:
+            raise DeltaError("the rebuilt file doesn't match")
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def command(mode, *args):
+    """Returns a shell command running this module remotely with python3."""
+    with open(os.path.abspath(__file__)) as fh:
+        source = fh.read()
+    quoted_args = " ".join(shlex.quote(str(arg)) for arg in args)
+    return f"python3 -c {shlex.quote(source)} {mode} {quoted_args}"
+
+
+def map_file(fh):
+    """Maps a file into memory, or reads it if it's empty, which can't be mapped."""
+    if os.fstat(fh.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def main(argv):
+    mode, path = argv[1], argv[2]
+    if not os.path.isfile(path):
+        return EXIT_MISSING
+    if mode == "signature":
+        with open(path, "rb") as fh:
+            sys.stdout.buffer.write(signature(map_file(fh), int(argv[3])))
+    elif mode == "delta":
+        sig = sys.stdin.buffer.read()
+        with open(path, "rb") as fh:
+            try:
+                out = delta(map_file(fh), sig, float(argv[3]))
+            except DeltaTooLarge:
+                return EXIT_TOO_LARGE
+        sys.stdout.buffer.write(out)
+    elif mode == "apply":
+        try:
+            apply(path, sys.stdin.buffer.read())
+        except DeltaError:
+            return EXIT_MISMATCH
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -13,7 +13,7 @@ class Docs:
         templateEnv = jinja2.Environment(loader=templateLoader)
         template = templateEnv.get_template("task.md.j2")
         tasks = []
-        for task in self.app.loader.each_task():
+        for task in self.app.manifest.each_task():
             if task.nodoc:
                 continue
             desc = task.desc()
@@ -15,6 +15,15 @@ class ExecutionResult:
         self.result = result
         self.exception = exception
 
+    def status(self) -> str:
+        """One of passed, failed (an AssertionError was raised) or errored."""
+        if self.exception and isinstance(self.exception, AssertionError):
+            return "failed"
+        elif self.exception:
+            return "errored"
+        else:
+            return "passed"
+
 
 class ResultsList:
     def __init__(self):
@@ -25,21 +34,37 @@ class ResultsList:
 
     def append(self, result):
         self.results.append(result)
-
-        if result.exception and isinstance(result.exception, AssertionError):
-            self.failed.append(result)
-        elif result.exception:
-            self.errored.append(result)
-        else:
-            self.passed.append(result)
+        getattr(self, result.status()).append(result)
 
 
 class Executor:
-    def __init__(self, provider, concurrency=100):
+    """Runs a function against every context given by a provider. At most `concurrency`
+    contexts are worked on at once. `connect_concurrency` limits how many contexts may be
+    entered (for instance, performing an SSH handshake) at once, and `command_concurrency`
+    limits how many shell commands may be in flight across all contexts.
+
+    Results are appended to `sink` as each context finishes. By default they are collected
+    in a `ResultsList`, but any object with an `append` method can be used, such as a
+    `pitcrew.util.ResultsStreamer` to write them out as they arrive."""
+
+    def __init__(
+        self,
+        provider,
+        concurrency=100,
+        connect_concurrency=None,
+        command_concurrency=None,
+        sink=None,
+    ):
         self.provider = provider
         self.concurrency = concurrency
         self.queue = asyncio.Queue(maxsize=self.concurrency)
-        self.results = ResultsList()
+        self.connect_semaphore = (
+            asyncio.Semaphore(connect_concurrency) if connect_concurrency else None
+        )
+        self.command_semaphore = (
+            asyncio.Semaphore(command_concurrency) if command_concurrency else None
+        )
+        self.results = ResultsList() if sink is None else sink
         self.workers = []
 
     async def run_task(self, task, *args, **kwargs) -> ResultsList:
@@ -73,26 +98,44 @@ class Executor:
         try:
             while True:
                 item = await self.queue.get()
+                previous_semaphore = item.context.command_semaphore
+                if self.command_semaphore:
+                    item.context.command_semaphore = self.command_semaphore
                 try:
-                    async with item.context:
-                        try:
-                            result = await item.context.invoke(
-                                item.fn, *item.args, **item.kwargs
-                            )
-                            self.results.append(
-                                ExecutionResult(item.context, result, None)
-                            )
-                        except Exception as e:
-                            self.results.append(ExecutionResult(item.context, None, e))
+                    await self._enter_context(item.context)
+                    try:
+                        result = await item.context.invoke(
+                            item.fn, *item.args, **item.kwargs
+                        )
+                        self._append(ExecutionResult(item.context, result, None))
+                    except Exception as e:
+                        self._append(ExecutionResult(item.context, None, e))
+                    finally:
+                        await item.context.__aexit__(None, None, None)
                 except Exception as e:
-                    self.results.append(ExecutionResult(item.context, None, e))
+                    self._append(ExecutionResult(item.context, None, e))
                 finally:
+                    item.context.command_semaphore = previous_semaphore
                     self.queue.task_done()
         except asyncio.CancelledError:
             pass
 
+    def _append(self, result):
+        self.results.append(result)
+        for hook in result.context.app.hooks.on_result:
+            hook(result)
+
+    async def _enter_context(self, context):
+        if self.connect_semaphore is None:
+            with context.app.hooks.connect(context):
+                return await context.__aenter__()
+        async with self.connect_semaphore:
+            with context.app.hooks.connect(context):
+                return await context.__aenter__()
+
     async def _start_provider_enquerer(self, fn, *args, **kwargs):
         async with self.provider:
             async for context in self.provider:
                 await self.queue.put(WorkItem(context, fn, args, kwargs))
-                self._start_worker()
+                if len(self.workers) < self.concurrency:
+                    self._start_worker()
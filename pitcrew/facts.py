@@ -0,0 +1,128 @@
+"""Facts are tasks which describe a host, such as `facts.system.uname`. Their returns are
+kept on the context for its lifetime and persisted to a small SQLite database within the
+crew directory, keyed by the identity of the host, so later runs don't need to probe the
+host again until the fact expires. Facts are written out in a single transaction when the
+app exits, rather than syncing the database to disk as each one is learned.
+
+When a context is first used, a single probe script is run to find the user commands run
+as along with the most common facts about the system, rather than running a separate
+command for each one.
+"""
+
+import os
+import time
+import json
+import shlex
+import sqlite3
+
+FACT_TTL = 86400
+
+PROBE_SCRIPT = """
+echo "user=$(whoami)"
+echo "kernel=$(uname -s)"
+echo "kernel_release=$(uname -r)"
+echo "machine=$(uname -m)"
+if [ -r /etc/os-release ]; then
+  (. /etc/os-release; echo "os_id=$ID"; echo "os_version=$VERSION_ID")
+elif command -v sw_vers >/dev/null 2>&1; then
+  echo "os_id=macos"; echo "os_version=$(sw_vers -productVersion)"
+fi
+echo "cpu_count=$(nproc 2>/dev/null || getconf _NPROCESSORS_ONLN 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null)"
+if [ -r /proc/meminfo ]; then
+  echo "memory_kb=$(awk '/^MemTotal:/ { print $2 }' /proc/meminfo)"
+else
+  echo "memory_kb=$(($(sysctl -n hw.memsize 2>/dev/null || echo 0) / 1024))"
+fi
+for pm in apt-get dnf yum apk pacman zypper brew; do
+  if command -v $pm >/dev/null 2>&1; then echo "package_manager=$pm"; break; fi
+done
+"""
+
+PROBE_COMMAND = f"/bin/sh -c {shlex.quote(PROBE_SCRIPT)}"
+
+
+def parse_probe(output) -> dict:
+    """Parses the output of the probe script into a dict of facts."""
+    info = {}
+    for line in output.splitlines():
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        value = value.strip()
+        if key in ("cpu_count", "memory_kb"):
+            value = int(value) if value.isdigit() else None
+        info[key] = value
+    return info
+
+
+class FactStore:
+    def __init__(self, path, refresh=False):
+        self.path = path
+        self.refresh = refresh
+        self.db = None
+        # (identity, name) => (encoded value, expires_at) of facts not yet written out
+        self.pending = {}
+
+    def load(self, identity) -> dict:
+        """Returns a dict of the unexpired facts known for the host identity."""
+        if self.refresh:
+            return {}
+        now = time.time()
+        try:
+            rows = self._connect().execute(
+                "SELECT name, value FROM facts WHERE identity = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (identity, now),
+            )
+            facts = {name: json.loads(value) for name, value in rows}
+        except sqlite3.Error:
+            facts = {}
+        for (pending_identity, name), (value, expires_at) in self.pending.items():
+            if pending_identity == identity and (
+                expires_at is None or expires_at > now
+            ):
+                facts[name] = json.loads(value)
+        return facts
+
+    def save(self, identity, name, value, ttl=None):
+        """Persists a fact for the host identity once the store is flushed. Facts which
+        can't be encoded as json are not persisted."""
+        try:
+            encoded = json.dumps(value)
+        except TypeError:
+            return
+        expires_at = None if ttl is None else time.time() + ttl
+        self.pending[(identity, name)] = (encoded, expires_at)
+
+    def flush(self):
+        """Writes out the facts saved since the last flush in a single transaction."""
+        if not self.pending:
+            return
+        rows = [
+            (identity, name, encoded, expires_at)
+            for (identity, name), (encoded, expires_at) in self.pending.items()
+        ]
+        self.pending = {}
+        try:
+            db = self._connect()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO facts (identity, name, value, expires_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        self.flush()
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path, timeout=5)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS facts (identity TEXT, name TEXT, value TEXT, expires_at REAL, PRIMARY KEY (identity, name))"
+            )
+        return self.db
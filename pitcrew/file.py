@@ -7,13 +7,96 @@ context, this would copy from the local filesystem to that destination:
 
 For convenience `owner`, `group` and `mode` arguments are available on the `copy_to` method to
 allow setting those attributes post-copy.
+
+Copying a directory with `archive=True` between the local machine and an SSH or Docker
+context streams a tar archive of the directory, gzipped if `compress=True`, over a single
+command and extracts it into the destination, creating it if needed. The `owner`, `group`
+and `mode` are applied recursively by that same command, with directories also given the
+search bit wherever a numeric `mode` lets them be read, so they can still be entered.
+
+Passing `delta=True` when copying a file between the local machine and an SSH or Docker
+context only sends the parts of the file which differ from the existing destination file.
+This needs python3 on the remote host, and falls back to copying the whole file if it is
+missing, the destination doesn't exist yet or too much of the file has changed.
+
+Passing `skip_if_same=True` compares the sha256 digests of the source and destination first,
+and skips the copy if they are identical. Digests of local files are cached for as long as
+the file's inode, size and modification time are unchanged, so copying one file to many
+hosts only hashes it once.
+
+A local file can be copied to many destinations at once with `copy_to_many`, which reads
+the file once into a shared memory-mapped buffer and streams it to a bounded number of
+destinations at a time. With `relay=True`, SSH hosts which have received the file forward
+it to the remaining hosts over their own SSH connections, so the controller's uplink isn't
+used for every host. Hosts reached through a tunnel, or with keys, known hosts or
+credentials given to their context, are always sent the file from this machine, as `ssh`
+on another host can't connect to them the same way.
+
+Files copied between two remote contexts, such as two SSH hosts or a host and a container,
+are streamed through this machine a chunk at a time rather than staged on its disk. With
+`direct=True`, copies between two SSH hosts first try running `ssh` on the source host to
+send the file straight to the destination, and only stream it through this machine if
+that fails or the destination can't be relayed to.
+
+Passing `sftp=True` when copying a file between the local machine and an SSH host copies it
+over SFTP instead of scp, keeping `SFTP_PARALLELISM` requests of `SFTP_CHUNK_SIZE` bytes
+in flight at once over `SFTP_CHANNELS` channels, so a single large file can fill a link
+with a high latency. The `parallelism`, `chunk_size` and `channels` arguments of `copy_to`
+override these. The file is hashed as it's transferred and checked against the sha256
+digest of the file on the remote host.
 """
 
 import os
-import asyncssh
-from pitcrew.logger import logger
+import asyncio
+import hashlib
+import contextlib
+import collections
+from pitcrew import delta as delta_transfer
+from pitcrew import hooks
 from abc import ABC
 
+# tasks whose memoized returns are made stale by copying over a path
+COPY_INVALIDATES = ["fs.stat", "fs.digests.sha256", "fs.digests.md5"]
+MMAP_THRESHOLD = 1024 * 1024
+FANOUT_CHUNK_SIZE = 256 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+SFTP_CHUNK_SIZE = 256 * 1024
+SFTP_PARALLELISM = 32
+SFTP_CHANNELS = 4
+RELAY_SSH_OPTIONS = "-o BatchMode=yes"
+
+local_digests = {}
+
+
+def cached_local_sha256(path):
+    """Returns the cached sha256 digest of a local file, or None if the file has changed
+    since it was last hashed."""
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    cached = local_digests.get(real_path)
+    if cached and cached[0] == (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+        return cached[1]
+    return None
+
+
+def local_sha256(path) -> str:
+    """Returns the sha256 digest of a local file, cached by the file's inode, size and
+    modification time."""
+    digest = cached_local_sha256(path)
+    if digest:
+        return digest
+    real_path = os.path.realpath(path)
+    hasher = hashlib.sha256()
+    with open(real_path, "rb") as fh:
+        stat = os.fstat(fh.fileno())
+        if stat.st_size > MMAP_THRESHOLD:
+            hasher.update(delta_transfer.map_file(fh))
+        else:
+            hasher.update(fh.read())
+    digest = hasher.hexdigest()
+    local_digests[real_path] = ((stat.st_ino, stat.st_size, stat.st_mtime_ns), digest)
+    return digest
+
 
 class File(ABC):
     """Abstract base class for file-based operations"""
@@ -25,19 +108,100 @@ class File(ABC):
     def __str__(self):
         return f"{self.context.descriptor()}:{self.path}"
 
-    async def copy_to(self, dest, archive=False, owner=None, group=None, mode=None):
-        """Copies a file from the source to the destination."""
-        with logger.with_copy(self, dest):
+    async def copy_to(
+        self,
+        dest,
+        archive=False,
+        owner=None,
+        group=None,
+        mode=None,
+        delta=False,
+        skip_if_same=False,
+        compress=False,
+        direct=False,
+        sftp=False,
+        chunk_size=None,
+        parallelism=None,
+        channels=None,
+    ) -> bool:
+        """Copies a file from the source to the destination. Returns False if the copy was
+        skipped as the destination was already identical. `chunk_size`, `parallelism` and
+        `channels` tune copies made with `sftp=True`, defaulting to `SFTP_CHUNK_SIZE`,
+        `SFTP_PARALLELISM` and `SFTP_CHANNELS`."""
+        with dest.context.app.hooks.copy(self, dest):
             pair = (self.__class__, dest.__class__)
-            if pair in copiers:
-                await copiers[pair](self, dest, archive=archive)
+            if archive and pair in tar_copiers and await self.is_directory():
+                await tar_copiers[pair](
+                    self, dest, compress=compress, owner=owner, group=group, mode=mode
+                )
+                dest.context.invalidate()
+                return True
+            elif pair in copiers:
+                copied = not (skip_if_same and not archive and await self.same_as(dest))
+                if copied:
+                    sftp_args = dict(
+                        chunk_size=chunk_size,
+                        parallelism=parallelism,
+                        channels=channels,
+                    )
+                    await self._copy(
+                        dest, pair, archive, delta, direct, sftp, sftp_args
+                    )
+                    dest.context.invalidate(COPY_INVALIDATES, subject=dest.path)
                 if owner:
                     await dest.context.fs.chown(dest.path, owner, group=group)
                 if mode:
                     await dest.context.fs.chmod(dest.path, mode)
+                return copied
             else:
                 raise Exception(f"cannot find a copier for {pair}")
 
+    async def _copy(self, dest, pair, archive, delta, direct, sftp, sftp_args):
+        if not archive:
+            if (
+                delta
+                and pair in delta_copiers
+                and await delta_copiers[pair](self, dest)
+            ):
+                return
+            if (
+                direct
+                and pair in direct_copiers
+                and await direct_copiers[pair](self, dest)
+            ):
+                return
+            if sftp and pair in sftp_copiers:
+                await sftp_copiers[pair](self, dest, **sftp_args)
+                return
+        await copiers[pair](self, dest, archive=archive)
+
+    async def is_directory(self) -> bool:
+        return await self.context.fs.is_directory(self.path)
+
+    def chunks(self, chunk_size=READ_CHUNK_SIZE, acquire=True):
+        """Returns an async iterator over the content of the file, a chunk at a time. See
+        `Context.sh_stream` for `acquire`."""
+        return self.context.sh_stream(
+            f"cat {self.context.esc(self.path)}", chunk_size=chunk_size, acquire=acquire
+        )
+
+    async def sha256(self) -> str:
+        """Returns the sha256 digest of the file in hexadecimal."""
+        return await self.context.fs.digests.sha256(self.path)
+
+    async def file_sha256(self):
+        """Returns the sha256 digest of the file in hexadecimal, or None if it isn't a
+        file, finding both with a single probe."""
+        (probe,) = await self.context.fs.probe(self.path, digest=True)
+        return probe.sha256 if probe.type == "file" else None
+
+    async def same_as(self, other) -> bool:
+        """Indicates if the other file exists and has the same content as this one."""
+        digest = await other.file_sha256()
+        if digest is None:
+            return False
+        return await self.sha256() == digest
+
 
 class LocalFile(File):
     """A reference to a file on the local machine executing pitcrew"""
@@ -46,6 +210,99 @@ class LocalFile(File):
         self.context = context
         self.path = os.path.expanduser(path)
 
+    async def is_directory(self) -> bool:
+        return os.path.isdir(self.path)
+
+    async def chunks(self, chunk_size=READ_CHUNK_SIZE, acquire=True):
+        with open(self.path, "rb") as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def sha256(self) -> str:
+        digest = cached_local_sha256(self.path)
+        if digest:
+            return digest
+        # hashing large files in a thread keeps other contexts running meanwhile
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, local_sha256, self.path)
+
+    async def file_sha256(self):
+        if not os.path.isfile(self.path):
+            return None
+        return await self.sha256()
+
+    async def copy_to_many(
+        self,
+        dests,
+        concurrency=10,
+        relay=False,
+        chunk_size=FANOUT_CHUNK_SIZE,
+        relay_ssh_options=RELAY_SSH_OPTIONS,
+    ) -> list:
+        """Copies a file to many destinations, copying to at most `concurrency` of them
+        from this machine at a time. If `relay` is set, SSH hosts which have received the
+        file also copy it on to other SSH hosts using the `ssh` command, with the given
+        options. Returns a list with None for each destination copied successfully, or
+        the exception raised copying to it."""
+        results = [None] * len(dests)
+        senders = asyncio.Queue()
+        for _ in range(min(concurrency, len(dests))):
+            senders.put_nowait(self)
+        # bounds the copies streamed from this machine, including those made in place of
+        # a relay which failed
+        uploads = asyncio.Semaphore(concurrency)
+
+        with open(self.path, "rb") as fh:
+            buffer = delta_transfer.map_file(fh)
+
+        async def upload(dest):
+            async with uploads:
+                await self._stream_to(buffer, dest, chunk_size)
+
+        async def send(index, dest, sender):
+            try:
+                if (
+                    sender is not self
+                    and isinstance(dest, SSHFile)
+                    and relayable(dest.context)
+                ):
+                    try:
+                        await relay_copier(sender, dest, relay_ssh_options)
+                    except Exception:
+                        # the relay host couldn't reach the destination, so it won't
+                        # be used for any others
+                        sender = None
+                        await upload(dest)
+                else:
+                    await upload(dest)
+                if relay and isinstance(dest, SSHFile):
+                    senders.put_nowait(dest)
+            except Exception as e:
+                results[index] = e
+            finally:
+                if sender:
+                    senders.put_nowait(sender)
+
+        tasks = []
+        for index, dest in enumerate(dests):
+            sender = await senders.get()
+            tasks.append(asyncio.ensure_future(send(index, dest, sender)))
+        await asyncio.gather(*tasks)
+        return results
+
+    async def _stream_to(self, buffer, dest, chunk_size):
+        async def chunks():
+            for offset in range(0, len(buffer), chunk_size):
+                yield buffer[offset : offset + chunk_size]
+
+        with dest.context.app.hooks.copy(self, dest):
+            ctx = dest.context
+            await ctx.sh(f"cat > {ctx.esc(dest.path)}", stdin=counted(chunks()))
+            ctx.invalidate(COPY_INVALIDATES, subject=dest.path)
+
 
 class DockerFile(File):
     """A reference to a file on a Docker container"""
@@ -59,6 +316,20 @@ class SSHFile(File):
     pass
 
 
+def transferred_local(path):
+    """Records the size of a local file as the bytes transferred by the current copy."""
+    if os.path.isfile(path):
+        hooks.transferred(os.path.getsize(path))
+
+
+async def counted(chunks):
+    """Passes chunks through, recording their size as the bytes transferred by the current
+    copy."""
+    async for chunk in chunks:
+        hooks.transferred(len(chunk))
+        yield chunk
+
+
 async def local_to_local_copier(src, dest, archive=False):
     ctx = src.context
     command = "cp"
@@ -66,20 +337,27 @@ async def local_to_local_copier(src, dest, archive=False):
         command += " -a"
     command += f" {ctx.esc(src.path)} {ctx.esc(dest.path)}"
     await ctx.sh(command)
+    transferred_local(dest.path)
 
 
 async def ssh_to_local_copier(src, dest, archive=False):
+    import asyncssh
+
     ctx = src.context
     await asyncssh.scp(
-        (ctx.connection, src.path), dest.path, recursive=archive, preserve=archive
+        (ctx.connection, src.path), dest.path, recurse=archive, preserve=archive
     )
+    transferred_local(dest.path)
 
 
 async def local_to_ssh_copier(src, dest, archive=False):
+    import asyncssh
+
     ctx = dest.context
     await asyncssh.scp(
-        src.path, (ctx.connection, dest.path), recursive=archive, preserve=archive
+        src.path, (ctx.connection, dest.path), recurse=archive, preserve=archive
     )
+    transferred_local(src.path)
 
 
 async def docker_to_local_copier(src, dest, archive=False):
@@ -91,6 +369,7 @@ async def docker_to_local_copier(src, dest, archive=False):
         f" {ctx.esc(src.context.container_id)}:{ctx.esc(src.path)} {ctx.esc(dest.path)}"
     )
     await ctx.sh(command)
+    transferred_local(dest.path)
 
 
 async def local_to_docker_copier(src, dest, archive=False):
@@ -100,7 +379,294 @@ async def local_to_docker_copier(src, dest, archive=False):
         command += " -a"
     command += f" {ctx.esc(src.path)} {ctx.esc(dest.context.container_id)}:{ctx.esc(dest.path)}"
     await ctx.sh(command)
+    transferred_local(src.path)
+
+
+def local_delta(path, sig, max_literal_ratio):
+    with open(path, "rb") as fh:
+        return delta_transfer.delta(delta_transfer.map_file(fh), sig, max_literal_ratio)
+
+
+def local_signature(path, block_size):
+    with open(path, "rb") as fh:
+        return delta_transfer.signature(delta_transfer.map_file(fh), block_size)
+
+
+async def local_to_remote_delta_copier(src, dest, max_literal_ratio=0.5):
+    """Sends a delta of the local file against the remote file's signatures. Returns False
+    if the delta couldn't be used."""
+    ctx = dest.context
+    if not os.path.isfile(src.path):
+        return False
+    block_size = delta_transfer.block_size_for(os.path.getsize(src.path))
+    code, sig, _ = await ctx.sh_with_code(
+        delta_transfer.command("signature", dest.path, block_size)
+    )
+    if code != 0:
+        return False
+    # matching blocks is CPU bound, so it runs in a thread to keep other contexts going
+    loop = asyncio.get_event_loop()
+    try:
+        instructions = await loop.run_in_executor(
+            None, local_delta, src.path, sig, max_literal_ratio
+        )
+    except delta_transfer.DeltaTooLarge:
+        return False
+    code, _, _ = await ctx.sh_with_code(
+        delta_transfer.command("apply", dest.path), stdin=instructions
+    )
+    hooks.transferred(len(sig) + len(instructions))
+    return code == 0
+
+
+async def remote_to_local_delta_copier(src, dest, max_literal_ratio=0.5):
+    """Sends the signatures of the local file to have a delta computed against the remote
+    file. Returns False if the delta couldn't be used."""
+    ctx = src.context
+    if not os.path.isfile(dest.path):
+        return False
+    block_size = delta_transfer.block_size_for(os.path.getsize(dest.path))
+    # hashing the blocks and rebuilding the file run in a thread, as sha256 does
+    loop = asyncio.get_event_loop()
+    sig = await loop.run_in_executor(None, local_signature, dest.path, block_size)
+    code, instructions, _ = await ctx.sh_with_code(
+        delta_transfer.command("delta", src.path, max_literal_ratio), stdin=sig
+    )
+    if code != 0:
+        return False
+    hooks.transferred(len(sig) + len(instructions))
+    try:
+        await loop.run_in_executor(None, delta_transfer.apply, dest.path, instructions)
+    except delta_transfer.DeltaError:
+        return False
+    return True
+
+
+delta_copiers = {
+    (LocalFile, SSHFile): local_to_remote_delta_copier,
+    (LocalFile, DockerFile): local_to_remote_delta_copier,
+    (SSHFile, LocalFile): remote_to_local_delta_copier,
+    (DockerFile, LocalFile): remote_to_local_delta_copier,
+}
+
+
+async def pipelined(offsets, request, handle, parallelism):
+    """Calls request with each offset, keeping up to `parallelism` requests outstanding,
+    and calls handle with each offset and its result in order."""
+    pending = collections.deque()
+    try:
+        for offset in offsets:
+            pending.append((offset, asyncio.ensure_future(request(offset))))
+            if len(pending) >= parallelism:
+                offset, future = pending.popleft()
+                handle(offset, await future)
+        while pending:
+            offset, future = pending.popleft()
+            handle(offset, await future)
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+async def open_sftp_files(stack, ctx, path, mode, channels, chunk_size):
+    """Opens a file over several SFTP channels at once. A file opened for writing is
+    created over the first channel before the others open it for updating."""
+
+    async def open_file(mode):
+        sftp = await stack.enter_async_context(ctx.connection.start_sftp_client())
+        return await stack.enter_async_context(
+            sftp.open(path, mode, block_size=chunk_size)
+        )
+
+    files = []
+    if mode == "wb":
+        files.append(await open_file(mode))
+        mode = "r+b"
+    files.extend(
+        await asyncio.gather(*[open_file(mode) for _ in range(channels - len(files))])
+    )
+    return files
+
+
+async def sftp_copier(src, dest, chunk_size=None, parallelism=None, channels=None):
+    """Copies a file between the local machine and an SSH host over SFTP with many reads or
+    writes in flight at once, spread over several channels as each channel's window limits
+    how much of it can be in flight. The copy is verified against the sha256 digest of the
+    remote file."""
+    chunk_size = chunk_size or SFTP_CHUNK_SIZE
+    parallelism = parallelism or SFTP_PARALLELISM
+    channels = channels or SFTP_CHANNELS
+    hasher = hashlib.sha256()
+    async with contextlib.AsyncExitStack() as stack:
+        if isinstance(src, LocalFile):
+            ctx = dest.context
+            fh = stack.enter_context(open(src.path, "rb"))
+            buffer = delta_transfer.map_file(fh)
+            remotes = await open_sftp_files(
+                stack, ctx, dest.path, "wb", channels, chunk_size
+            )
+
+            def write(offset):
+                chunk = buffer[offset : offset + chunk_size]
+                hasher.update(chunk)
+                remote = remotes[offset // chunk_size % channels]
+                return remote.write(chunk, offset)
+
+            await pipelined(
+                range(0, len(buffer), chunk_size),
+                write,
+                lambda offset, written: None,
+                parallelism,
+            )
+            hooks.transferred(len(buffer))
+            # the remote file is closed before it's hashed
+            await stack.aclose()
+            ctx.invalidate(COPY_INVALIDATES, subject=dest.path)
+            remote_digest = await ctx.fs.digests.sha256(dest.path)
+        else:
+            ctx = src.context
+            remotes = await open_sftp_files(
+                stack, ctx, src.path, "rb", channels, chunk_size
+            )
+            size = (await remotes[0].stat()).size
+            fh = stack.enter_context(open(dest.path, "wb"))
+            # the remote file is hashed while it's being read
+            digest_future = asyncio.ensure_future(ctx.fs.digests.sha256(src.path))
+
+            def read(offset):
+                remote = remotes[offset // chunk_size % channels]
+                return remote.read(min(chunk_size, size - offset), offset)
+
+            def write(offset, chunk):
+                if len(chunk) != min(chunk_size, size - offset):
+                    raise Exception(f"{src} changed while it was being copied")
+                hasher.update(chunk)
+                fh.write(chunk)
+
+            try:
+                await pipelined(range(0, size, chunk_size), read, write, parallelism)
+            except BaseException:
+                digest_future.cancel()
+                raise
+            hooks.transferred(size)
+            remote_digest = await digest_future
+    if hasher.hexdigest() != remote_digest:
+        raise Exception(f"{dest} doesn't match {src} after copying")
+
+
+sftp_copiers = {
+    (LocalFile, SSHFile): sftp_copier,
+    (SSHFile, LocalFile): sftp_copier,
+}
+
 
+# connection arguments which don't change how the destination host is reached
+RELAY_IGNORED_ARGS = {"agent_forwarding", "agent_path"}
+
+
+def relayable(ctx):
+    """Indicates if the ssh command, run on another host, could connect as the SSH context
+    does. It can't if the context connects through a tunnel or with keys, known hosts or
+    credentials of its own, which the command wouldn't know of."""
+    return all(
+        value is None or name in RELAY_IGNORED_ARGS
+        for name, value in ctx.connection_kwargs.items()
+    )
+
+
+async def relay_copier(src, dest, ssh_options=RELAY_SSH_OPTIONS):
+    """Copies a file from one SSH host to another by running ssh on the source host. Raises
+    an exception if the destination isn't `relayable`."""
+    with dest.context.app.hooks.copy(src, dest):
+        await relay(src, dest, ssh_options)
+
+
+async def relay(src, dest, ssh_options):
+    """Does the work of `relay_copier`, for copiers already within a copy span."""
+    if not relayable(dest.context):
+        raise Exception(f"cannot relay to {dest}, which needs its own connection args")
+    ctx = src.context
+    dest_ctx = dest.context
+    remote_command = f"cat > {dest_ctx.esc(dest.path)}"
+    await ctx.sh(
+        f"ssh {ssh_options} -p {int(dest_ctx.port)} "
+        f"{ctx.esc(dest_ctx.login_user)}@{ctx.esc(dest_ctx.host)} "
+        f"{ctx.esc(remote_command)} < {ctx.esc(src.path)}"
+    )
+    dest_ctx.invalidate(COPY_INVALIDATES, subject=dest.path)
+
+
+def directory_mode(mode):
+    """Adds the search bit to a numeric mode wherever it grants read, as directories can't
+    be entered without it. Symbolic modes are returned as is."""
+    if not (3 <= len(mode) <= 4 and all(c in "01234567" for c in mode)):
+        return mode
+    special, perms = mode[:-3], mode[-3:]
+    return special + "".join(str(int(c) | 1 if int(c) & 4 else int(c)) for c in perms)
+
+
+async def tar_copier(src, dest, compress=False, owner=None, group=None, mode=None):
+    """Copies the contents of a directory by piping a tar archive from the source context
+    into the destination context, setting the owner and mode in the same command."""
+    src_ctx = src.context
+    dest_ctx = dest.context
+    flags = "z" if compress else ""
+    esc_dest = dest_ctx.esc(dest.path)
+    extract = f"mkdir -p {esc_dest} && tar -x{flags}pf - -C {esc_dest}"
+    if owner:
+        owner_str = f"{owner}:{group}" if group else owner
+        extract += f" && chown -R {dest_ctx.esc(owner_str)} {esc_dest}"
+    if mode:
+        for kind, kind_mode in [("f", mode), ("d", directory_mode(mode))]:
+            extract += (
+                f" && find {esc_dest} -type {kind}"
+                f" -exec chmod {dest_ctx.esc(kind_mode)} {{}} +"
+            )
+    # the extracting command holds the slot of the command semaphore for both
+    archive = src_ctx.sh_stream(
+        f"tar -c{flags}f - -C {src_ctx.esc(src.path)} .", acquire=False
+    )
+    await dest_ctx.sh(extract, stdin=counted(archive))
+
+
+async def stream_copier(src, dest, archive=False):
+    """Copies a file between two contexts by piping it through this machine, holding at
+    most a few chunks of it in memory at a time."""
+    src_ctx = src.context
+    dest_ctx = dest.context
+    # the writing command holds the slot of the command semaphore for both
+    chunks = src_ctx.sh_stream(f"cat {src_ctx.esc(src.path)}", acquire=False)
+    await dest_ctx.sh(f"cat > {dest_ctx.esc(dest.path)}", stdin=counted(chunks))
+    if archive:
+        stat = await src_ctx.fs.stat(src.path)
+        await dest_ctx.fs.chmod(dest.path, stat.mode[-4:])
+
+
+async def direct_copier(src, dest):
+    """Copies a file straight from one SSH host to another. Returns False if the source
+    host couldn't connect to the destination."""
+    if not relayable(dest.context):
+        return False
+    try:
+        # copy_to has already opened the copy span
+        await relay(src, dest, RELAY_SSH_OPTIONS)
+    except Exception:
+        return False
+    return True
+
+
+direct_copiers = {(SSHFile, SSHFile): direct_copier}
+
+tar_copiers = {
+    (LocalFile, SSHFile): tar_copier,
+    (SSHFile, LocalFile): tar_copier,
+    (LocalFile, DockerFile): tar_copier,
+    (DockerFile, LocalFile): tar_copier,
+    (SSHFile, SSHFile): tar_copier,
+    (SSHFile, DockerFile): tar_copier,
+    (DockerFile, SSHFile): tar_copier,
+    (DockerFile, DockerFile): tar_copier,
+}
 
 copiers = {
     (LocalFile, LocalFile): local_to_local_copier,
@@ -108,4 +674,8 @@ copiers = {
     (LocalFile, SSHFile): local_to_ssh_copier,
     (DockerFile, LocalFile): docker_to_local_copier,
     (LocalFile, DockerFile): local_to_docker_copier,
+    (SSHFile, SSHFile): stream_copier,
+    (SSHFile, DockerFile): stream_copier,
+    (DockerFile, SSHFile): stream_copier,
+    (DockerFile, DockerFile): stream_copier,
 }
@@ -0,0 +1,143 @@
+"""Hooks let plugins observe what an app is doing. A plugin is any object with methods
+named after the hooks it wants, and is registered with `app.hooks.register(plugin)`.
+The logger is registered by every app, and `crew run --trace` registers a tracer.
+
+    on_task_start(task)
+    on_task_end(task, started, error)
+    on_sh_start(context, command)
+    on_sh_end(context, command, started, code, out, err)
+    on_copy_start(src, dest)
+    on_copy_end(src, dest, started, error, transferred)
+    on_test_start(task, name)
+    on_test_end(task, name, started, error)
+    on_connect(context, started, error)
+    on_phase(context, name, started, error)
+    on_result(result)
+
+`started` is when the work began as given by `time.perf_counter`, so the hook can work
+out how long it took, and `error` is the exception raised, if any. Commands start once
+they have a slot of the command semaphore, so waiting for one isn't counted. A command
+which raised rather than exiting, for instance when cancelled, ends with a `code` of None
+and `err` describing the exception as bytes. `transferred` is the number of bytes copied,
+or None if the copier couldn't tell. `on_phase` is called after each part of a task which
+verifies, named "verify" or "run", and `on_result` with each `ExecutionResult` as the
+executor gets it.
+
+Each hook is a list of callbacks, and when one is empty the call sites skip the hook
+entirely, so apps without plugins pay next to nothing for them. A plugin can limit the
+hooks it's registered for with a `hook_names` attribute.
+"""
+
+import time
+import contextlib
+import contextvars
+
+HOOKS = [
+    "on_task_start",
+    "on_task_end",
+    "on_sh_start",
+    "on_sh_end",
+    "on_copy_start",
+    "on_copy_end",
+    "on_test_start",
+    "on_test_end",
+    "on_connect",
+    "on_phase",
+    "on_result",
+]
+
+# stands in for a span when no plugin is listening
+NULL_SPAN = contextlib.nullcontext()
+
+# the copy being made in the current context, which copiers add the bytes they've
+# transferred to
+current_copy = contextvars.ContextVar("current_copy", default=None)
+
+
+def transferred(size):
+    """Adds to the bytes transferred by the innermost copy, if a plugin is listening."""
+    copy = current_copy.get()
+    if copy is not None:
+        copy.transferred = (copy.transferred or 0) + size
+
+
+class Span:
+    """Calls the start hooks on entering and the end hooks on exiting, passing the end hooks
+    when it started and the exception raised, if any."""
+
+    def __init__(self, start_hooks, end_hooks, *args):
+        self.start_hooks = start_hooks
+        self.end_hooks = end_hooks
+        self.args = args
+
+    def __enter__(self):
+        for hook in self.start_hooks:
+            hook(*self.args)
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        for hook in self.end_hooks:
+            hook(*self.args, self.started, exc)
+
+
+class CopySpan(Span):
+    def __enter__(self):
+        self.transferred = None
+        self.token = current_copy.set(self)
+        super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        current_copy.reset(self.token)
+        for hook in self.end_hooks:
+            hook(*self.args, self.started, exc, self.transferred)
+
+
+class Hooks:
+    def __init__(self):
+        self.plugins = []
+        for name in HOOKS:
+            setattr(self, name, [])
+
+    def register(self, plugin):
+        self.plugins.append(plugin)
+        for name in getattr(plugin, "hook_names", HOOKS):
+            callback = getattr(plugin, name, None)
+            if callback is not None:
+                getattr(self, name).append(callback)
+
+    def unregister(self, plugin):
+        self.plugins.remove(plugin)
+        for name in HOOKS:
+            callback = getattr(plugin, name, None)
+            callbacks = getattr(self, name)
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def task(self, task):
+        if not self.on_task_start and not self.on_task_end:
+            return NULL_SPAN
+        return Span(self.on_task_start, self.on_task_end, task)
+
+    def copy(self, src, dest):
+        if not self.on_copy_start and not self.on_copy_end:
+            return NULL_SPAN
+        return CopySpan(self.on_copy_start, self.on_copy_end, src, dest)
+
+    def test(self, task, name):
+        if not self.on_test_start and not self.on_test_end:
+            return NULL_SPAN
+        return Span(self.on_test_start, self.on_test_end, task, name)
+
+    def connect(self, context):
+        if not self.on_connect:
+            return NULL_SPAN
+        return Span((), self.on_connect, context)
+
+    def phase(self, context, name):
+        if not self.on_phase:
+            return NULL_SPAN
+        return Span((), self.on_phase, context, name)
+
+
+# for work done outside of an app, such as a task invoked without a context
+NO_HOOKS = Hooks()
@@ -1,5 +1,6 @@
 import inspect
 import os
+import sys
 import importlib
 import pitcrew.tasks
 from pitcrew import task
@@ -16,22 +17,24 @@ class Package:
         self.context = context
         self.name = name
         self.base = base
+        self.task_name = name if base is None else f"{base.task_name}.{name}"
 
     def __getattr__(self, name):
-        return Package(self.loader, self.context, name, base=self)
+        if name.startswith("__"):
+            raise AttributeError(name)
+        # cache the child so later lookups are plain attribute access
+        package = Package(self.loader, self.context, name, base=self)
+        setattr(self, name, package)
+        return package
 
     async def __call__(self, *args, **kwargs):
         return await self.task().invoke(*args, **kwargs)
 
     def _prefix(self):
-        if self.base is None:
-            return [self.name]
-        else:
-            return self.base._prefix() + [self.name]
+        return self.task_name.split(".")
 
     def task(self):
-        task_name = ".".join(self._prefix())
-        task = self.loader.load(task_name, self.context)
+        task = self.loader.load(self.task_name, self.context)
         return task
 
 
@@ -39,6 +42,7 @@ class Loader:
     def __init__(self):
         self.tasks = {}
         self.task_dir = os.path.abspath(os.path.join(__file__, "..", "tasks"))
+        self.namespace = None
 
     def load(self, name, context):
         return self.create_task(name, context)
@@ -47,16 +51,26 @@ class Loader:
         return Package(self, context, name)
 
     def has_package(self, name):
-        if os.path.isfile(os.path.join(self.task_dir, name) + ".py"):
-            return True
-        elif os.path.isdir(os.path.join(self.task_dir, name)):
-            return True
-        else:
-            return False
+        node = self._namespace()
+        for part in name.split("."):
+            node = node.get(part)
+            if node is None:
+                return False
+        return True
+
+    def invalidate(self):
+        """Forgets the task namespace and loaded tasks, so tasks which have been added or
+        edited since are picked up."""
+        self.namespace = None
+        self.tasks = {}
+        for module_name in list(sys.modules):
+            if module_name.startswith("pitcrew.tasks."):
+                del sys.modules[module_name]
+        importlib.invalidate_caches()
 
     def create_task(self, task_name, context):
-        self.populate_task(task_name)
-        task = self.tasks[task_name]()
+        task_cls = self.tasks.get(task_name) or self.populate_task(task_name)
+        task = task_cls()
         task.context = context
         task.name = task_name
         return task
@@ -80,6 +94,27 @@ class Loader:
                 for t in self.each_task(new_prefix):
                     yield t
 
+    def _namespace(self):
+        """A trie of the task namespace built from a single walk of the task directory,
+        so resolving packages doesn't touch the filesystem."""
+        if self.namespace is None:
+            namespace = {}
+            for path, dirs, files in os.walk(self.task_dir):
+                dirs[:] = [d for d in dirs if not d.startswith("__")]
+                rel_path = os.path.relpath(path, self.task_dir)
+                node = namespace
+                if rel_path != ".":
+                    for part in rel_path.split(os.sep):
+                        node = node.setdefault(part, {})
+                for d in dirs:
+                    node.setdefault(d, {})
+                for f in files:
+                    base, ext = os.path.splitext(f)
+                    if ext == ".py" and not base.startswith("__"):
+                        node.setdefault(base, {})
+            self.namespace = namespace
+        return self.namespace
+
     def populate_task(self, task_name):
         try:
             if task_name not in self.tasks:
@@ -1,5 +1,48 @@
-import time
+"""The logger records what tasks, copies and shell commands are doing. It's a plugin
+registered with the hooks of every app, see `pitcrew.hooks`. Each hook builds a small
+record which is put on a bounded queue, and a background thread formats and writes the
+records, so a slow terminal doesn't stall the event loop.
+
+Records are written either as colored, human readable lines or as lines of json, chosen
+with `logger.configure(format=...)` or the `--log-format` option of `crew run` and
+`crew sh`. When more than one host is logging, human readable lines are buffered per host
+for a moment and written as a block under the host's name, rather than interleaved.
+
+How much is logged is set with `logger.configure(level=...)` or `--log-level`. Below
+`debug` shell commands aren't logged, below `info` nested tasks, copies and tests aren't
+either, `summary` only logs the outcome of the outermost tasks and `quiet` logs nothing.
+The logger is only registered for the hooks its level needs when an app is created, so
+whatever isn't logged costs next to nothing.
+
+If the queue fills past `SAMPLE_THRESHOLD`, only one in `SAMPLE_RATE` shell command
+records is kept, and once it's full further records are dropped. The number of records
+dropped is written once the writer catches up.
+"""
+
 import sys
+import time
+import json
+import queue
+import atexit
+import threading
+import contextvars
+from collections import OrderedDict
+
+LOG_FORMATS = ["human", "json"]
+LOG_LEVELS = ["quiet", "summary", "info", "debug"]
+QUIET, SUMMARY, INFO, DEBUG = range(len(LOG_LEVELS))
+QUEUE_SIZE = 10000
+SAMPLE_THRESHOLD = 0.75
+SAMPLE_RATE = 10
+SAMPLED_EVENTS = {"shell_start", "shell_stop"}
+# human readable lines from concurrent hosts are held for up to this many seconds so
+# they can be written together
+GROUP_INTERVAL = 0.5
+
+# put on the queue by `Logger.flush` to have everything buffered written
+FLUSH = object()
+
+COLORS = ["\033[1;36m", "\033[1;34m", "\033[1;35m"]
 
 
 def truncated_value(val):
@@ -11,121 +54,329 @@ def truncated_value(val):
         return f"{val[0:100]}..."
 
 
-class TaskLogger:
-    def __init__(self, logger, task):
-        self.logger = logger
-        self.task = task
-        self.colors = ["\033[1;36m", "\033[1;34m", "\033[1;35m"]
-
-    def __enter__(self):
-        self.start_time = time.time()
-        line = "  " * self.logger.depth()
-        line += self.colors[self.logger.depth() % len(self.colors)]
-        line += f"> {self.task.name}"
-        line += "\033[0m"
-        for key, val in self.task.params.__dict__().items():
-            line += f" {key}=\033[1m{truncated_value(val)}\033[0m"
-        logger.info(line)
-
-        self.logger.task_stack.append(self)
-
-    def __exit__(self, exc, value, tb):
-        self.logger.task_stack.pop()
-
-        duration = time.time() - self.start_time
-        line = "  " * self.logger.depth()
-        line += self.colors[self.logger.depth() % len(self.colors)]
-        line += f"< {self.task.name}"
-        line += " \033[0m\033[3m ({0:.2f}s)\033[0m".format(duration)
-        if exc:
-            line += f" \033[31m✗\033[0m {exc.__name__} {value}"
-        else:
-            line += f" \033[32m✓\033[0m"
-            if self.task.return_value:
-                line += f" << {truncated_value(self.task.return_value)}"
-        logger.info(line)
+def descriptor(context):
+    return context.descriptor() if context else None
 
 
-class CopyLogger:
-    def __init__(self, logger, src, dest):
-        self.logger = logger
-        self.src = src
-        self.dest = dest
-
-    def __enter__(self):
-        self.start_time = time.time()
-        line = "  " * self.logger.depth()
-        line += f"💾 Copying \033[1m{self.src}\033[0m ==> \033[1m{self.dest}\033[0m"
-        self.logger.info(line)
-        self.logger.task_stack.append(self)
-
-    def __exit__(self, exc, tb, something):
-        self.logger.task_stack.pop()
-        duration = time.time() - self.start_time
-        line = "  " * self.logger.depth()
-        if exc:
-            line += "\033[31m✗\033[0m copying failed ({0:.2f}s)".format(duration)
+def error_string(error):
+    return f"{type(error).__name__} {error}"
+
+
+def task_args(task):
+    return {key: truncated_value(val) for key, val in task.params.__dict__().items()}
+
+
+class HumanFormatter:
+    """Formats records as colored lines, indented by the depth of the task stack."""
+
+    def format(self, record) -> str:
+        event = record["event"]
+        indent = "  " * record["depth"]
+        color = COLORS[record["depth"] % len(COLORS)]
+        if event == "invoke":
+            line = f"Invoking \033[1m{record['name']}\033[0m"
+            if record.get("args") is not None:
+                line += f" \033[1m{record['args']}\033[0m"
+            line += f" with\n  provider \033[1m{record['provider']} {record['provider_args']}\033[0m"
+        elif event == "task_start":
+            line = f"{indent}{color}> {record['task']}\033[0m"
+            for key, val in record["args"].items():
+                line += f" {key}=\033[1m{val}\033[0m"
+        elif event == "task_stop":
+            line = f"{indent}{color}< {record['task']}"
+            line += " \033[0m\033[3m ({0:.2f}s)\033[0m".format(record["duration"])
+            if "error" in record:
+                line += f" \033[31m✗\033[0m {record['error']}"
+            else:
+                line += " \033[32m✓\033[0m"
+                if "result" in record:
+                    line += f" << {record['result']}"
+        elif event == "shell_start":
+            line = f"{indent}\033[33m${record['host']}\033[0m {record['command']}"
+        elif event == "shell_stop":
+            line = f"{indent} # code={record['code']} out={record['out']} err={record['err']}"
+        elif event == "copy_start":
+            line = f"{indent}💾 Copying \033[1m{record['src']}\033[0m ==> \033[1m{record['dest']}\033[0m"
+        elif event == "copy_stop":
+            if "error" in record:
+                line = f"{indent}\033[31m✗\033[0m copying failed"
+            else:
+                line = f"{indent}\033[32m✓\033[0m done copying"
+            line += " ({0:.2f}s)".format(record["duration"])
+        elif event == "test_start":
+            line = (
+                f"{indent}🏃 Running {record['task']} > \033[1m{record['test']}\033[0m"
+            )
+        elif event == "test_stop":
+            if "error" in record:
+                line = f"{indent}\033[31m✗\033[0m test failed"
+            else:
+                line = f"{indent}\033[32m✓\033[0m test succeeded"
+            line += " ({0:.2f}s)".format(record["duration"])
         else:
-            line += "\033[32m✓\033[0m done copying ({0:.2f}s)".format(duration)
-        self.logger.info(line)
+            line = record["message"]
+        return line
+
+    def header(self, host) -> str:
+        return f"\033[1m── {host}\033[0m"
+
+
+class JsonFormatter:
+    """Formats each record as a line of json."""
+
+    def format(self, record) -> str:
+        return json.dumps(record, default=self.default)
+
+    def default(self, value):
+        if isinstance(value, bytes):
+            return value.decode("utf-8", "replace")
+        return str(value)
+
 
+FORMATTERS = {"human": HumanFormatter, "json": JsonFormatter}
 
-class TestLogger:
-    def __init__(self, logger, task, name):
+
+class LogWriter(threading.Thread):
+    """Takes records off the queue, formats them and writes them to the stream."""
+
+    def __init__(self, logger):
+        super().__init__(name="pitcrew-logger", daemon=True)
         self.logger = logger
-        self.task = task
-        self.name = name
-
-    def __enter__(self):
-        self.start_time = time.time()
-        line = "  " * self.logger.depth()
-        line += f"🏃 Running {self.task.task_name} > \033[1m{self.name}\033[0m"
-        self.logger.info(line)
-        self.logger.task_stack.append(self)
-
-    def __exit__(self, exc, tb, something):
-        self.logger.task_stack.pop()
-        duration = time.time() - self.start_time
-        line = "  " * self.logger.depth()
-        if exc:
-            line += "\033[31m✗\033[0m test failed ({0:.2f}s)".format(duration)
-        else:
-            line += "\033[32m✓\033[0m test succeeded ({0:.2f}s)".format(duration)
-        self.logger.info(line)
+        self.buffers = OrderedDict()
+        self.hosts = set()
+        self.last_host = None
+        self.reported_drops = 0
+
+    def run(self):
+        records = self.logger.queue
+        while True:
+            try:
+                batch = [records.get(timeout=GROUP_INTERVAL if self.buffers else None)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is not FLUSH:
+                    self.add(record)
+            self.write_buffers(force=FLUSH in batch)
+            for _ in batch:
+                records.task_done()
+
+    def add(self, record):
+        if not self.logger.grouped():
+            self.buffers.setdefault(None, [time.monotonic(), []])[1].append(record)
+            return
+        host = record.get("host")
+        if host is not None:
+            self.hosts.add(host)
+        self.buffers.setdefault(host, [time.monotonic(), []])[1].append(record)
+
+    def write_buffers(self, force=False):
+        formatter = self.logger.formatter
+        lines = []
+        now = time.monotonic()
+        for host, (started, records) in list(self.buffers.items()):
+            if (
+                not force
+                and host is not None
+                and len(self.hosts) > 1
+                and now - started < GROUP_INTERVAL
+            ):
+                continue
+            del self.buffers[host]
+            if host is not None and len(self.hosts) > 1 and host != self.last_host:
+                lines.append(formatter.header(host))
+            self.last_host = host
+            lines.extend(formatter.format(record) for record in records)
+        dropped = self.logger.dropped
+        if dropped > self.reported_drops:
+            lines.append(
+                formatter.format(
+                    {
+                        "event": "info",
+                        "depth": 0,
+                        "message": f"{dropped - self.reported_drops} log records dropped",
+                    }
+                )
+            )
+            self.reported_drops = dropped
+        if lines:
+            try:
+                self.logger.writer.write("\n".join(lines) + "\n")
+                self.logger.writer.flush()
+            except (OSError, ValueError):
+                pass
 
 
 class Logger:
-    def __init__(self, writer):
+    def __init__(self, writer, format="human", level="debug", queue_size=QUEUE_SIZE):
         self.writer = writer
-        self.task_stack = []
+        # each asyncio task gets a copy of the context it was created in, so hosts run
+        # concurrently, and the branches of a gather, each see only their own stack
+        self.stack = contextvars.ContextVar("task_stack", default=())
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sample_threshold = int(queue_size * SAMPLE_THRESHOLD)
+        self.sampled = 0
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.configure(format=format, level=level)
+
+    def configure(self, format=None, level=None):
+        if format:
+            self.format = format
+            self.formatter = FORMATTERS[format]()
+        if level:
+            self.level = LOG_LEVELS.index(level)
+
+    def grouped(self) -> bool:
+        return self.format == "human"
+
+    @property
+    def hook_names(self) -> list:
+        """The hooks the logger needs at its level, so an app only calls those."""
+        names = []
+        if self.level >= SUMMARY:
+            names += ["on_task_start", "on_task_end"]
+        if self.level >= INFO:
+            names += ["on_copy_start", "on_copy_end", "on_test_start", "on_test_end"]
+        if self.level >= DEBUG:
+            names += ["on_sh_start", "on_sh_end"]
+        return names
+
+    def on_task_start(self, task):
+        if self.level >= INFO:
+            self.emit(
+                "task_start",
+                host=descriptor(task.context),
+                task=task.name,
+                args=task_args(task),
+            )
+        self.push(task)
+
+    def on_task_end(self, task, started, error):
+        self.pop()
+        # in summary only the outermost tasks are logged
+        if self.level < INFO and self.depth():
+            return
+        record = {
+            "host": descriptor(task.context),
+            "task": task.name,
+            "duration": time.perf_counter() - started,
+        }
+        if error:
+            record["error"] = error_string(error)
+        elif task.return_value:
+            record["result"] = truncated_value(task.return_value)
+        self.emit("task_stop", **record)
 
-    def with_task(self, task):
-        return TaskLogger(self, task)
+    def on_copy_start(self, src, dest):
+        self.emit(
+            "copy_start", host=descriptor(dest.context), src=str(src), dest=str(dest)
+        )
+        self.push(dest)
+
+    def on_copy_end(self, src, dest, started, error, transferred):
+        self.pop()
+        record = {
+            "host": descriptor(dest.context),
+            "duration": time.perf_counter() - started,
+        }
+        if error:
+            record["error"] = error_string(error)
+        if transferred is not None:
+            record["bytes"] = transferred
+        self.emit("copy_stop", **record)
 
-    def with_test(self, task, name):
-        return TestLogger(self, task, name)
+    def on_test_start(self, task, name):
+        self.emit("test_start", task=task.task_name, test=name)
+        self.push(name)
 
-    def shell_start(self, context, command):
-        line = "  " * len(self.task_stack)
-        line += f"\033[33m${context.descriptor()}\033[0m {truncated_value(command)}"
-        self.writer.write(line)
-        self.writer.flush()
+    def on_test_end(self, task, name, started, error):
+        self.pop()
+        record = {"duration": time.perf_counter() - started}
+        if error:
+            record["error"] = error_string(error)
+        self.emit("test_stop", **record)
 
-    def shell_stop(self, context, code, out, err):
-        self.info(
-            f" # code={code} out={truncated_value(out)} err={truncated_value(err)}"
+    def on_sh_start(self, context, command):
+        self.emit(
+            "shell_start", host=descriptor(context), command=truncated_value(command)
         )
 
-    def with_copy(self, src, dest):
-        return CopyLogger(self, src, dest)
+    def on_sh_end(self, context, command, started, code, out, err):
+        self.emit(
+            "shell_stop",
+            host=descriptor(context),
+            code=code,
+            out=truncated_value(out),
+            err=truncated_value(err),
+        )
 
     def info(self, line):
-        self.writer.write(line)
-        self.writer.write("\n")
-        self.writer.flush()
+        if self.level < SUMMARY:
+            return
+        self.emit("info", message=line)
+
+    def invoke(self, name, provider, provider_args, args=None):
+        if self.level < SUMMARY:
+            return
+        self.emit(
+            "invoke",
+            name=name,
+            args=args,
+            provider=provider,
+            provider_args=provider_args,
+        )
+
+    def emit(self, event, **fields):
+        """Queues a record to be written, unless the queue is too full to keep it."""
+        if event in SAMPLED_EVENTS and self.queue.qsize() > self.sample_threshold:
+            self.sampled += 1
+            if self.sampled % SAMPLE_RATE:
+                self.dropped += 1
+                return
+        record = {"time": time.time(), "event": event, "depth": self.depth()}
+        record.update(fields)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.thread is None:
+            self._start()
+
+    def flush(self):
+        """Waits until the queued records have been written."""
+        if self.thread is not None:
+            self.queue.put(FLUSH)
+            self.queue.join()
+
+    @property
+    def task_stack(self) -> tuple:
+        """The tasks, copies and tests running in the current context, outermost first."""
+        return self.stack.get()
+
+    def push(self, entry):
+        self.stack.set(self.stack.get() + (entry,))
+
+    def pop(self):
+        # hooks start and end in the same asyncio task, so the entry is on top
+        self.stack.set(self.stack.get()[:-1])
 
     def depth(self):
-        return len(self.task_stack)
+        return len(self.stack.get())
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = LogWriter(self)
+                self.thread.start()
+                atexit.register(self.flush)
 
 
 logger = Logger(sys.stderr)
@@ -0,0 +1,208 @@
+"""The task manifest describes every task without importing it. Each task file is parsed
+into a syntax tree to find its name, docstring, arguments and return description, and the
+results are cached on disk keyed by the file's modification time and size, so listing
+tasks and generating docs only needs to parse files which have changed.
+"""
+
+import os
+import ast
+import json
+
+MANIFEST_VERSION = 1
+TASK_DECORATORS = {"arg": True, "opt": False, "varargs": True}
+
+
+class ArgInfo:
+    def __init__(self, name, type_name="str", desc=None, required=True):
+        self.name = name
+        self.type_name = type_name
+        self.desc = desc
+        self.required = required
+
+    def to_dict(self):
+        return self.__dict__
+
+
+class TaskInfo:
+    def __init__(
+        self,
+        task_name,
+        path,
+        doc=None,
+        args=None,
+        return_type=None,
+        return_desc=None,
+        nodoc=False,
+    ):
+        self.task_name = task_name
+        self.path = path
+        self.doc = doc
+        self.args = args or []
+        self.return_type = return_type
+        self.return_desc = return_desc
+        self.nodoc = nodoc
+
+    @classmethod
+    def from_dict(cls, data):
+        args = [ArgInfo(**arg) for arg in data.pop("args")]
+        return cls(args=args, **data)
+
+    def to_dict(self):
+        data = dict(self.__dict__)
+        data["args"] = [arg.to_dict() for arg in self.args]
+        return data
+
+    def desc(self):
+        return self.doc
+
+    def has_return_type(self):
+        return self.return_type is not None
+
+    def source_path(self):
+        return self.path
+
+    def source(self):
+        with open(self.path) as fh:
+            return fh.read()
+
+
+class TaskManifest:
+    def __init__(self, task_dir, cache_path):
+        self.task_dir = task_dir
+        self.cache_path = cache_path
+        self.entries = None
+
+    def each_task(self):
+        """Yields a TaskInfo for every task, in the same order as `Loader.each_task`."""
+        for entry in self._entries().values():
+            if entry["task"]:
+                yield TaskInfo.from_dict(dict(entry["task"]))
+
+    def get(self, task_name):
+        """Returns the TaskInfo for the named task, or None if there is no such task."""
+        for task in self.each_task():
+            if task.task_name == task_name:
+                return task
+        return None
+
+    def _entries(self):
+        if self.entries is not None:
+            return self.entries
+
+        cached = self._read_cache()
+        self.entries = {}
+        changed = False
+        for task_name, path in self._each_task_path():
+            stat = os.stat(path)
+            entry = cached.get(path)
+            if (
+                not entry
+                or entry["mtime"] != stat.st_mtime_ns
+                or entry["size"] != stat.st_size
+            ):
+                entry = {
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "task": parse_task(task_name, path),
+                }
+                changed = True
+            self.entries[path] = entry
+        if changed or len(cached) != len(self.entries):
+            self._write_cache()
+        return self.entries
+
+    def _each_task_path(self, prefix=[]):
+        path = os.path.join(self.task_dir, *prefix)
+        if os.path.isfile(path) and path.endswith(".py"):
+            if prefix[-1] == "__init__.py":
+                prefix = prefix[:-1]
+            else:
+                prefix = prefix[:-1] + [os.path.splitext(prefix[-1])[0]]
+            if prefix:
+                yield ".".join(prefix), path
+        elif os.path.isdir(path):
+            paths = os.listdir(path)
+            paths.sort()
+            for p in paths:
+                if p != "__init__.py" and p.startswith("__"):
+                    continue
+                yield from self._each_task_path(prefix + [p])
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as fh:
+                data = json.load(fh)
+            if data.get("version") == MANIFEST_VERSION:
+                return data["files"]
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write_cache(self):
+        data = {"version": MANIFEST_VERSION, "files": self.entries}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}"
+            with open(tmp_path, "w") as fh:
+                json.dump(data, fh)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+
+def parse_task(task_name, path):
+    """Parses a task file and returns a dict describing the task, or None if the file
+    doesn't define one."""
+    with open(path) as fh:
+        tree = ast.parse(fh.read(), path)
+
+    task_node = None
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and any(
+            _name(base) == "BaseTask" for base in node.bases
+        ):
+            task_node = node
+    if task_node is None:
+        return None
+
+    info = TaskInfo(task_name, path, doc=ast.get_docstring(task_node, clean=False))
+    for decorator in task_node.decorator_list:
+        name = _name(decorator.func if isinstance(decorator, ast.Call) else decorator)
+        if name in TASK_DECORATORS:
+            kwargs = {k.arg: k.value for k in decorator.keywords}
+            arg = ArgInfo(
+                ast.literal_eval(decorator.args[0]),
+                required=TASK_DECORATORS[name],
+            )
+            if len(decorator.args) > 1:
+                arg.type_name = _name(decorator.args[1]) or "str"
+            elif "type" in kwargs:
+                arg.type_name = _name(kwargs["type"]) or "str"
+            if "desc" in kwargs:
+                arg.desc = ast.literal_eval(kwargs["desc"])
+            info.args.append(arg)
+        elif name == "returns":
+            info.return_desc = ast.literal_eval(decorator.args[0])
+        elif name == "nodoc":
+            info.nodoc = True
+
+    methods = {
+        node.name: node
+        for node in task_node.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    method = methods.get("verify", methods.get("run"))
+    if method is not None and method.returns is not None:
+        info.return_type = _name(method.returns)
+    return info.to_dict()
+
+
+def _name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return node.attr
+    elif isinstance(node, ast.Constant):
+        return node.value
+    else:
+        return None
@@ -0,0 +1,142 @@
+"""The connection pool allows SSH connections to be shared between contexts. Connections
+are keyed by host, port, user and tunnel, so entering a context for a host which is already
+connected, either from a nested `ssh_context` or a later executor run within the same app,
+reuses the authenticated connection rather than performing another key exchange.
+
+Connections are reference counted. Once no context is using a connection it is kept open
+for `idle_timeout` seconds before being closed. At most `max_connections` are kept open,
+idle connections are evicted least-recently-used first to make room, and callers wait for
+a connection to be released when every connection is in use.
+"""
+
+import time
+import asyncio
+import asyncssh
+
+
+class PooledConnection:
+    def __init__(self, key):
+        self.key = key
+        self.connection = None
+        self.ready = asyncio.get_event_loop().create_future()
+        self.refcount = 0
+        self.last_used = time.monotonic()
+
+
+class PoolClient(asyncssh.SSHClient):
+    """Removes connections from the pool when they are lost."""
+
+    def __init__(self, pool, entry):
+        self.pool = pool
+        self.entry = entry
+
+    def connection_lost(self, exc):
+        self.pool.discard(self.entry)
+
+
+class ConnectionPool:
+    def __init__(self, max_connections=1000, idle_timeout=60):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.entries = {}
+        self.waiters = []
+
+    async def acquire(
+        self, host, port=22, user=None, timeout=None, **connection_kwargs
+    ):
+        """Returns a connection for the given host, connecting if needed."""
+        key = (host, port, user, connection_kwargs.get("tunnel"))
+        while True:
+            entry = self.entries.get(key)
+            if entry:
+                entry.refcount += 1
+                try:
+                    return await asyncio.shield(entry.ready)
+                except BaseException:
+                    entry.refcount -= 1
+                    raise
+            self.evict_idle()
+            if len(self.entries) < self.max_connections or self._evict_lru():
+                break
+            waiter = asyncio.get_event_loop().create_future()
+            self.waiters.append(waiter)
+            await waiter
+
+        entry = PooledConnection(key)
+        entry.refcount = 1
+        self.entries[key] = entry
+        try:
+            entry.connection = await asyncio.wait_for(
+                asyncssh.connect(
+                    host,
+                    port=port,
+                    username=user,
+                    client_factory=lambda: PoolClient(self, entry),
+                    **connection_kwargs,
+                ),
+                timeout=timeout,
+            )
+        except BaseException as e:
+            self.discard(entry)
+            entry.ready.set_exception(e)
+            # mark the exception as retrieved in case nobody else was waiting
+            entry.ready.exception()
+            raise
+        entry.ready.set_result(entry.connection)
+        return entry.connection
+
+    def release(self, connection):
+        """Releases a connection previously returned by `acquire`."""
+        for entry in self.entries.values():
+            if entry.connection is connection:
+                entry.refcount -= 1
+                if entry.refcount == 0:
+                    entry.last_used = time.monotonic()
+                    asyncio.get_event_loop().call_later(
+                        self.idle_timeout, self.evict_idle
+                    )
+                    self._wake_waiter()
+                return
+
+    def discard(self, entry):
+        if self.entries.get(entry.key) is entry:
+            del self.entries[entry.key]
+            self._wake_waiter()
+
+    def evict_idle(self):
+        """Closes connections which have been idle for longer than `idle_timeout`."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for entry in list(self.entries.values()):
+            if entry.refcount == 0 and entry.last_used <= cutoff:
+                self._close(entry)
+
+    async def close(self):
+        """Closes every connection in the pool."""
+        entries = list(self.entries.values())
+        for entry in entries:
+            self._close(entry)
+        for entry in entries:
+            if entry.connection:
+                await entry.connection.wait_closed()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _evict_lru(self):
+        idle = [e for e in self.entries.values() if e.refcount == 0]
+        if not idle:
+            return False
+        self._close(min(idle, key=lambda e: e.last_used))
+        return True
+
+    def _close(self, entry):
+        self.discard(entry)
+        if entry.connection:
+            entry.connection.close()
+
+    def _wake_waiter(self):
+        while self.waiters:
+            waiter = self.waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                break
@@ -0,0 +1,72 @@
+"""Persistent shell sessions allow an SSH context to run many commands over a single
+long-lived remote shell. Instead of opening a new channel and spawning a new process for
+every command, each command is written to the stdin of one `/bin/sh` and its exit code,
+stdout and stderr are framed with a unique marker, so running a command costs a single
+round trip.
+"""
+
+import uuid
+import shlex
+import asyncio
+
+
+class SessionClosedError(Exception):
+    pass
+
+
+class ShellSession:
+    """A long-lived remote `/bin/sh` running over an SSH connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.process = None
+        self.lock = asyncio.Lock()
+
+    def busy(self) -> bool:
+        """Indicates if a command is currently running in this session."""
+        return self.lock.locked()
+
+    async def run(self, command, env=None):
+        """Runs a command within the session and returns a tuple of (code, stdout, stderr).
+        The command is run in a subshell with stdin attached to /dev/null, so changes to the
+        environment or current directory don't leak into subsequent commands."""
+        async with self.lock:
+            if self.process is None:
+                self.process = await self.connection.create_process(
+                    "/bin/sh", encoding=None
+                )
+            marker = uuid.uuid4().hex
+            out_separator = f"\n{marker} ".encode()
+            err_separator = f"\n{marker}\n".encode()
+            try:
+                self.process.stdin.write(self._frame(command, env, marker).encode())
+                out, err = await asyncio.gather(
+                    self.process.stdout.readuntil(out_separator),
+                    self.process.stderr.readuntil(err_separator),
+                )
+                code = int(await self.process.stdout.readuntil(b"\n"))
+            except asyncio.IncompleteReadError:
+                self.close()
+                raise SessionClosedError("the remote shell exited unexpectedly")
+            except BaseException:
+                # the command's output may still be unread, for instance if it was
+                # cancelled, so the next command starts a fresh shell
+                self.close()
+                raise
+            return (code, out[: -len(out_separator)], err[: -len(err_separator)])
+
+    def close(self):
+        if self.process:
+            self.process.close()
+            self.process = None
+
+    def _frame(self, command, env, marker):
+        exports = ""
+        if env:
+            for k, v in env.items():
+                exports += f"export {k}={shlex.quote(v)}; "
+        return (
+            f"( {exports}eval {shlex.quote(command)} ) < /dev/null\n"
+            f"printf '\\n{marker} %d\\n' $?\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
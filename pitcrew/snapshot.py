@@ -0,0 +1,200 @@
+"""A snapshot is an opt-in index of the files under some roots of a context's filesystem,
+built with a single `find` over the roots. While it's fresh, `fs.probe` and the tasks built
+on it such as `fs.stat` and `fs.is_file`, along with `fs.list`, answer from the snapshot
+rather than running a command for every path.
+
+Paths changed through pitcrew, for instance with `fs.write`, `fs.chmod` or `copy_to`,
+invalidate their memoized returns, which also marks them as unknown to the snapshot until
+they are next probed. Changes made behind pitcrew's back aren't seen until the snapshot
+expires or the roots are scanned again.
+"""
+
+import time
+import shlex
+import posixpath
+from collections import namedtuple
+
+SNAPSHOT_TTL = 300
+
+SCAN_FORMAT = r"%y %Y %m %s %T@ %A@ %i %U %G %b %p\0"
+
+TYPE_BITS = {
+    "f": 0o100000,
+    "d": 0o040000,
+    "l": 0o120000,
+    "p": 0o010000,
+    "s": 0o140000,
+    "c": 0o020000,
+    "b": 0o060000,
+}
+
+# the type of the path itself and of what it resolves to, so symlinks are reported as
+# links by stat while `fs.is_file` follows them
+Entry = namedtuple(
+    "Entry",
+    [
+        "link_type",
+        "type",
+        "mode",
+        "size",
+        "modify_time",
+        "access_time",
+        "inode",
+        "user_id",
+        "group_id",
+        "blocks",
+    ],
+)
+
+UNKNOWN = object()
+
+
+def scan_command(roots) -> str:
+    esc_roots = " ".join(shlex.quote(root) for root in roots)
+    return f"find {esc_roots} -printf {shlex.quote(SCAN_FORMAT)}"
+
+
+def absolute(path, directory=None):
+    """Resolves a path against the directory, or returns None if it's still relative."""
+    path = posixpath.join(directory or "", path)
+    if not posixpath.isabs(path):
+        return None
+    return posixpath.normpath(path)
+
+
+def link_type(mode) -> str:
+    """The type of a path as `find` reports it, from its mode in octal."""
+    type_bits = int(mode, 8) & 0o170000
+    for find_type, bits in TYPE_BITS.items():
+        if bits == type_bits:
+            return find_type
+    return "?"
+
+
+def parse_type(find_type):
+    if find_type == "d":
+        return "directory"
+    elif find_type == "f":
+        return "file"
+    return "other"
+
+
+def parse_scan(output):
+    """Parses the output of the scan command into a dict of paths to entries."""
+    entries = {}
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        parts = record.decode("utf-8", "surrogateescape").split(" ", 10)
+        mode = TYPE_BITS.get(parts[0], 0) | int(parts[2], 8)
+        entries[posixpath.normpath(parts[10])] = Entry(
+            parts[0],
+            parse_type(parts[1]),
+            "{0:o}".format(mode),
+            int(parts[3]),
+            int(float(parts[4])),
+            int(float(parts[5])),
+            int(parts[6]),
+            int(parts[7]),
+            int(parts[8]),
+            int(parts[9]),
+        )
+    return entries
+
+
+class Snapshot:
+    def __init__(self, roots, entries, ttl=SNAPSHOT_TTL):
+        self.roots = [posixpath.normpath(root) for root in roots]
+        self.entries = entries
+        self.expires_at = None if ttl is None else time.monotonic() + ttl
+        self.dirty = set()
+        self.dirty_trees = set()
+        self.children = {}
+        for path in entries:
+            if path not in self.roots:
+                parent, name = posixpath.split(path)
+                self.children.setdefault(parent, set()).add(name)
+
+    def fresh(self) -> bool:
+        return self.expires_at is None or time.monotonic() < self.expires_at
+
+    def covers(self, path) -> bool:
+        """Indicates if the snapshot knows whether the absolute path exists."""
+        if not self.fresh() or path in self.dirty:
+            return False
+        if not any(path == root or path.startswith(root + "/") for root in self.roots):
+            return False
+        node = path
+        while True:
+            if node in self.dirty_trees:
+                return False
+            parent = posixpath.dirname(node)
+            if parent == node:
+                return True
+            node = parent
+
+    def lookup(self, path):
+        """Returns the entry for an absolute path, None if it doesn't exist or UNKNOWN if
+        the snapshot can't tell."""
+        if not self.covers(path):
+            return UNKNOWN
+        return self.entries.get(path)
+
+    def list(self, path):
+        """Returns the names within a directory, or UNKNOWN if the snapshot can't tell."""
+        entry = self.lookup(path)
+        # the scan doesn't follow symlinks, so only the contents of real directories are known
+        if entry is UNKNOWN or entry is None or entry.link_type != "d":
+            return UNKNOWN
+        if any(posixpath.dirname(p) == path for p in self.dirty | self.dirty_trees):
+            return UNKNOWN
+        return sorted(self.children.get(path, ()))
+
+    def update(self, path, entry):
+        """Records what a probe found at an absolute path, or None if it doesn't exist."""
+        self.dirty.discard(path)
+        if path in self.dirty_trees and (entry is None or entry.link_type != "d"):
+            # nothing can be beneath it, so only the path itself was unknown
+            self.dirty_trees.discard(path)
+        if not self.covers(path):
+            return
+        parent, name = posixpath.split(path)
+        if entry is None:
+            self.entries.pop(path, None)
+            self.children.get(parent, set()).discard(name)
+        else:
+            self.entries[path] = entry
+            if path not in self.roots:
+                self.children.setdefault(parent, set()).add(name)
+
+    def forget_subject(self, subject, directory=None):
+        """Forgets the paths of an invalidated subject. A relative path which can't be
+        resolved forgets everything, as it isn't known where it lies."""
+        if subject is None:
+            return self.forget()
+        for value in subject if isinstance(subject, (list, tuple)) else [subject]:
+            if isinstance(value, str):
+                path = absolute(value, directory)
+                self.forget(path)
+                if path is None:
+                    return
+
+    def forget(self, path=None):
+        """Marks an absolute path as unknown until it's next probed. If it's a directory or
+        didn't exist, everything beneath it is unknown too, as it may have been replaced
+        by a directory tree. Forgets everything if no path is given."""
+        if path is None:
+            self.expires_at = 0
+            return
+        entry = self.entries.get(path)
+        if entry is not None and entry.link_type != "d":
+            self.dirty.add(path)
+            return
+        self.dirty_trees.add(path)
+        if entry is not None:
+            prefix = path + "/"
+            for descendant in [p for p in self.entries if p.startswith(prefix)]:
+                del self.entries[descendant]
+            for directory in [p for p in self.children if p.startswith(prefix)]:
+                del self.children[directory]
+            self.children.pop(path, None)
@@ -40,6 +40,13 @@ If a task doesn't have a validate method it performs the following:
 
 1. Run `run()` method.
 
+### Memoization
+
+Tasks decorated with `@task.memoize()` cache their return value in the context, keyed
+on their arguments, so repeated calls don't run any commands. Tasks which change the
+system declare the memoized tasks they invalidate with `@task.invalidates(...)`, for
+instance `fs.write` invalidates `fs.stat` for the path it writes to.
+
 ### Tests
 
 To add tests to a task, add test classes to your test file. For example:
@@ -60,7 +67,8 @@ import os
 import shlex
 import inspect
 import asyncio
-from pitcrew.logger import logger
+from pitcrew.cache import MISSING, freeze, subjects
+from pitcrew.hooks import NO_HOOKS
 from pitcrew.template import Template
 from pitcrew.test.util import ubuntu_decorator
 from abc import ABC, abstractmethod
@@ -90,7 +98,14 @@ class BaseTask(ABC):
     return_value = None
     return_desc = None
     memoize = False
+    memoize_ttl = None
+    memoize_maxsize = None
+    invalidated_tasks = ()
+    invalidated_on = None
+    fact = False
+    fact_ttl = None
     nodoc = False
+    _memo_key = None
 
     @classmethod
     def expected_return_type(cls):
@@ -186,10 +201,41 @@ class BaseTask(ABC):
                     f"return value {value} does not conform to expected type {expected_return_type}"
                 )
             self.return_value = value
-        if self.__class__.memoize:
-            self.context.cache[self.__class__] = value
+        if self.__class__.fact:
+            self.context.set_fact(self._task_name(), value, ttl=self.__class__.fact_ttl)
+        if self.__class__.memoize and self._memo_key is not None:
+            self.context.cache.set(
+                self._task_name(),
+                self._memo_key,
+                value,
+                ttl=self.__class__.memoize_ttl,
+                maxsize=self.__class__.memoize_maxsize,
+                subjects=self._memo_subjects(),
+            )
         return value
 
+    def _task_name(self):
+        return getattr(self.__class__, "task_name", self.__class__.__name__)
+
+    def _build_memo_key(self):
+        try:
+            params = freeze(self.params.__dict__())
+        except TypeError:
+            return None
+        return (self.context.directory or ".", self.context.user, params)
+
+    def _memo_subjects(self):
+        if not self.args:
+            return frozenset()
+        value = getattr(self.params, self.args[0].name)
+        return frozenset(subjects(value, self.context.directory))
+
+    def _invalidate(self):
+        cls = self.__class__
+        if cls.invalidated_tasks:
+            subject = getattr(self.params, cls.invalidated_on, None)
+            self.context.invalidate(cls.invalidated_tasks, subject)
+
     def coerce_inputs(self, use_coersion=True):
         self.use_coersion = use_coersion
 
@@ -222,27 +268,50 @@ class BaseTask(ABC):
     async def invoke(self, *args, **kwargs):
         self._process_args(*args, **kwargs)
 
-        if self.__class__.memoize and self.__class__ in self.context.cache:
-            return self.context.cache[self.__class__]
+        if self.__class__.fact:
+            value = self.context.get_fact(self._task_name())
+            if value is not MISSING:
+                return value
 
-        with logger.with_task(self):
+        if self.__class__.memoize:
+            self._memo_key = self._build_memo_key()
+            if self._memo_key is not None:
+                value = self.context.cache.get(self._task_name(), self._memo_key)
+                if value is not MISSING:
+                    return value
+
+        with self._hooks().task(self):
             if hasattr(self, "verify"):
                 return await self._invoke_with_verify()
             else:
                 return await self._invoke_without_verify()
 
     async def _invoke_with_verify(self):
+        hooks = self._hooks()
         try:
-            return self._enforce_return_type(await self.verify())
+            with hooks.phase(self.context, "verify"):
+                return self._enforce_return_type(await self.verify())
         except AssertionError:
-            await self.run()
             try:
-                return self._enforce_return_type(await self.verify())
+                with hooks.phase(self.context, "run"):
+                    await self.run()
+            finally:
+                self._invalidate()
+            try:
+                with hooks.phase(self.context, "verify"):
+                    return self._enforce_return_type(await self.verify())
             except AssertionError:
                 raise TaskFailureError("this task failed to run")
 
     async def _invoke_without_verify(self):
-        return self._enforce_return_type(await self.run())
+        try:
+            value = await self.run()
+        finally:
+            self._invalidate()
+        return self._enforce_return_type(value)
+
+    def _hooks(self):
+        return self.context.app.hooks if self.context else NO_HOOKS
 
     def template(self, name):
         template_path = os.path.abspath(
@@ -361,11 +430,40 @@ def returns(desc):
     return decorator
 
 
-def memoize():
-    """Decorator to instruct task to memoize return within the context's cache."""
+def memoize(ttl=None, maxsize=None):
+    """Decorator to instruct task to memoize return within the context's cache. Returns
+    are keyed on the task's arguments. If `ttl` is given, returns expire after that many
+    seconds. If `maxsize` is given, only that many returns are kept."""
 
     def decorator(cls):
         cls.memoize = True
+        cls.memoize_ttl = ttl
+        cls.memoize_maxsize = maxsize
+        return cls
+
+    return decorator
+
+
+def invalidates(*task_names, on=None):
+    """Decorator to declare the memoized tasks whose returns are invalidated by running
+    this task. If `on` names an argument, only returns whose first argument matches its
+    value are invalidated, otherwise all returns are."""
+
+    def decorator(cls):
+        cls.invalidated_tasks = task_names
+        cls.invalidated_on = on
+        return cls
+
+    return decorator
+
+
+def fact(ttl=None):
+    """Decorator to declare the task returns a fact about the host. Facts are kept for the
+    life of the context and persisted across runs until `ttl` seconds have passed."""
+
+    def decorator(cls):
+        cls.fact = True
+        cls.fact_ttl = ttl
         return cls
 
     return decorator
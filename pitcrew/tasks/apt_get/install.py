@@ -1,9 +1,9 @@
-import re
 from pitcrew import task
 
 
 @task.varargs("packages", type=str, desc="The package to install")
 @task.returns("The version of the installed package")
+@task.invalidates("apt_get.policy", on="packages")
 class AptgetInstall(task.BaseTask):
     """Install a package using apt-get"""
 
@@ -22,9 +22,6 @@ class AptgetInstall(task.BaseTask):
         return code == 0
 
     async def get_version(self, name) -> str:
-        policy_output = await self.sh(f"apt-cache policy {self.esc(name)}")
-        m = re.search("Installed: (.*?)\n", policy_output)
-        assert m, "no version found"
-        installed_version = m.group(1)
+        installed_version = await self.apt_get.policy(name)
         assert installed_version != "(none)", "Installed version is (none)"
         return installed_version
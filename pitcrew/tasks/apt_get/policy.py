@@ -0,0 +1,15 @@
+import re
+from pitcrew import task
+
+
+@task.arg("package", desc="The package to look up", type=str)
+@task.returns("The installed version of the package, or (none) if it isn't installed")
+@task.memoize(ttl=60)
+class AptgetPolicy(task.BaseTask):
+    """Gets the installed version of a package using apt-cache policy"""
+
+    async def run(self) -> str:
+        policy_output = await self.sh(f"apt-cache policy {self.params.esc_package}")
+        m = re.search("Installed: (.*?)\n", policy_output)
+        assert m, "no version found"
+        return m.group(1)
@@ -0,0 +1,21 @@
+from pitcrew import task
+
+
+@task.returns(
+    "A dict with the user, kernel, kernel_release, machine, os_id, os_version, cpu_count, memory_kb and package_manager"
+)
+@task.fact(ttl=86400)
+class FactsSystemInfo(task.BaseTask):
+    """Returns facts about the system gathered from a single probe"""
+
+    async def run(self) -> dict:
+        return await self.context.gather_facts()
+
+
+class FactsSystemInfoTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        info = await self.facts.system.info()
+        assert info["user"] == "root"
+        assert info["os_id"] == "ubuntu"
+        assert await self.facts.system.uname() == "linux"
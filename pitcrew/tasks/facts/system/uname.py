@@ -2,7 +2,7 @@ from pitcrew import task
 
 
 @task.returns("The name of the platform")
-@task.memoize()
+@task.fact(ttl=86400)
 class Uname(task.BaseTask):
     """Returns the lowercase name of the platform"""
 
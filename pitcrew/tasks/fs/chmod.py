@@ -4,6 +4,7 @@ from pitcrew import task
 @task.arg("path", desc="The path to change the mode of", type=str)
 @task.arg("mode", desc="The mode", type=str)
 @task.returns("The bytes of the file")
+@task.invalidates("fs.stat", "fs.digests.sha256", "fs.digests.md5", on="path")
 class FsChmod(task.BaseTask):
     """Changes the file mode of the specified path"""
 
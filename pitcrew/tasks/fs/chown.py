@@ -5,6 +5,7 @@ from pitcrew import task
 @task.arg("owner", desc="The owner", type=str)
 @task.opt("group", desc="The owner", type=str)
 @task.returns("The bytes of the file")
+@task.invalidates("fs.stat", "fs.digests.sha256", "fs.digests.md5", on="path")
 class FsChown(task.BaseTask):
     """Changes the file mode of the specified path"""
 
@@ -4,6 +4,7 @@ from pitcrew import task
 
 @task.arg("path", desc="The path of the file to digest", type=str)
 @task.returns("The md5 digest in hexadecimal")
+@task.memoize(ttl=60)
 class FsDigestsMd5(task.BaseTask):
     """Gets md5 digest of path"""
 
@@ -4,6 +4,7 @@ from pitcrew import task
 
 @task.arg("path", desc="The path of the file to digest", type=str)
 @task.returns("The sha256 digest in hexadecimal")
+@task.memoize(ttl=60)
 class FsDigestsSha256(task.BaseTask):
     """Gets sha256 digest of path"""
 
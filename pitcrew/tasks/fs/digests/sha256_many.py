@@ -0,0 +1,25 @@
+import hashlib
+from pitcrew import task
+
+
+@task.arg("paths", desc="The paths of the files to digest", type=list)
+@task.returns("a dict of each path to its sha256 digest, or None if it isn't a file")
+class FsDigestsSha256Many(task.BaseTask):
+    """Gets the sha256 digests of many paths in as few commands as possible"""
+
+    async def run(self) -> dict:
+        if not self.params.paths:
+            return {}
+        probes = await self.fs.probe(*self.params.paths, digest=True)
+        return {probe.path: probe.sha256 for probe in probes}
+
+
+class FsDigestsSha256ManyTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        content = b"Some delicious bytes"
+        await self.fs.write("/tmp/some-file", content)
+        digests = await self.fs.digests.sha256_many(["/tmp/some-file", "/tmp"])
+        expected_digest = hashlib.sha256(content).hexdigest()
+        assert digests["/tmp/some-file"] == expected_digest, "digests are not equal"
+        assert digests["/tmp"] is None, "directory has a digest"
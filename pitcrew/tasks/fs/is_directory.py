@@ -7,5 +7,5 @@ class FsIsDirectory(task.BaseTask):
     """Checks if the path is a directory"""
 
     async def run(self) -> bool:
-        code, _, _ = await self.sh_with_code(f"test -d {self.params.esc_path}")
-        return code == 0
+        (probe,) = await self.fs.probe(self.params.path)
+        return probe.type == "directory"
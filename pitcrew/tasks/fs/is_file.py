@@ -7,5 +7,5 @@ class FsIsFile(task.BaseTask):
     """Checks if the path is a file"""
 
     async def run(self) -> bool:
-        code, _, _ = await self.sh_with_code(f"test -f {self.params.esc_path}")
-        return code == 0
+        (probe,) = await self.fs.probe(self.params.path)
+        return probe.type == "file"
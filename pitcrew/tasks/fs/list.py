@@ -1,4 +1,5 @@
 from pitcrew import task
+from pitcrew import snapshot
 
 
 @task.arg("path", desc="The file to read", type=str)
@@ -7,5 +8,12 @@ class FsList(task.BaseTask):
     """List the files in a directory."""
 
     async def run(self) -> list:
+        fs_snapshot = self.context.snapshot
+        path = snapshot.absolute(self.params.path, self.context.directory)
+        if fs_snapshot and path:
+            names = fs_snapshot.list(path)
+            if names is not snapshot.UNKNOWN:
+                # like ls, hidden files aren't listed
+                return [name for name in names if not name.startswith(".")]
         out = await self.sh(f"ls -1 {self.params.esc_path}")
         return out.strip().split("\n")
@@ -0,0 +1,195 @@
+from pitcrew import task
+from pitcrew import snapshot
+
+PROBE_SCRIPT = """
+for p in "$@"; do
+  if [ -d "$p" ]; then t=directory
+  elif [ -f "$p" ]; then t=file
+  elif [ -e "$p" ] || [ -L "$p" ]; then t=other
+  else echo missing; continue
+  fi
+  s=$(stat {stat_flags} -- "$p" 2>/dev/null) || {{ echo missing; continue; }}
+  d=-
+  if [ "$t" = file ] && [ {digest} = 1 ]; then
+    d=$({digest_command} -- "$p" 2>/dev/null | cut -d " " -f 1)
+    [ -n "$d" ] || d=-
+  fi
+  echo "$t $d $s"
+done
+"""
+
+STAT_FLAGS = {
+    "darwin": '-f "%i %p %u %g %z %a %m %c %k %b"',
+    "linux": '--format "%i %f %u %g %s %X %Y %W %B %b"',
+}
+
+DIGEST_COMMANDS = {"darwin": "shasum -a256", "linux": "sha256sum"}
+
+# commands run over ssh are passed to the remote shell as a single argument, which linux
+# limits to 128KiB, so the paths are split across commands well short of that
+MAX_COMMAND_LENGTH = 65536
+
+
+class Probe:
+    path: str
+    exists: bool
+    type: str
+    sha256: str
+    inode: int
+    mode: str
+    user_id: int
+    group_id: int
+    size: int
+    access_time: int
+    modify_time: int
+    create_time: int
+    block_size: int
+    blocks: int
+
+    def __str__(self):
+        if not self.exists:
+            return f"path={self.path} exists=False"
+        return f"path={self.path} type={self.type} mode={self.mode} size={self.size} modify_time={self.modify_time} sha256={self.sha256}"
+
+
+def chunk_paths(esc_paths, max_length):
+    """Splits escaped paths into lists whose joined length stays under the maximum."""
+    chunk = []
+    length = 0
+    for esc_path in esc_paths:
+        if chunk and length + len(esc_path) + 1 > max_length:
+            yield chunk
+            chunk = []
+            length = 0
+        chunk.append(esc_path)
+        length += len(esc_path) + 1
+    if chunk:
+        yield chunk
+
+
+def parse_probe(path, line, platform) -> Probe:
+    probe = Probe()
+    probe.path = path
+    parts = line.split(" ")
+    probe.exists = parts[0] != "missing"
+    probe.type = None
+    probe.sha256 = None
+    if not probe.exists:
+        return probe
+    probe.type = parts[0]
+    if parts[1] != "-":
+        probe.sha256 = parts[1]
+    # darwin prints the mode in octal and linux in hexadecimal
+    mode_base = 8 if platform == "darwin" else 16
+    probe.inode = int(parts[2])
+    probe.mode = "{0:o}".format(int(parts[3], mode_base))
+    probe.user_id = int(parts[4])
+    probe.group_id = int(parts[5])
+    probe.size = int(parts[6])
+    probe.access_time = int(parts[7])
+    probe.modify_time = int(parts[8])
+    probe.create_time = int(parts[9])
+    probe.block_size = int(parts[10])
+    probe.blocks = int(parts[11])
+    return probe
+
+
+def probe_from_entry(path, entry) -> Probe:
+    """Builds a probe from the context's filesystem snapshot, which doesn't know creation
+    times and counts blocks of 512 bytes as `find` does."""
+    probe = Probe()
+    probe.path = path
+    probe.exists = entry is not None
+    probe.type = None
+    probe.sha256 = None
+    if not probe.exists:
+        return probe
+    probe.type = entry.type
+    probe.inode = entry.inode
+    probe.mode = entry.mode
+    probe.user_id = entry.user_id
+    probe.group_id = entry.group_id
+    probe.size = entry.size
+    probe.access_time = entry.access_time
+    probe.modify_time = entry.modify_time
+    probe.create_time = 0
+    probe.block_size = 512
+    probe.blocks = entry.blocks
+    return probe
+
+
+def entry_from_probe(probe):
+    if not probe.exists:
+        return None
+    return snapshot.Entry(
+        snapshot.link_type(probe.mode),
+        probe.type,
+        probe.mode,
+        probe.size,
+        probe.modify_time,
+        probe.access_time,
+        probe.inode,
+        probe.user_id,
+        probe.group_id,
+        probe.blocks,
+    )
+
+
+@task.varargs("paths", type=str, desc="The paths to probe")
+@task.opt("digest", type=bool, default=False, desc="Include the sha256 digest of files")
+@task.returns("a probe for each path, with its type, stat fields and digest")
+class FsProbe(task.BaseTask):
+    """Gets the type, stat info and optionally the digest of paths in as few commands as possible"""
+
+    async def run(self) -> list:
+        paths = self.params.paths or []
+        probes = {}
+        fs_snapshot = self.context.snapshot
+        if fs_snapshot and not self.params.digest:
+            for path in paths:
+                absolute_path = snapshot.absolute(path, self.context.directory)
+                if absolute_path:
+                    entry = fs_snapshot.lookup(absolute_path)
+                    if entry is not snapshot.UNKNOWN:
+                        probes[path] = probe_from_entry(path, entry)
+        unknown_paths = [path for path in paths if path not in probes]
+        for probe in await self._probe(unknown_paths):
+            probes[probe.path] = probe
+            if fs_snapshot:
+                absolute_path = snapshot.absolute(probe.path, self.context.directory)
+                if absolute_path:
+                    fs_snapshot.update(absolute_path, entry_from_probe(probe))
+        return [probes[path] for path in paths]
+
+    async def _probe(self, paths):
+        if not paths:
+            return []
+        platform = await self.facts.system.uname()
+        if platform not in STAT_FLAGS:
+            raise Exception(f"Can't support {platform}")
+        script = PROBE_SCRIPT.format(
+            stat_flags=STAT_FLAGS[platform],
+            digest=1 if self.params.digest else 0,
+            digest_command=DIGEST_COMMANDS[platform],
+        )
+        command = f"/bin/sh -c {self.esc(script)} probe"
+        lines = []
+        esc_paths = [self.esc(path) for path in paths]
+        for chunk in chunk_paths(esc_paths, MAX_COMMAND_LENGTH - len(command)):
+            out = await self.sh(f"{command} {' '.join(chunk)}")
+            lines.extend(out.splitlines())
+        return [parse_probe(path, line, platform) for path, line in zip(paths, lines)]
+
+
+class FsProbeTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        await self.fs.write("/tmp/some-file", b"Some delicious bytes")
+        file_probe, dir_probe, missing = await self.fs.probe(
+            "/tmp/some-file", "/tmp", "/tmp/missing", digest=True
+        )
+        assert file_probe.type == "file", "type is incorrect"
+        assert file_probe.size == 20, "size is incorrect"
+        assert file_probe.sha256 is not None, "digest is missing"
+        assert dir_probe.type == "directory", "type is incorrect"
+        assert not missing.exists, "missing path exists"
@@ -0,0 +1,28 @@
+from pitcrew import task
+
+
+@task.arg("path", desc="The file to read", type=str)
+@task.arg("local_path", desc="The local file to write into", type=str)
+@task.returns("The number of bytes read")
+class FsReadInto(task.BaseTask):
+    """Read the contents of path into a local file, streaming it rather than holding the
+    whole file in memory"""
+
+    async def run(self) -> int:
+        size = 0
+        with open(self.params.local_path, "wb") as fh:
+            async for chunk in self.sh_stream(f"cat {self.params.esc_path}"):
+                fh.write(chunk)
+                size += len(chunk)
+        return size
+
+
+class FsReadIntoTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        with self.cd("/tmp"):
+            await self.sh("echo 'some content' > some-file")
+            size = await self.fs.read_into("some-file", "/tmp/read-into-test")
+            assert size == 13
+            with open("/tmp/read-into-test", "rb") as fh:
+                assert fh.read() == b"some content\n"
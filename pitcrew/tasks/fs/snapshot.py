@@ -0,0 +1,34 @@
+from pitcrew import task
+from pitcrew import snapshot
+
+
+@task.varargs("roots", type=str, desc="The directories to index")
+@task.opt("ttl", type=int, desc="The number of seconds the snapshot is used for")
+@task.returns("The number of paths indexed")
+class FsSnapshot(task.BaseTask):
+    """Indexes the paths under directories, so fs tasks can answer from the index"""
+
+    async def run(self) -> int:
+        roots = []
+        for root in self.params.roots:
+            path = snapshot.absolute(root, self.context.directory)
+            assert path, f"can't resolve {root} to an absolute path"
+            roots.append(path)
+        platform = await self.facts.system.uname()
+        if platform != "linux":
+            raise Exception(f"Can't support {platform}")
+        code, out, err = await self.sh_with_code(snapshot.scan_command(roots))
+        assert code == 0, f"couldn't scan {' '.join(roots)}: {err.decode()}"
+        entries = snapshot.parse_scan(out)
+        ttl = self.params.ttl or snapshot.SNAPSHOT_TTL
+        self.context.snapshot = snapshot.Snapshot(roots, entries, ttl=ttl)
+        return len(entries)
+
+
+class FsSnapshotTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        await self.fs.write("/tmp/some-file", b"Some delicious bytes")
+        assert await self.fs.snapshot("/tmp") > 0, "nothing was indexed"
+        assert await self.fs.is_file("/tmp/some-file"), "file is missing"
+        assert not await self.fs.is_file("/tmp/missing"), "missing file exists"
@@ -19,35 +19,16 @@ class Stat:
 
 @task.arg("path", desc="The path of the file to stat", type=str)
 @task.returns("the stat object for the file")
+@task.memoize(ttl=60)
 class FsStat(task.BaseTask):
-
     """Get stat info for path"""
 
     async def run(self) -> Stat:
+        (probe,) = await self.fs.probe(self.params.path)
+        assert probe.exists, f"{self.params.path} doesn't exist"
         stat = Stat()
-        platform = await self.facts.system.uname()
-        if platform == "darwin":
-            out = await self.sh(
-                f'stat -f "%i %p %u %g %z %a %m %c %k %b" {self.params.esc_path}'
-            )
-            parts = out.strip().split(" ", 9)
-        elif platform == "linux":
-            out = await self.sh(
-                f'stat --format "%i %f %u %g %s %X %Y %W %B %b" {self.params.esc_path}'
-            )
-            parts = out.strip().split(" ", 9)
-        else:
-            raise Exception(f"Can't support {platform}")
-        stat.inode = int(parts[0])
-        stat.mode = "{0:o}".format(int(parts[1], 16))
-        stat.user_id = int(parts[2])
-        stat.group_id = int(parts[3])
-        stat.size = int(parts[4])
-        stat.access_time = int(parts[5])
-        stat.modify_time = int(parts[6])
-        stat.create_time = int(parts[7])
-        stat.block_size = int(parts[8])
-        stat.blocks = int(parts[9])
+        for name in Stat.__annotations__:
+            setattr(stat, name, getattr(probe, name))
         return stat
 
 
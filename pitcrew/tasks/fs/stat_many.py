@@ -0,0 +1,22 @@
+from pitcrew import task
+
+
+@task.arg("paths", desc="The paths of the files to stat", type=list)
+@task.returns("a dict of each path to its stat info, or None if it doesn't exist")
+class FsStatMany(task.BaseTask):
+    """Get stat info for many paths in as few commands as possible"""
+
+    async def run(self) -> dict:
+        if not self.params.paths:
+            return {}
+        probes = await self.fs.probe(*self.params.paths)
+        return {probe.path: probe if probe.exists else None for probe in probes}
+
+
+class FsStatManyTest(task.TaskTest):
+    @task.TaskTest.ubuntu
+    async def test_ubuntu(self):
+        await self.fs.write("/tmp/some-file", b"Some delicious bytes")
+        stats = await self.fs.stat_many(["/tmp/some-file", "/tmp/missing"])
+        assert stats["/tmp/some-file"].size == 20, "size is incorrect"
+        assert stats["/tmp/missing"] is None, "missing file has stat info"
@@ -2,6 +2,7 @@ from pitcrew import task
 
 
 @task.arg("path", desc="The path to change the mode of", type=str)
+@task.invalidates("fs.stat", "fs.digests.sha256", "fs.digests.md5", on="path")
 class FsTouch(task.BaseTask):
     """Touches a file"""
 
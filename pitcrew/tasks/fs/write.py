@@ -1,23 +1,65 @@
+import os
 import hashlib
 from pitcrew import task
+from pitcrew.file import File, LocalFile
 
 
 @task.arg("path", type=str, desc="The path of the file to write to")
-@task.arg("content", type=bytes, desc="The contents to write")
+@task.arg(
+    "content",
+    type=any,
+    desc="The contents to write, as bytes, a str, a file or an async iterable of bytes",
+)
+@task.invalidates("fs.stat", "fs.digests.sha256", "fs.digests.md5", on="path")
 class FsWrite(task.BaseTask):
-    """Write bytes to a file"""
+    """Write bytes to a file, streaming files and async iterables a chunk at a time"""
+
+    expected = None
 
     async def verify(self):
-        stat = await self.fs.stat(self.params.path)
-        assert len(self.params.content) == stat.size
-        expected_digest = hashlib.sha256(self.params.content).hexdigest()
-        actual_digest = await self.fs.digests.sha256(self.params.path)
-        assert actual_digest == expected_digest
+        expected = await self._expected()
+        # the digest of an async iterable is only known once it's been written
+        assert expected is not None
+        size, digest = expected
+        (probe,) = await self.fs.probe(self.params.path, digest=True)
+        assert probe.type == "file"
+        assert size == probe.size
+        assert probe.sha256 == digest
 
     async def run(self):
-        await self.sh(
-            f"tee {self.params.esc_path} > /dev/null", stdin=self.params.content
-        )
+        content = self._content()
+        if isinstance(content, File):
+            # the command writing the content holds the command semaphore for both
+            content = content.chunks(acquire=False)
+        if not isinstance(content, bytes):
+            content = self._hashed(content)
+        await self.sh(f"tee {self.params.esc_path} > /dev/null", stdin=content)
+
+    async def _expected(self):
+        if self.expected is None:
+            content = self._content()
+            if isinstance(content, bytes):
+                self.expected = (len(content), hashlib.sha256(content).hexdigest())
+            elif isinstance(content, LocalFile):
+                self.expected = (os.path.getsize(content.path), await content.sha256())
+        return self.expected
+
+    def _content(self):
+        content = self.params.content
+        if isinstance(content, str):
+            return content.encode()
+        if isinstance(content, bytearray):
+            return bytes(content)
+        return content
+
+    async def _hashed(self, chunks):
+        hasher = hashlib.sha256()
+        size = 0
+        async for chunk in chunks:
+            hasher.update(chunk)
+            size += len(chunk)
+            yield chunk
+        self.expected = (size, hasher.hexdigest())
 
 
 class FsWriteTest(task.TaskTest):
@@ -27,3 +69,11 @@ class FsWriteTest(task.TaskTest):
             await self.fs.write("some-file", b"some content")
             out = await self.sh("cat some-file")
             assert out == "some content"
+
+            async def chunks():
+                for _ in range(100):
+                    yield b"x" * 1000
+
+            await self.fs.write("some-file", chunks())
+            stat = await self.fs.stat("some-file")
+            assert stat.size == 100000, "size is incorrect"
@@ -17,7 +17,10 @@ class SSHProvider:
     async def __aenter__(self):
         last_tunnel = None
         for tunnel in self.tunnels:
-            context = self.context.ssh_context(tunnel=last_tunnel, **tunnel)
+            # tunnels only forward connections, and may not allow running commands
+            context = self.context.ssh_context(
+                tunnel=last_tunnel, probe=False, **tunnel
+            )
             self.tunnel_contexts.append(context)
             await context.__aenter__()
             last_tunnel = context.connection
@@ -25,7 +28,7 @@ class SSHProvider:
     async def __aexit__(self, exc_type, exc_value, traceback):
         for context in reversed(self.tunnel_contexts):
             try:
-                await context.__aexit__()
+                await context.__aexit__(None, None, None)
             except:
                 pass
         if exc_type:
@@ -74,6 +77,12 @@ class SSHProvider:
     desc="Specify if forwarding is enabled",
 )
 @task.opt("agent_path", type=str, desc="Specify if forwarding is enabled")
+@task.opt(
+    "persistent_session",
+    type=bool,
+    default=False,
+    desc="Run commands over one long-lived remote shell per host",
+)
 @task.opt("ask_password", type=str, desc="The prompt to use for asking for a password")
 class ProvidersSsh(task.BaseTask):
     """A provider for ssh contexts"""
@@ -90,5 +99,6 @@ class ProvidersSsh(task.BaseTask):
             self.params.user,
             tunnels=self.params.tunnels,
             agent_forwarding=self.params.agent_forwarding,
+            persistent_session=self.params.persistent_session,
             **extra_args,
         )
@@ -1,6 +1,3 @@
-from pitcrew.logger import logger
-
-
 class TestRunner:
     def __init__(self, app, context):
         self.app = app
@@ -15,5 +12,5 @@ class TestRunner:
                 for name, val in test_cls.__dict__.items():
                     if name.startswith("test_"):
                         test_method = getattr(test, name)
-                        with logger.with_test(task, name):
+                        with self.app.hooks.test(task, name):
                             await test_method()
@@ -0,0 +1,140 @@
+"""A tracer is a plugin which collects a span for every task, copy and shell command, and
+writes them out as a Chrome Trace Event file, which can be opened in Perfetto or
+chrome://tracing. Register it with an app's hooks:
+
+    tracer = Tracer()
+    app.hooks.register(tracer)
+
+Each host is a process in the trace, and each asyncio task working on the host, such as
+the branches of a gather, a thread within it, so spans on a track always nest. Besides
+tasks, copies and commands, connecting to a host and the verify and run phases of tasks
+which verify are traced.
+
+`crew run --trace out.json` does this for a run.
+"""
+
+import json
+import time
+import asyncio
+from pitcrew.logger import descriptor, error_string, task_args, truncated_value
+
+# the process for spans which don't belong to a host, such as task tests
+NO_HOST = "pitcrew"
+
+
+def current_task_id():
+    try:
+        return id(asyncio.current_task())
+    except RuntimeError:
+        return None
+
+
+def encode(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+class Tracer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.processes = {}
+        self.threads = {}
+
+    def span(self, host, name, category, start, end=None, args=None):
+        """Records a span which ran from `start` to `end`, or until now, as given by
+        time.perf_counter."""
+        if end is None:
+            end = time.perf_counter()
+        pid = self._process(host or NO_HOST)
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": self._thread(pid),
+                "args": args or {},
+            }
+        )
+
+    def on_task_end(self, task, started, error):
+        args = task_args(task)
+        if error:
+            args["error"] = error_string(error)
+        elif task.return_value:
+            args["result"] = truncated_value(task.return_value)
+        self.span(descriptor(task.context), task.name, "task", started, args=args)
+
+    def on_sh_end(self, context, command, started, code, out, err):
+        self.span(
+            descriptor(context),
+            truncated_value(" ".join(command.split())),
+            "shell",
+            started,
+            args={
+                "command": command,
+                "code": code,
+                "out": truncated_value(out),
+                "err": truncated_value(err),
+            },
+        )
+
+    def on_copy_end(self, src, dest, started, error, transferred):
+        args = {"src": str(src), "dest": str(dest)}
+        if error:
+            args["error"] = error_string(error)
+        if transferred is not None:
+            args["bytes"] = transferred
+        self.span(
+            descriptor(dest.context), f"copy {src.path}", "copy", started, args=args
+        )
+
+    def on_test_end(self, task, name, started, error):
+        args = {"error": error_string(error)} if error else {}
+        self.span(None, f"{task.task_name} {name}", "test", started, args=args)
+
+    def on_connect(self, context, started, error):
+        args = {"error": error_string(error)} if error else {}
+        self.span(descriptor(context), "connect", "phase", started, args=args)
+
+    def on_phase(self, context, name, started, error):
+        args = {"error": error_string(error)} if error else {}
+        self.span(descriptor(context), name, "phase", started, args=args)
+
+    def trace(self) -> dict:
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": host}}
+            for host, pid in self.processes.items()
+        ]
+        metadata += [
+            {
+                "name": "process_sort_index",
+                "ph": "M",
+                "pid": pid,
+                "args": {"sort_index": pid},
+            }
+            for pid in self.processes.values()
+        ]
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w") as fh:
+            json.dump(self.trace(), fh, default=encode)
+
+    def _process(self, host):
+        pid = self.processes.get(host)
+        if pid is None:
+            pid = self.processes[host] = len(self.processes) + 1
+        return pid
+
+    def _thread(self, pid):
+        # ids may be reused once a task is gone, but by then its spans have ended
+        key = (pid, current_task_id())
+        tid = self.threads.get(key)
+        if tid is None:
+            tid = self.threads[key] = len(self.threads) + 1
+        return tid
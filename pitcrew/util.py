@@ -24,15 +24,16 @@ class OutputEncoder(json.JSONEncoder):
 
 
 class ResultsPrinter:
-    def __init__(self, results):
+    def __init__(self, results, stream=None):
         self.results = results
+        self.stream = stream or sys.stdout
 
     def print(self):
         results = self.results
         if results.passed:
             sys.stderr.write("Passed:\n")
-            sys.stdout.write(json.dumps(results.passed, cls=OutputEncoder))
-            sys.stdout.flush()
+            self.stream.write(json.dumps(results.passed, cls=OutputEncoder))
+            self.stream.flush()
             sys.stderr.write("\n")
         if results.failed:
             sys.stderr.write("Failed:\n")
@@ -45,23 +46,58 @@ class ResultsPrinter:
             sys.stderr.write("\n")
             sys.stderr.flush()
 
-        sys.stderr.write(f"\n 🔧🔧🔧 Finished 🔧🔧🔧\n")
+        print_summary(len(results.passed), len(results.failed), len(results.errored))
 
-        sys.stderr.write("\nSummary")
-        if len(results.passed) != 0:
-            sys.stderr.write(f" \033[32mpassed={len(results.passed)}\033[0m")
-        else:
-            sys.stderr.write(f" passed={len(results.passed)}")
 
-        if len(results.failed) != 0:
-            sys.stderr.write(f" \033[31mfailed={len(results.failed)}\033[0m")
-        else:
-            sys.stderr.write(f" failed={len(results.failed)}")
+class ResultsStreamer:
+    """A result sink which writes each result to the stream as a line of JSON as soon as
+    it arrives. Only counts are kept for the summary, so memory use doesn't grow with the
+    number of contexts."""
 
-        if len(results.errored) != 0:
-            sys.stderr.write(f" \033[31;1merrored={len(results.errored)}\033[0m")
-        else:
-            sys.stderr.write(f" errored={len(results.errored)}")
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.passed = 0
+        self.failed = 0
+        self.errored = 0
+
+    def append(self, result):
+        status = result.status()
+        line = json.dumps(
+            {
+                "context": result.context.descriptor(),
+                "status": status,
+                "result": result.result,
+                "exception": result.exception,
+            },
+            cls=OutputEncoder,
+        )
+        self.stream.write(line)
+        self.stream.write("\n")
+        self.stream.flush()
+        setattr(self, status, getattr(self, status) + 1)
+
+    def print(self):
+        print_summary(self.passed, self.failed, self.errored)
+
+
+def print_summary(passed, failed, errored):
+    sys.stderr.write(f"\n 🔧🔧🔧 Finished 🔧🔧🔧\n")
+
+    sys.stderr.write("\nSummary")
+    if passed != 0:
+        sys.stderr.write(f" \033[32mpassed={passed}\033[0m")
+    else:
+        sys.stderr.write(f" passed={passed}")
+
+    if failed != 0:
+        sys.stderr.write(f" \033[31mfailed={failed}\033[0m")
+    else:
+        sys.stderr.write(f" failed={failed}")
+
+    if errored != 0:
+        sys.stderr.write(f" \033[31;1merrored={errored}\033[0m")
+    else:
+        sys.stderr.write(f" errored={errored}")
 
-        sys.stderr.write("\n")
-        sys.stderr.flush()
+    sys.stderr.write("\n")
+    sys.stderr.flush()
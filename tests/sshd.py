@@ -0,0 +1,115 @@
+"""An in-process SSH server for unit tests and benchmarks. Commands received by the
+server are run with the local `/bin/sh`, so it behaves like an sshd listening on localhost
+which accepts any user without authentication. SFTP is served from the local filesystem.
+It lives with the tests so it's never installed along with pitcrew."""
+
+import os
+import signal
+import asyncio
+import asyncssh
+
+
+class NoAuthServer(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return False
+
+
+async def _pump(reader, writer):
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            break
+        writer.write(data)
+        await writer.drain()
+
+
+async def _handle_process(process):
+    command = process.command or "/bin/sh"
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=dict(process.env) if process.env else None,
+        start_new_session=True,
+    )
+
+    async def feed_stdin():
+        try:
+            while True:
+                data = await process.stdin.read(65536)
+                if not data:
+                    break
+                proc.stdin.write(data)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            proc.stdin.close()
+
+    stdin_future = asyncio.ensure_future(feed_stdin())
+    pumps = [
+        asyncio.ensure_future(_pump(proc.stdout, process.stdout)),
+        asyncio.ensure_future(_pump(proc.stderr, process.stderr)),
+    ]
+    try:
+        await asyncio.gather(*pumps)
+        process.exit(await proc.wait())
+    except (asyncssh.Error, OSError):
+        # the client closed the channel before the command finished
+        for pump in pumps:
+            pump.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+        if proc.returncode is None:
+            os.killpg(proc.pid, signal.SIGKILL)
+        await proc.communicate()
+    finally:
+        stdin_future.cancel()
+
+
+class LocalSSHServer:
+    """Runs an SSH server on localhost for the duration of an `async with` block."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.handlers = set()
+
+    async def __aenter__(self):
+        self.server = await asyncssh.create_server(
+            NoAuthServer,
+            self.host,
+            self.port,
+            server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+            process_factory=self._handle_process,
+            sftp_factory=True,
+            encoding=None,
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.server.close()
+        await self.server.wait_closed()
+        if self.handlers:
+            await asyncio.wait(self.handlers, timeout=5)
+
+    async def _handle_process(self, process):
+        # commands are tracked so they can finish before the server is torn down
+        handler = asyncio.current_task()
+        self.handlers.add(handler)
+        try:
+            await _handle_process(process)
+        finally:
+            self.handlers.discard(handler)
+
+    def connection_kwargs(self):
+        """Keyword arguments for `ssh_context` to connect to this server."""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "known_hosts": None,
+            "agent_path": None,
+            "client_keys": None,
+        }
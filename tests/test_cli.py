@@ -3,6 +3,7 @@ import os
 import getpass
 import json
 import shutil
+import tempfile
 from click.testing import CliRunner
 import unittest
 from pitcrew.cli import cli
@@ -98,6 +99,42 @@ class TestCli(unittest.TestCase):
             )
             self.assertEqual(result.stdout_bytes.decode(), expected_output)
 
+    def test_run_jsonl(self):
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(
+            cli, ["run", "--output", "jsonl", "fs.read", "requirements.txt"]
+        )
+        self.assertEqual(result.exit_code, 0)
+
+        with open("requirements.txt", "r") as fh:
+            expected_output = json.dumps(
+                {
+                    "context": f"{getpass.getuser()}@local",
+                    "status": "passed",
+                    "result": fh.read(),
+                    "exception": None,
+                }
+            )
+            self.assertEqual(result.stdout_bytes.decode(), expected_output + "\n")
+
+    def test_run_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, "trace.json")
+            runner = CliRunner(mix_stderr=False)
+            result = runner.invoke(
+                cli, ["run", "--quiet", "--trace", trace_path, "fs.read", "setup.py"]
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertNotIn(b"Invoking", result.stderr_bytes)
+            with open(trace_path) as fh:
+                events = json.load(fh)["traceEvents"]
+        spans = {
+            (event["cat"], event["name"]) for event in events if event["ph"] == "X"
+        }
+        self.assertIn(("task", "fs.read"), spans)
+        self.assertIn(("phase", "connect"), spans)
+        self.assertIn(("shell", "cat setup.py"), spans)
+
     def test_run_with_binary(self):
         base64_data = "CUGhip285YEjnHE4Cel0/lA5OLPV5gEsuEGMEfR7"
         with open("test_data", "wb") as fh:
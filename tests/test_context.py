@@ -0,0 +1,160 @@
+import asyncio
+import getpass
+import tempfile
+import aiounittest
+from unittest import mock
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class StreamTests:
+    async def check_stream(self, ctx):
+        self.assertEqual(
+            await collect(ctx.sh_stream("printf 'a\\nbb\\nccc'", lines=True)),
+            [b"a\n", b"bb\n", b"ccc"],
+        )
+        chunks = await collect(
+            ctx.sh_stream("head -c 100000 /dev/zero", chunk_size=4096)
+        )
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(b"".join(chunks), bytes(100000))
+        self.assertEqual(
+            b"".join(
+                await collect(
+                    ctx.sh_stream("cat; echo $FOO", stdin=b"in ", env={"FOO": "x"})
+                )
+            ),
+            b"in x\n",
+        )
+        with self.assertRaises(AssertionError):
+            await collect(ctx.sh_stream("echo partial; exit 2"))
+        stream = ctx.sh_stream("yes", lines=True)
+        async for line in stream:
+            self.assertEqual(line, b"y\n")
+            break
+        await stream.aclose()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            await ctx.sh(f"head -c 300000 /dev/urandom > {tmp}/source")
+            size = await ctx.fs.read_into(f"{tmp}/source", f"{tmp}/dest")
+            self.assertEqual(size, 300000)
+            with open(f"{tmp}/source", "rb") as src, open(f"{tmp}/dest", "rb") as dest:
+                self.assertEqual(src.read(), dest.read())
+
+
+class TestLocalContext(StreamTests, aiounittest.AsyncTestCase):
+    async def test_sh_stream(self):
+        async with App() as app:
+            await self.check_stream(app.local_context)
+
+
+class TestSSHContext(StreamTests, aiounittest.AsyncTestCase):
+    async def run_commands(self, **kwargs):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs(), **kwargs
+            )
+            async with ctx:
+                self.assertEqual(await ctx.sh("printf hello"), "hello")
+                self.assertEqual(
+                    await ctx.sh_with_code("echo out; echo err >&2; exit 3"),
+                    (3, b"out\n", b"err\n"),
+                )
+                self.assertEqual(await ctx.sh("echo $FOO", env={"FOO": "bar"}), "bar\n")
+                self.assertEqual(await ctx.sh("cat", stdin=b"piped"), "piped")
+                with ctx.cd("/tmp"):
+                    self.assertEqual(await ctx.sh("pwd"), "/tmp\n")
+                self.assertFalse(await ctx.sh_ok("if then"))
+                self.assertEqual(await ctx.sh("pwd && cd /"), await ctx.sh("pwd"))
+
+    async def test_per_channel(self):
+        await self.run_commands()
+
+    async def test_persistent_session(self):
+        await self.run_commands(persistent_session=True)
+
+    async def test_persistent_session_cancelled(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(),
+                **server.connection_kwargs(),
+                persistent_session=True,
+            )
+            async with ctx:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(ctx.sh("sleep 0.5; echo stale-output"), 0.1)
+                self.assertEqual(await ctx.sh("echo fresh"), "fresh\n")
+
+    async def test_sh_stream(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                await self.check_stream(ctx)
+
+
+class TestConnectionPool(aiounittest.AsyncTestCase):
+    async def test_reuses_connections(self):
+        async with LocalSSHServer() as server:
+            async with App() as app:
+                kwargs = server.connection_kwargs()
+                outer = app.local_context.ssh_context(user=getpass.getuser(), **kwargs)
+                async with outer:
+                    inner = outer.ssh_context(user=getpass.getuser(), **kwargs)
+                    async with inner:
+                        self.assertIs(inner.connection, outer.connection)
+                        self.assertEqual(await inner.sh("printf hi"), "hi")
+                self.assertEqual(len(app.connection_pool), 1)
+                app.connection_pool.idle_timeout = 0
+                app.connection_pool.evict_idle()
+                self.assertEqual(len(app.connection_pool), 0)
+
+    async def test_failed_enter_releases(self):
+        async with LocalSSHServer() as server:
+            async with App() as app:
+                ctx = app.local_context.ssh_context(
+                    user=getpass.getuser(), **server.connection_kwargs()
+                )
+
+                async def fail():
+                    raise Exception("probe failed")
+
+                with mock.patch.object(ctx, "fill_actual_user", fail):
+                    with self.assertRaisesRegex(Exception, "probe failed"):
+                        async with ctx:
+                            pass
+                app.connection_pool.idle_timeout = 0
+                app.connection_pool.evict_idle()
+                self.assertEqual(len(app.connection_pool), 0)
+
+    async def test_enter_without_probe(self):
+        async with LocalSSHServer() as server:
+            async with App() as app:
+                ctx = app.local_context.ssh_context(
+                    user=getpass.getuser(), probe=False, **server.connection_kwargs()
+                )
+
+                async def fail():
+                    raise Exception("probe failed")
+
+                with mock.patch.object(ctx, "fill_actual_user", fail):
+                    async with ctx:
+                        self.assertIsNone(ctx.actual_user)
+
+    async def test_max_connections(self):
+        async with LocalSSHServer() as server:
+            async with App() as app:
+                app.connection_pool.max_connections = 1
+                kwargs = server.connection_kwargs()
+                first = app.local_context.ssh_context(user="first", **kwargs)
+                second = app.local_context.ssh_context(user="second", **kwargs)
+                async with first:
+                    pass
+                async with second:
+                    self.assertEqual(len(app.connection_pool), 1)
+                    self.assertIsNot(first.connection, second.connection)
@@ -0,0 +1,133 @@
+import os
+import contextlib
+import random
+import getpass
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew import delta
+from pitcrew.app import App
+from pitcrew.file import delta_copiers
+from tests.sshd import LocalSSHServer
+
+
+def random_bytes(size, seed=0):
+    return random.Random(seed).getrandbits(8 * size).to_bytes(size, "little")
+
+
+class TestDelta(unittest.TestCase):
+    def rebuild(self, old, new, block_size=1024):
+        instructions = delta.delta(new, delta.signature(old, block_size))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file")
+            with open(path, "wb") as fh:
+                fh.write(old)
+            delta.apply(path, instructions)
+            with open(path, "rb") as fh:
+                self.assertEqual(fh.read(), new)
+        return instructions
+
+    def test_unchanged(self):
+        old = random_bytes(100000)
+        instructions = self.rebuild(old, old)
+        self.assertLess(len(instructions), 100)
+
+    def test_changes(self):
+        old = random_bytes(100000)
+        new = bytearray(old)
+        new[500:510] = b"x" * 10
+        new[40000:40000] = b"inserted"
+        del new[70000:70300]
+        new += b"appended"
+        instructions = self.rebuild(old, bytes(new))
+        self.assertLess(len(instructions), 5000)
+
+    def test_edge_cases(self):
+        self.rebuild(b"", random_bytes(5000))
+        self.rebuild(random_bytes(5000), b"")
+        self.rebuild(random_bytes(5000), random_bytes(5000)[:4500])
+
+    def test_too_large(self):
+        with self.assertRaises(delta.DeltaTooLarge):
+            delta.delta(
+                random_bytes(100000, seed=1),
+                delta.signature(random_bytes(100000), 1024),
+                max_literal_ratio=0.5,
+            )
+
+
+class TestDeltaCopy(aiounittest.AsyncTestCase):
+    async def test_copy_to(self):
+        old = random_bytes(300000)
+        new = old[:1000] + b"changed" + old[1000:]
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local_path = os.path.join(tmp, "local")
+                    remote_path = os.path.join(tmp, "remote")
+                    with open(local_path, "wb") as fh:
+                        fh.write(new)
+                    with open(remote_path, "wb") as fh:
+                        fh.write(old)
+                    os.chmod(remote_path, 0o640)
+                    local_file = app.local_context.file(local_path)
+                    remote_file = ctx.file(remote_path)
+
+                    self.assertTrue(await delta_copy(local_file, remote_file))
+                    with open(remote_path, "rb") as fh:
+                        self.assertEqual(fh.read(), new)
+                    self.assertEqual(os.stat(remote_path).st_mode & 0o777, 0o640)
+
+                    with open(local_path, "wb") as fh:
+                        fh.write(old)
+                    self.assertTrue(await delta_copy(remote_file, local_file))
+                    with open(local_path, "rb") as fh:
+                        self.assertEqual(fh.read(), new)
+
+                    os.remove(remote_path)
+                    await local_file.copy_to(remote_file, delta=True)
+                    with open(remote_path, "rb") as fh:
+                        self.assertEqual(fh.read(), new)
+
+    async def test_off_the_event_loop(self):
+        threads = []
+
+        def recorded(fn):
+            def wrapper(*args, **kwargs):
+                threads.append(threading.current_thread())
+                return fn(*args, **kwargs)
+
+            return wrapper
+
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local_file = app.local_context.file(os.path.join(tmp, "local"))
+                    remote_file = ctx.file(os.path.join(tmp, "remote"))
+                    shared = random_bytes(100000)
+                    for path in [local_file.path, remote_file.path]:
+                        with open(path, "wb") as fh:
+                            fh.write(shared + os.path.basename(path).encode())
+                    with contextlib.ExitStack() as stack:
+                        for name in ["delta", "signature", "apply"]:
+                            stack.enter_context(
+                                mock.patch.object(
+                                    delta, name, recorded(getattr(delta, name))
+                                )
+                            )
+                        self.assertTrue(await delta_copy(local_file, remote_file))
+                        self.assertTrue(await delta_copy(remote_file, local_file))
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+async def delta_copy(src, dest):
+    return await delta_copiers[(src.__class__, dest.__class__)](src, dest)
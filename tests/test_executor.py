@@ -0,0 +1,90 @@
+import os
+import asyncio
+import getpass
+import tempfile
+import aiounittest
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+class RepeatProvider:
+    def __init__(self, context, count):
+        self.context = context
+        self.count = count
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.count == 0:
+            raise StopAsyncIteration
+        self.count -= 1
+        return self.context
+
+
+class TestExecutor(aiounittest.AsyncTestCase):
+    async def test_bounded_workers(self):
+        app = App()
+        running = []
+        peak = []
+
+        async def fn(self):
+            running.append(self)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return True
+
+        provider = RepeatProvider(app.local_context, 50)
+        async with app.executor(provider, concurrency=5) as executor:
+            results = await executor.invoke(fn)
+            self.assertEqual(len(executor.workers), 5)
+        self.assertEqual(len(results.passed), 50)
+        self.assertEqual(max(peak), 5)
+
+    async def test_command_concurrency(self):
+        app = App()
+
+        async def fn(self):
+            await asyncio.gather(*[self.sh("sleep 0.05") for _ in range(4)])
+
+        provider = RepeatProvider(app.local_context, 1)
+        async with app.executor(provider, command_concurrency=1) as executor:
+            start = asyncio.get_event_loop().time()
+            results = await executor.invoke(fn)
+            elapsed = asyncio.get_event_loop().time() - start
+        self.assertEqual(len(results.passed), 1)
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertIsNone(app.local_context.command_semaphore)
+
+    async def test_streamed_stdin_with_one_command_slot(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            with tempfile.TemporaryDirectory() as tmp:
+                os.makedirs(os.path.join(tmp, "dir", "nested"))
+                with open(os.path.join(tmp, "dir", "nested", "file"), "w") as fh:
+                    fh.write("content")
+
+                async def fn(self):
+                    src = self.file(os.path.join(tmp, "dir", "nested", "file"))
+                    await src.copy_to(self.file(os.path.join(tmp, "streamed")))
+                    await self.file(os.path.join(tmp, "dir")).copy_to(
+                        self.file(os.path.join(tmp, "archived")), archive=True
+                    )
+                    await self.fs.write(os.path.join(tmp, "written"), src)
+
+                provider = RepeatProvider(ctx, 1)
+                async with app.executor(provider, command_concurrency=1) as executor:
+                    results = await asyncio.wait_for(executor.invoke(fn), 20)
+                self.assertEqual(len(results.passed), 1, results.failed)
+                for path in ["streamed", "archived/nested/file", "written"]:
+                    with open(os.path.join(tmp, path)) as fh:
+                        self.assertEqual(fh.read(), "content")
@@ -0,0 +1,88 @@
+import os
+import getpass
+import tempfile
+import aiounittest
+from pitcrew import task
+from pitcrew.app import App
+from pitcrew.facts import FactStore, parse_probe
+
+
+class TestFactStore(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "facts.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load(self):
+        store = FactStore(self.path)
+        store.save("host-a", "facts.system.uname", "linux")
+        store.save("host-a", "facts.expired", "old", ttl=-1)
+        store.save("host-b", "facts.system.uname", "darwin")
+        store.close()
+        store = FactStore(self.path)
+        self.assertEqual(store.load("host-a"), {"facts.system.uname": "linux"})
+        self.assertEqual(FactStore(self.path, refresh=True).load("host-a"), {})
+
+    def test_saves_written_on_flush(self):
+        store = FactStore(self.path)
+        for i in range(100):
+            store.save(f"host-{i}", "facts.system.uname", "linux")
+        self.assertEqual(store.load("host-7"), {"facts.system.uname": "linux"})
+        self.assertEqual(FactStore(self.path).load("host-7"), {})
+        store.flush()
+        self.assertEqual(store.pending, {})
+        other = FactStore(self.path)
+        self.assertEqual(other.load("host-7"), {"facts.system.uname": "linux"})
+        other.close()
+        store.close()
+
+    async def test_fact_task(self):
+        calls = []
+
+        @task.fact(ttl=60)
+        class Platform(task.BaseTask):
+            task_name = "test.platform"
+
+            async def run(self) -> str:
+                calls.append(True)
+                return "linux"
+
+        for _ in range(2):
+            app = App()
+            app.fact_store = FactStore(self.path)
+            context = app.local_context
+            async with context:
+                for _ in range(2):
+                    platform = Platform()
+                    platform.context = context
+                    self.assertEqual(await platform.invoke(), "linux")
+            app.fact_store.close()
+        self.assertEqual(calls, [True])
+
+
+class TestProbe(aiounittest.AsyncTestCase):
+    def test_parse_probe(self):
+        info = parse_probe(
+            "user=root\nkernel=Linux\ncpu_count=8\nmemory_kb=\nos_id=ubuntu\n"
+        )
+        self.assertEqual(
+            info,
+            {
+                "user": "root",
+                "kernel": "Linux",
+                "cpu_count": 8,
+                "memory_kb": None,
+                "os_id": "ubuntu",
+            },
+        )
+
+    async def test_gather_facts(self):
+        app = App(refresh_facts=True)
+        context = app.local_context
+        async with context:
+            self.assertEqual(context.actual_user, getpass.getuser())
+            info = await context.facts.system.info()
+            self.assertEqual(info["user"], getpass.getuser())
+            self.assertEqual(await context.facts.system.uname(), "linux")
@@ -0,0 +1,317 @@
+import os
+import types
+import asyncio
+import contextlib
+import getpass
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew import file
+from pitcrew.app import App
+from tests.sshd import LocalSSHServer
+
+
+class TestLocalDigests(unittest.TestCase):
+    def test_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file")
+            with open(path, "wb") as fh:
+                fh.write(b"content")
+            expected = hashlib.sha256(b"content").hexdigest()
+            self.assertEqual(file.local_sha256(path), expected)
+            with mock.patch("hashlib.sha256") as sha256:
+                self.assertEqual(file.local_sha256(path), expected)
+                sha256.assert_not_called()
+            with open(path, "wb") as fh:
+                fh.write(b"changed content")
+            self.assertEqual(
+                file.local_sha256(path), hashlib.sha256(b"changed content").hexdigest()
+            )
+
+    def test_large_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file")
+            content = os.urandom(file.MMAP_THRESHOLD + 10)
+            with open(path, "wb") as fh:
+                fh.write(content)
+            self.assertEqual(
+                file.local_sha256(path), hashlib.sha256(content).hexdigest()
+            )
+
+
+class TestSkipIfSame(aiounittest.AsyncTestCase):
+    async def test_copy_to(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local_path = os.path.join(tmp, "local")
+                    remote_path = os.path.join(tmp, "remote")
+                    with open(local_path, "wb") as fh:
+                        fh.write(b"config")
+                    src = app.local_context.file(local_path)
+                    dest = ctx.file(remote_path)
+
+                    self.assertTrue(await src.copy_to(dest, skip_if_same=True))
+                    commands = []
+                    recorder = types.SimpleNamespace(
+                        on_sh_start=lambda context, command: commands.append(context)
+                    )
+                    app.hooks.register(recorder)
+                    self.assertFalse(await src.copy_to(dest, skip_if_same=True))
+                    app.hooks.unregister(recorder)
+                    self.assertEqual(commands, [ctx])
+
+                    with open(local_path, "wb") as fh:
+                        fh.write(b"new config")
+                    self.assertTrue(await src.copy_to(dest, skip_if_same=True))
+                    with open(remote_path, "rb") as fh:
+                        self.assertEqual(fh.read(), b"new config")
+                    self.assertFalse(await src.copy_to(dest, skip_if_same=True))
+
+
+class TestCopyToMany(aiounittest.AsyncTestCase):
+    async def copy(self, count, **kwargs):
+        content = os.urandom(500000)
+        async with App() as app, contextlib.AsyncExitStack() as stack:
+            dests = []
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            for i in range(count):
+                server = await stack.enter_async_context(LocalSSHServer())
+                ctx = app.local_context.ssh_context(
+                    user=getpass.getuser(), **server.connection_kwargs()
+                )
+                await stack.enter_async_context(ctx)
+                dests.append(ctx.file(os.path.join(tmp, f"dest-{i}")))
+            src_path = os.path.join(tmp, "src")
+            with open(src_path, "wb") as fh:
+                fh.write(content)
+            results = await app.local_context.file(src_path).copy_to_many(
+                dests, **kwargs
+            )
+            self.assertEqual(results, [None] * count)
+            for dest in dests:
+                with open(dest.path, "rb") as fh:
+                    self.assertEqual(fh.read(), content)
+
+    async def test_direct(self):
+        await self.copy(3, concurrency=2)
+
+    async def test_relay(self):
+        options = "-o BatchMode=yes -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR"
+        with mock.patch.object(file, "relay_copier", wraps=file.relay_copier) as relay:
+            await self.copy(3, concurrency=1, relay=True, relay_ssh_options=options)
+            self.assertGreaterEqual(relay.call_count, 1)
+
+    async def test_failed_relay_bounded(self):
+        streaming = []
+        peak = []
+        stream_to = file.LocalFile._stream_to
+
+        async def counted_stream_to(self, buffer, dest, chunk_size):
+            streaming.append(dest)
+            peak.append(len(streaming))
+            try:
+                await asyncio.sleep(0.05)
+                await stream_to(self, buffer, dest, chunk_size)
+            finally:
+                streaming.remove(dest)
+
+        async def unreachable(src, dest, ssh_options):
+            raise Exception("unreachable")
+
+        with mock.patch.object(file, "relay_copier", unreachable):
+            with mock.patch.object(file.LocalFile, "_stream_to", counted_stream_to):
+                await self.copy(4, concurrency=1, relay=True)
+        self.assertEqual(max(peak), 1)
+
+    def test_relayable(self):
+        def ctx(**connection_kwargs):
+            return types.SimpleNamespace(connection_kwargs=connection_kwargs)
+
+        self.assertTrue(file.relayable(ctx(known_hosts=None, agent_path="/agent")))
+        self.assertFalse(file.relayable(ctx(tunnel=object())))
+        self.assertFalse(file.relayable(ctx(client_keys=["/keys/id_ed25519"])))
+
+
+class TestTarCopy(aiounittest.AsyncTestCase):
+    async def test_directory(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    src_path = os.path.join(tmp, "src")
+                    for i in range(50):
+                        os.makedirs(os.path.join(src_path, str(i % 5)), exist_ok=True)
+                        with open(
+                            os.path.join(src_path, str(i % 5), str(i)), "w"
+                        ) as fh:
+                            fh.write(f"file {i}")
+                    src = app.local_context.file(src_path)
+
+                    remote = ctx.file(os.path.join(tmp, "remote", "nested"))
+                    with mock.patch("asyncssh.scp") as scp:
+                        await src.copy_to(
+                            remote, archive=True, compress=True, mode="700"
+                        )
+                        scp.assert_not_called()
+                    back = app.local_context.file(os.path.join(tmp, "back"))
+                    await remote.copy_to(back, archive=True, owner=getpass.getuser())
+
+                    for i in range(50):
+                        path = os.path.join(str(i % 5), str(i))
+                        with open(os.path.join(back.path, path)) as fh:
+                            self.assertEqual(fh.read(), f"file {i}")
+                        mode = os.stat(os.path.join(remote.path, path)).st_mode
+                        self.assertEqual(mode & 0o777, 0o700)
+
+    async def test_mode_without_search_bit(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    os.makedirs(os.path.join(tmp, "src", "nested"))
+                    with open(os.path.join(tmp, "src", "nested", "file"), "w") as fh:
+                        fh.write("content")
+                    src = app.local_context.file(os.path.join(tmp, "src"))
+                    remote = ctx.file(os.path.join(tmp, "remote"))
+                    await src.copy_to(remote, archive=True, mode="644")
+
+                    nested = os.path.join(remote.path, "nested")
+                    self.assertEqual(os.stat(remote.path).st_mode & 0o777, 0o755)
+                    self.assertEqual(os.stat(nested).st_mode & 0o777, 0o755)
+                    path = os.path.join(nested, "file")
+                    self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+                    with open(path) as fh:
+                        self.assertEqual(fh.read(), "content")
+
+
+class TestRemoteToRemote(aiounittest.AsyncTestCase):
+    async def test_ssh_to_ssh(self):
+        options = "-o BatchMode=yes -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR"
+        content = os.urandom(300000)
+        async with App() as app, contextlib.AsyncExitStack() as stack:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            contexts = []
+            for _ in range(2):
+                server = await stack.enter_async_context(LocalSSHServer())
+                ctx = app.local_context.ssh_context(
+                    user=getpass.getuser(), **server.connection_kwargs()
+                )
+                contexts.append(await stack.enter_async_context(ctx))
+            src_path = os.path.join(tmp, "src")
+            with open(src_path, "wb") as fh:
+                fh.write(content)
+            os.chmod(src_path, 0o640)
+            src = contexts[0].file(src_path)
+
+            dest = contexts[1].file(os.path.join(tmp, "streamed"))
+            await src.copy_to(dest, archive=True)
+            with open(dest.path, "rb") as fh:
+                self.assertEqual(fh.read(), content)
+            self.assertEqual(os.stat(dest.path).st_mode & 0o777, 0o640)
+
+            async def streamed(src, dest, archive=False):
+                self.fail("the file was streamed through this machine")
+
+            copies = []
+            recorder = types.SimpleNamespace(
+                on_copy_end=lambda *args: copies.append(args)
+            )
+            app.hooks.register(recorder)
+            pair = (file.SSHFile, file.SSHFile)
+            with mock.patch.object(file, "RELAY_SSH_OPTIONS", options):
+                with mock.patch.dict(file.copiers, {pair: streamed}):
+                    dest = contexts[1].file(os.path.join(tmp, "direct"))
+                    self.assertTrue(await src.copy_to(dest, direct=True))
+            app.hooks.unregister(recorder)
+            self.assertEqual(len(copies), 1)
+            with open(dest.path, "rb") as fh:
+                self.assertEqual(fh.read(), content)
+
+            # without options accepting its key, ssh can't reach the destination
+            with mock.patch.object(
+                file,
+                "RELAY_SSH_OPTIONS",
+                "-o BatchMode=yes -o UserKnownHostsFile=/dev/null",
+            ):
+                dest = contexts[1].file(os.path.join(tmp, "fallback"))
+                self.assertTrue(await src.copy_to(dest, direct=True))
+            with open(dest.path, "rb") as fh:
+                self.assertEqual(fh.read(), content)
+
+            os.makedirs(os.path.join(tmp, "dir", "nested"))
+            with open(os.path.join(tmp, "dir", "nested", "file"), "w") as fh:
+                fh.write("nested")
+            await contexts[0].file(os.path.join(tmp, "dir")).copy_to(
+                contexts[1].file(os.path.join(tmp, "dir-copy")), archive=True
+            )
+            with open(os.path.join(tmp, "dir-copy", "nested", "file")) as fh:
+                self.assertEqual(fh.read(), "nested")
+
+
+class TestSftpCopy(aiounittest.AsyncTestCase):
+    async def test_copy_to(self):
+        content = os.urandom(1000000)
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local_path = os.path.join(tmp, "local")
+                    with open(local_path, "wb") as fh:
+                        fh.write(content)
+                    src = app.local_context.file(local_path)
+                    remote = ctx.file(os.path.join(tmp, "remote"))
+                    with mock.patch("asyncssh.scp") as scp:
+                        await src.copy_to(remote, sftp=True)
+                        back = app.local_context.file(os.path.join(tmp, "back"))
+                        await remote.copy_to(back, sftp=True)
+                        scp.assert_not_called()
+                    with open(back.path, "rb") as fh:
+                        self.assertEqual(fh.read(), content)
+
+                    pair = (file.LocalFile, file.SSHFile)
+                    sftp_copier = mock.Mock(wraps=file.sftp_copier)
+                    with mock.patch.dict(file.sftp_copiers, {pair: sftp_copier}):
+                        await src.copy_to(
+                            remote,
+                            sftp=True,
+                            chunk_size=1000,
+                            parallelism=3,
+                            channels=2,
+                        )
+                    sftp_copier.assert_called_once_with(
+                        src, remote, chunk_size=1000, parallelism=3, channels=2
+                    )
+                    with open(remote.path, "rb") as fh:
+                        self.assertEqual(fh.read(), content)
+
+    async def test_mismatch(self):
+        async with LocalSSHServer() as server, App() as app:
+            ctx = app.local_context.ssh_context(
+                user=getpass.getuser(), **server.connection_kwargs()
+            )
+            async with ctx:
+                with tempfile.TemporaryDirectory() as tmp:
+                    local_path = os.path.join(tmp, "local")
+                    with open(local_path, "wb") as fh:
+                        fh.write(b"content")
+                    src = app.local_context.file(local_path)
+                    remote = ctx.file(os.path.join(tmp, "remote"))
+
+                    async def sha256(path):
+                        return "0" * 64
+
+                    with mock.patch.object(ctx.fs.digests, "sha256", sha256):
+                        with self.assertRaisesRegex(Exception, "doesn't match"):
+                            await file.sftp_copier(src, remote)
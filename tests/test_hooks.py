@@ -0,0 +1,134 @@
+import os
+import time
+import types
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew.app import App
+from pitcrew.hooks import Hooks
+from pitcrew.logger import logger
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def on_task_start(self, task):
+        self.calls.append(("task_start", task.name))
+
+    def on_task_end(self, task, started, error):
+        self.calls.append(("task_end", task.name, error))
+
+    def on_sh_end(self, context, command, started, code, out, err):
+        self.calls.append(("sh_end", command, code))
+
+    def on_copy_end(self, src, dest, started, error, transferred):
+        self.calls.append(("copy_end", transferred))
+
+    def on_connect(self, context, started, error):
+        self.calls.append(("connect", context.descriptor()))
+
+    def on_result(self, result):
+        self.calls.append(("result", result.status()))
+
+
+class TestHooks(unittest.TestCase):
+    def test_register(self):
+        hooks = Hooks()
+        recorder = Recorder()
+        hooks.register(recorder)
+        self.assertEqual(hooks.on_task_start, [recorder.on_task_start])
+        self.assertEqual(hooks.on_copy_start, [])
+        hooks.unregister(recorder)
+        self.assertEqual(hooks.on_task_start, [])
+        self.assertEqual(hooks.plugins, [])
+
+    def test_hook_names(self):
+        hooks = Hooks()
+        recorder = Recorder()
+        recorder.hook_names = ["on_result"]
+        hooks.register(recorder)
+        self.assertEqual(hooks.on_task_start, [])
+        self.assertEqual(hooks.on_result, [recorder.on_result])
+
+
+class TestAppHooks(aiounittest.AsyncTestCase):
+    async def test_plugin(self):
+        recorder = Recorder()
+        async with App() as app:
+            app.hooks.register(recorder)
+            ctx = app.local_context
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "file")
+                await ctx.fs.touch(path)
+                await ctx.file(path).copy_to(ctx.file(os.path.join(tmp, "copy")))
+            provider = await app.load("providers.local").invoke()
+            async with app.executor(provider) as executor:
+                await executor.invoke(lambda ctx: ctx.sh("true"))
+        self.assertEqual(
+            recorder.calls[:3],
+            [
+                ("task_start", "fs.touch"),
+                ("sh_end", f"touch {path}", 0),
+                ("task_end", "fs.touch", None),
+            ],
+        )
+        self.assertIn(("copy_end", 0), recorder.calls)
+        self.assertIn(("sh_end", "true", 0), recorder.calls)
+        self.assertIn(("connect", ctx.descriptor()), recorder.calls)
+        self.assertEqual(recorder.calls[-1], ("result", "passed"))
+
+    async def test_failed_command(self):
+        ends = []
+        async with App() as app:
+            app.hooks.register(
+                types.SimpleNamespace(on_sh_end=lambda *a: ends.append(a))
+            )
+            ctx = app.local_context
+
+            async def dropped(command, stdin=None, env=None):
+                raise ConnectionResetError("dropped")
+
+            with mock.patch.object(ctx, "_sh_with_code", dropped):
+                with self.assertRaises(ConnectionResetError):
+                    await ctx.sh("true")
+        [(context, command, started, code, out, err)] = ends
+        self.assertEqual((command, code, out), ("true", None, None))
+        self.assertEqual(err, b"ConnectionResetError dropped")
+
+    async def test_started_with_slot(self):
+        durations = []
+
+        def on_sh_end(context, command, started, code, out, err):
+            durations.append(time.perf_counter() - started)
+
+        async with App() as app:
+            app.hooks.register(types.SimpleNamespace(on_sh_end=on_sh_end))
+            ctx = app.local_context
+            ctx.command_semaphore = asyncio.Semaphore(1)
+            try:
+                async with ctx.command_semaphore:
+                    command = asyncio.ensure_future(ctx.sh("true"))
+                    await asyncio.sleep(0.2)
+                await command
+
+                async def read():
+                    return [chunk async for chunk in ctx.sh_stream("echo streamed")]
+
+                async with ctx.command_semaphore:
+                    stream = asyncio.ensure_future(read())
+                    await asyncio.sleep(0.2)
+                self.assertEqual(await stream, [b"streamed\n"])
+            finally:
+                ctx.command_semaphore = None
+        self.assertEqual(len(durations), 2, durations)
+        self.assertLess(max(durations), 0.2)
+
+    async def test_quiet(self):
+        with mock.patch.object(logger, "level", 0):
+            async with App() as app:
+                for name in ["on_task_start", "on_sh_start", "on_copy_start"]:
+                    self.assertEqual(getattr(app.hooks, name), [])
+                self.assertIs(app.hooks.task(None), app.hooks.copy(None, None))
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from pitcrew.app import App
+
+
+class TestLoader(unittest.TestCase):
+    def test_has_package(self):
+        loader = App().loader
+        self.assertTrue(loader.has_package("fs"))
+        self.assertTrue(loader.has_package("fs.digests.sha256"))
+        self.assertTrue(loader.has_package("apt_get"))
+        self.assertFalse(loader.has_package("fs.missing"))
+        self.assertFalse(loader.has_package("__pycache__"))
+        self.assertFalse(loader.has_package("nope"))
+
+    def test_resolves_without_filesystem(self):
+        app = App()
+        context = app.local_context
+        context.fs.write
+        with mock.patch("os.stat") as stat, mock.patch("os.listdir") as listdir:
+            for _ in range(10):
+                task = context.fs.write.task()
+                self.assertEqual(task.name, "fs.write")
+            stat.assert_not_called()
+            listdir.assert_not_called()
+        self.assertIs(context.fs, context.fs)
+        self.assertIs(context.fs.digests, context.fs.digests)
+        self.assertEqual(context.fs.digests.sha256.task_name, "fs.digests.sha256")
+
+    def test_invalidate(self):
+        loader = App().loader
+        loader.populate_task("fs.write")
+        task_dir = loader.task_dir
+        with tempfile.TemporaryDirectory() as tmp:
+            loader.task_dir = os.path.join(tmp, "tasks")
+            shutil.copytree(task_dir, loader.task_dir)
+            self.assertFalse(loader.has_package("extra"))
+            os.makedirs(os.path.join(loader.task_dir, "extra"))
+            self.assertFalse(loader.has_package("extra"))
+            loader.invalidate()
+            self.assertTrue(loader.has_package("extra"))
+            self.assertEqual(loader.tasks, {})
@@ -0,0 +1,171 @@
+import io
+import json
+import asyncio
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew import logger as logger_module
+from pitcrew.hooks import Hooks
+from pitcrew.logger import Logger
+
+
+class FakeContext:
+    def __init__(self, name):
+        self.name = name
+
+    def descriptor(self):
+        return self.name
+
+
+class FakeParams:
+    def __dict__(self):
+        return {}
+
+
+class FakeTask:
+    def __init__(self, name, context):
+        self.name = name
+        self.context = context
+        self.params = FakeParams()
+        self.return_value = None
+
+
+class TestLogger(unittest.TestCase):
+    def test_json(self):
+        out = io.StringIO()
+        logger = Logger(out, format="json")
+        logger.on_sh_start(FakeContext("host-a"), "ls /")
+        logger.on_sh_end(FakeContext("host-a"), "ls /", 0, 0, b"bin\n", b"")
+        logger.info("done")
+        logger.flush()
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [record["event"] for record in records],
+            ["shell_start", "shell_stop", "info"],
+        )
+        self.assertEqual(records[0]["host"], "host-a")
+        self.assertEqual(records[0]["command"], "ls /")
+        self.assertEqual(records[1]["code"], 0)
+        self.assertEqual(records[2]["message"], "done")
+
+    def test_grouped_by_host(self):
+        out = io.StringIO()
+        logger = Logger(out)
+        with mock.patch.object(logger_module, "GROUP_INTERVAL", 60):
+            with mock.patch.object(logger, "_start"):
+                for i in range(3):
+                    for host in ["host-a", "host-b"]:
+                        logger.on_sh_start(FakeContext(host), f"echo {i}")
+            logger._start()
+            logger.flush()
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 8)
+        self.assertIn("── host-a", lines[0])
+        self.assertTrue(all("$host-a" in line for line in lines[1:4]))
+        self.assertIn("── host-b", lines[4])
+        self.assertTrue(all("$host-b" in line for line in lines[5:8]))
+
+    def test_levels(self):
+        out = io.StringIO()
+        logger = Logger(out, format="json")
+        context = FakeContext("host-a")
+
+        def log():
+            # the logger is registered for the hooks its level needs
+            hooks = Hooks()
+            hooks.register(logger)
+            with hooks.task(FakeTask("outer", context)):
+                with hooks.task(FakeTask("inner", context)):
+                    for hook in hooks.on_sh_start:
+                        hook(context, "ls")
+
+        for level in ["debug", "info", "summary", "quiet"]:
+            logger.configure(level=level)
+            log()
+        logger.flush()
+        events = [
+            (record["event"], record.get("task"))
+            for record in map(json.loads, out.getvalue().splitlines())
+        ]
+        debug = [
+            ("task_start", "outer"),
+            ("task_start", "inner"),
+            ("shell_start", None),
+            ("task_stop", "inner"),
+            ("task_stop", "outer"),
+        ]
+        info = [event for event in debug if event[0] != "shell_start"]
+        summary = [("task_stop", "outer")]
+        self.assertEqual(events, debug + info + summary)
+
+    def test_quiet_registers_no_hooks(self):
+        hooks = Hooks()
+        hooks.register(Logger(io.StringIO(), level="quiet"))
+        self.assertEqual(hooks.on_task_start, [])
+        self.assertEqual(hooks.on_sh_start, [])
+        self.assertEqual(hooks.on_copy_end, [])
+
+    def test_drops_when_full(self):
+        out = io.StringIO()
+        logger = Logger(out, format="json", queue_size=4)
+        # the writer isn't started until the first record is queued, so hold it back
+        with mock.patch.object(logger, "_start"):
+            for i in range(10):
+                logger.info(f"line {i}")
+        logger._start()
+        logger.flush()
+        lines = out.getvalue().splitlines()
+        self.assertEqual(logger.dropped, 6)
+        self.assertEqual(json.loads(lines[-1])["message"], "6 log records dropped")
+
+    def test_samples_shell_commands(self):
+        out = io.StringIO()
+        logger = Logger(out, format="json", queue_size=100)
+        with mock.patch.object(logger, "_start"):
+            for i in range(75):
+                logger.info(f"line {i}")
+            for i in range(20):
+                logger.on_sh_start(FakeContext("host-a"), f"echo {i}")
+        # past the threshold only every tenth shell command is kept
+        self.assertEqual(logger.queue.qsize(), 77)
+        self.assertEqual(logger.dropped, 18)
+
+
+class TestTaskStack(aiounittest.AsyncTestCase):
+    async def test_concurrent_hosts(self):
+        out = io.StringIO()
+        logger = Logger(out, format="json")
+        hooks = Hooks()
+        hooks.register(logger)
+
+        async def nested(context, name, delay):
+            with hooks.task(FakeTask(name, context)):
+                await asyncio.sleep(delay)
+                logger.on_sh_start(context, name)
+                await asyncio.sleep(delay)
+
+        async def host(name, delay):
+            context = FakeContext(name)
+            with hooks.task(FakeTask("outer", context)):
+                await asyncio.sleep(delay)
+                await asyncio.gather(
+                    nested(context, "first", delay), nested(context, "second", delay)
+                )
+                self.assertEqual([task.name for task in logger.task_stack], ["outer"])
+
+        await asyncio.gather(*[host(f"host-{i}", 0.01 * (i % 3)) for i in range(10)])
+        self.assertEqual(logger.task_stack, ())
+        logger.flush()
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 10 * 8)
+        for record in records:
+            expected = 0 if record.get("task") == "outer" else 1
+            if record["event"] == "shell_start":
+                expected = 2
+            self.assertEqual(record["depth"], expected, record)
+        outer_stops = [
+            r for r in records if r["event"] == "task_stop" and r["task"] == "outer"
+        ]
+        for record in outer_stops:
+            delay = 0.01 * (int(record["host"].split("-")[1]) % 3)
+            self.assertGreaterEqual(record["duration"], delay * 3)
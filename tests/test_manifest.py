@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pitcrew import manifest
+from pitcrew.app import App
+from pitcrew.manifest import TaskManifest
+
+TASK_SOURCE = '''
+from pitcrew import task
+
+
+@task.arg("path", desc="The path")
+@task.opt("mode", type=int, desc="The mode")
+@task.returns("The contents")
+class ExampleRead(task.BaseTask):
+    """%s"""
+
+    async def run(self) -> bytes:
+        pass
+'''
+
+
+class TestManifest(unittest.TestCase):
+    def test_matches_loader(self):
+        app = App()
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks = TaskManifest(app.loader.task_dir, os.path.join(tmp, "m.json"))
+            infos = list(tasks.each_task())
+        loaded = list(app.loader.each_task())
+        self.assertEqual([t.task_name for t in infos], [t.task_name for t in loaded])
+        for info, task in zip(infos, loaded):
+            self.assertEqual(info.desc(), task.desc())
+            self.assertEqual(info.nodoc, task.nodoc)
+            self.assertEqual(
+                [(a.name, a.type_name, a.desc, a.required) for a in info.args],
+                [(a.name, a.type.__name__, a.desc, a.required) for a in task.args],
+            )
+            self.assertEqual(info.has_return_type(), task.has_return_type())
+            if task.has_return_type():
+                self.assertEqual(info.return_type, task.expected_return_type().__name__)
+                self.assertEqual(info.return_desc, task.return_desc)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            task_dir = os.path.join(tmp, "tasks")
+            os.makedirs(os.path.join(task_dir, "example"))
+            task_path = os.path.join(task_dir, "example", "read.py")
+            with open(task_path, "w") as fh:
+                fh.write(TASK_SOURCE % "Reads a file")
+            cache_path = os.path.join(tmp, "manifest.json")
+
+            info = TaskManifest(task_dir, cache_path).get("example.read")
+            self.assertEqual(info.desc(), "Reads a file")
+            self.assertEqual(info.return_type, "bytes")
+            self.assertEqual(info.args[1].type_name, "int")
+            self.assertFalse(info.args[1].required)
+            self.assertTrue(os.path.exists(cache_path))
+
+            with mock.patch.object(manifest, "parse_task") as parse_task:
+                info = TaskManifest(task_dir, cache_path).get("example.read")
+                parse_task.assert_not_called()
+            self.assertEqual(info.desc(), "Reads a file")
+
+            with open(task_path, "w") as fh:
+                fh.write(TASK_SOURCE % "Reads a whole file")
+            info = TaskManifest(task_dir, cache_path).get("example.read")
+            self.assertEqual(info.desc(), "Reads a whole file")
+            self.assertIsNone(TaskManifest(task_dir, cache_path).get("missing"))
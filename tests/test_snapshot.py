@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew import snapshot
+from pitcrew.app import App
+
+
+def entry(link_type="f", type="file"):
+    return snapshot.Entry(link_type, type, "100644", 1, 0, 0, 1, 0, 0, 8)
+
+
+class TestSnapshot(unittest.TestCase):
+    def make_snapshot(self):
+        return snapshot.Snapshot(
+            ["/srv"],
+            {
+                "/srv": entry("d", "directory"),
+                "/srv/a": entry(),
+                "/srv/dir": entry("d", "directory"),
+                "/srv/dir/b": entry(),
+            },
+        )
+
+    def test_lookup(self):
+        snap = self.make_snapshot()
+        self.assertEqual(snap.lookup("/srv/a"), entry())
+        self.assertIsNone(snap.lookup("/srv/missing"))
+        self.assertIs(snap.lookup("/etc/passwd"), snapshot.UNKNOWN)
+        self.assertEqual(snap.list("/srv"), ["a", "dir"])
+
+    def test_forget(self):
+        snap = self.make_snapshot()
+        snap.forget("/srv/a")
+        self.assertIs(snap.lookup("/srv/a"), snapshot.UNKNOWN)
+        self.assertIs(snap.list("/srv"), snapshot.UNKNOWN)
+        snap.update("/srv/a", None)
+        self.assertIsNone(snap.lookup("/srv/a"))
+        self.assertEqual(snap.list("/srv"), ["dir"])
+
+        snap.forget("/srv/dir")
+        self.assertIs(snap.lookup("/srv/dir/b"), snapshot.UNKNOWN)
+        snap.forget("/srv/new")
+        self.assertIs(snap.lookup("/srv/new/c"), snapshot.UNKNOWN)
+        snap.update("/srv/new", entry())
+        self.assertEqual(snap.lookup("/srv/new"), entry())
+        self.assertIsNone(snap.lookup("/srv/new/c"))
+
+        snap.forget_subject("relative")
+        self.assertIs(snap.lookup("/srv/new"), snapshot.UNKNOWN)
+
+
+class TestSnapshotTask(aiounittest.AsyncTestCase):
+    async def test_answers_from_snapshot(self):
+        async with App() as app:
+            ctx = app.local_context
+            with tempfile.TemporaryDirectory() as tmp:
+                for i in range(20):
+                    with open(os.path.join(tmp, f"file-{i}"), "w") as fh:
+                        fh.write(str(i))
+                os.mkdir(os.path.join(tmp, "dir"))
+                self.assertEqual(await ctx.fs.snapshot(tmp), 22)
+
+                commands = []
+                sh_with_code = ctx._sh_with_code
+
+                async def counted(command, *args, **kwargs):
+                    commands.append(command)
+                    return await sh_with_code(command, *args, **kwargs)
+
+                with mock.patch.object(ctx, "_sh_with_code", counted):
+                    for i in range(20):
+                        path = os.path.join(tmp, f"file-{i}")
+                        self.assertTrue(await ctx.fs.is_file(path))
+                        self.assertEqual((await ctx.fs.stat(path)).size, len(str(i)))
+                    self.assertTrue(await ctx.fs.is_directory(os.path.join(tmp, "dir")))
+                    self.assertFalse(await ctx.fs.is_file(os.path.join(tmp, "missing")))
+                    self.assertEqual(len(await ctx.fs.list(tmp)), 21)
+                    self.assertEqual(commands, [])
+
+                    # paths written through pitcrew are probed again
+                    path = os.path.join(tmp, "new")
+                    await ctx.fs.write(path, b"new content")
+                    self.assertTrue(await ctx.fs.is_file(path))
+                    await ctx.fs.chmod(path, "600")
+                    self.assertEqual((await ctx.fs.stat(path)).mode, "100600")
+                    self.assertEqual(len(await ctx.fs.list(tmp)), 22)
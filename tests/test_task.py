@@ -1,4 +1,10 @@
+import os
+import hashlib
+import tempfile
+from unittest import mock
 from pitcrew import task
+from pitcrew.app import App
+from pitcrew.cache import MemoCache
 import aiounittest
 
 
@@ -74,3 +80,176 @@ class TestTask(aiounittest.AsyncTestCase):
 
         task_instance = Task()
         await task_instance.invoke("one", "two", "three")
+
+
+class TestMemoize(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.context = App().local_context
+        self.context.cache = MemoCache()
+        self.calls = []
+
+    def make_task(self, cls):
+        task_instance = cls()
+        task_instance.context = self.context
+        return task_instance
+
+    def memoized_task(self, **kwargs):
+        calls = self.calls
+
+        @task.arg("path")
+        @task.memoize(**kwargs)
+        class Stat(task.BaseTask):
+            task_name = "test.stat"
+
+            async def run(self) -> str:
+                calls.append(self.params.path)
+                return self.params.path.upper()
+
+        return Stat
+
+    async def test_keyed_on_args(self):
+        Stat = self.memoized_task()
+        self.assertEqual(await self.make_task(Stat).invoke("a"), "A")
+        self.assertEqual(await self.make_task(Stat).invoke("b"), "B")
+        self.assertEqual(await self.make_task(Stat).invoke("a"), "A")
+        self.assertEqual(self.calls, ["a", "b"])
+
+    async def test_ttl(self):
+        Stat = self.memoized_task(ttl=0)
+        await self.make_task(Stat).invoke("a")
+        await self.make_task(Stat).invoke("a")
+        self.assertEqual(self.calls, ["a", "a"])
+
+    async def test_maxsize(self):
+        Stat = self.memoized_task(maxsize=2)
+        for path in ["a", "b", "a", "c", "a", "b"]:
+            await self.make_task(Stat).invoke(path)
+        self.assertEqual(self.calls, ["a", "b", "c", "b"])
+
+    async def test_invalidates(self):
+        Stat = self.memoized_task()
+
+        @task.arg("path")
+        @task.invalidates("test.stat", on="path")
+        class Write(task.BaseTask):
+            async def run(self):
+                pass
+
+        await self.make_task(Stat).invoke("/tmp/a")
+        await self.make_task(Stat).invoke("/tmp/b")
+        with self.context.cd("/tmp"):
+            await self.make_task(Write).invoke("a")
+        await self.make_task(Stat).invoke("/tmp/a")
+        await self.make_task(Stat).invoke("/tmp/b")
+        self.assertEqual(self.calls, ["/tmp/a", "/tmp/b", "/tmp/a"])
+
+
+class TestFsWrite(aiounittest.AsyncTestCase):
+    async def test_content_types(self):
+        async def chunks():
+            for i in range(100):
+                yield bytes([i]) * 1000
+
+        expected = b"".join([bytes([i]) * 1000 for i in range(100)])
+        async with App() as app:
+            ctx = app.local_context
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "file")
+                source_path = os.path.join(tmp, "source")
+                with open(source_path, "wb") as fh:
+                    fh.write(expected)
+
+                for content in [
+                    expected,
+                    "some text",
+                    chunks(),
+                    ctx.file(source_path),
+                ]:
+                    await ctx.fs.write(path, content)
+                    with open(path, "rb") as fh:
+                        written = fh.read()
+                    if isinstance(content, str):
+                        self.assertEqual(written, content.encode())
+                    else:
+                        self.assertEqual(written, expected)
+
+                # the digest of the content is only computed once
+                with mock.patch("hashlib.sha256", wraps=hashlib.sha256) as sha256:
+                    await ctx.fs.write(path, b"other")
+                    self.assertEqual(sha256.call_count, 1)
+
+
+class TestFsProbe(aiounittest.AsyncTestCase):
+    async def test_probe(self):
+        async with App() as app:
+            ctx = app.local_context
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "some file")
+                with open(path, "wb") as fh:
+                    fh.write(b"content")
+                file_probe, dir_probe, missing = await ctx.fs.probe(
+                    path, tmp, os.path.join(tmp, "missing"), digest=True
+                )
+                self.assertEqual(file_probe.type, "file")
+                self.assertEqual(file_probe.size, 7)
+                self.assertEqual(
+                    file_probe.sha256, hashlib.sha256(b"content").hexdigest()
+                )
+                self.assertEqual(dir_probe.type, "directory")
+                self.assertIsNone(dir_probe.sha256)
+                self.assertFalse(missing.exists)
+                self.assertTrue(await ctx.fs.is_file(path))
+                self.assertFalse(await ctx.fs.is_directory(path))
+                self.assertEqual((await ctx.fs.stat(path)).size, 7)
+
+    async def test_unchanged_write(self):
+        async with App() as app:
+            ctx = app.local_context
+            await ctx.facts.system.uname()
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "file")
+                with open(path, "wb") as fh:
+                    fh.write(b"content")
+                commands = []
+                sh_with_code = ctx._sh_with_code
+
+                async def counted(command, *args, **kwargs):
+                    commands.append(command)
+                    return await sh_with_code(command, *args, **kwargs)
+
+                with mock.patch.object(ctx, "_sh_with_code", counted):
+                    await ctx.fs.write(path, b"content")
+                self.assertEqual(len(commands), 1)
+
+    async def test_many(self):
+        async with App() as app:
+            ctx = app.local_context
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = []
+                for i in range(500):
+                    # long names to need more than one command
+                    path = os.path.join(tmp, f"{i:0200d}")
+                    with open(path, "w") as fh:
+                        fh.write(str(i))
+                    paths.append(path)
+                paths.append(os.path.join(tmp, "missing"))
+
+                commands = []
+                sh_with_code = ctx._sh_with_code
+
+                async def counted(command, *args, **kwargs):
+                    commands.append(command)
+                    return await sh_with_code(command, *args, **kwargs)
+
+                with mock.patch.object(ctx, "_sh_with_code", counted):
+                    stats = await ctx.fs.stat_many(paths)
+                    digests = await ctx.fs.digests.sha256_many(paths)
+                self.assertLess(len(commands), 10)
+                self.assertGreater(len(commands), 2)
+                for i, path in enumerate(paths[:-1]):
+                    self.assertEqual(stats[path].size, len(str(i)))
+                    self.assertEqual(
+                        digests[path], hashlib.sha256(str(i).encode()).hexdigest()
+                    )
+                self.assertIsNone(stats[paths[-1]])
+                self.assertIsNone(digests[paths[-1]])
@@ -0,0 +1,74 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import aiounittest
+from pitcrew.app import App
+from pitcrew.logger import logger
+from pitcrew.trace import Tracer
+
+
+def spans(tracer, category=None):
+    return [
+        event
+        for event in tracer.trace()["traceEvents"]
+        if event["ph"] == "X" and category in (None, event["cat"])
+    ]
+
+
+class TestTracer(unittest.TestCase):
+    def test_tracks(self):
+        tracer = Tracer()
+
+        async def host(name):
+            async def branch(label):
+                start = tracer.origin
+                tracer.span(name, label, "task", start, start + 1)
+
+            await asyncio.gather(branch("first"), branch("second"))
+            tracer.span(name, "outer", "task", tracer.origin, tracer.origin + 2)
+
+        async def run():
+            await asyncio.gather(host("host-a"), host("host-b"))
+
+        asyncio.get_event_loop().run_until_complete(run())
+        trace = tracer.trace()
+        processes = {
+            event["args"]["name"]: event["pid"]
+            for event in trace["traceEvents"]
+            if event["name"] == "process_name"
+        }
+        self.assertEqual(set(processes), {"host-a", "host-b"})
+        for pid in processes.values():
+            events = [event for event in spans(tracer) if event["pid"] == pid]
+            self.assertEqual(len(events), 3)
+            # the gather branches ran concurrently, so they're on their own threads
+            self.assertEqual(len({event["tid"] for event in events}), 3)
+            self.assertEqual(events[0]["dur"], 1e6)
+
+
+class TestTracing(aiounittest.AsyncTestCase):
+    async def test_tasks_commands_and_copies(self):
+        tracer = Tracer()
+        with mock.patch.object(logger, "level", 0):
+            async with App() as app:
+                app.hooks.register(tracer)
+                ctx = app.local_context
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, "file")
+                    await ctx.fs.write(path, b"content")
+                    await ctx.file(path).copy_to(ctx.file(os.path.join(tmp, "copy")))
+        tasks = {event["name"]: event for event in spans(tracer, "task")}
+        self.assertEqual(tasks["fs.write"]["args"]["path"], path)
+        self.assertEqual(tasks["fs.write"]["args"]["content"], b"content")
+        phases = [event["name"] for event in spans(tracer, "phase")]
+        self.assertEqual(phases, ["verify", "run", "verify"])
+        commands = spans(tracer, "shell")
+        self.assertTrue(commands)
+        self.assertTrue(all(event["args"]["code"] == 0 for event in commands))
+        (copy,) = spans(tracer, "copy")
+        self.assertEqual(copy["args"]["bytes"], 7)
+        self.assertTrue(copy["args"]["dest"].endswith("/copy"))
+        json.dumps(tracer.trace(), default=str)